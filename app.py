@@ -2,12 +2,17 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 from datetime import datetime, timedelta
 import os
-import shutil
 import sys
 import subprocess
 
 # Import your scheduling logic
 from camp_scheduler.scheduler import ProgramSchedules
+from camp_scheduler.ingest import import_form_exports
+from camp_scheduler.catalog import RunCatalog, run_label
+from camp_scheduler.groups import GROUP_SOURCES
+from camp_scheduler.portfolio import Portfolio
+
+RUNS_SHOWN = 50  # newest runs listed; older ones via `python -m camp_scheduler runs`
 
 # ---- Helper Functions ----
 
@@ -18,15 +23,18 @@ def get_next_monday(today=None):
     return (today + timedelta(days=days_ahead)).strftime("%d/%m/%Y")
 
 def refresh_file_list():
+    # One page from the run catalog, however many run folders Output holds
     file_listbox.delete(0, tk.END)
-    output_dir = os.path.join(os.getcwd(), "Output")
-    os.makedirs(output_dir, exist_ok=True)
-    files = sorted(os.listdir(output_dir))
-    if not files:
-        file_listbox.insert(tk.END, "(no files in /Output/)")
-    else:
-        for f in files:
-            file_listbox.insert(tk.END, f)
+    listed_paths.clear()
+    runs = catalog.list_runs(limit=RUNS_SHOWN + 1)
+    if not runs:
+        file_listbox.insert(tk.END, "(no runs in /Output/)")
+        return
+    for run in runs[:RUNS_SHOWN]:
+        file_listbox.insert(tk.END, run_label(run))
+        listed_paths.append(run["path"])
+    if len(runs) > RUNS_SHOWN:
+        file_listbox.insert(tk.END, "(older runs: python -m camp_scheduler runs --page 2)")
 
 def import_files():
     file_paths = filedialog.askopenfilenames(
@@ -36,11 +44,17 @@ def import_files():
     if file_paths:
         dest_dir = os.path.join(os.getcwd(), "camp_scheduler/data")
         os.makedirs(dest_dir, exist_ok=True)
-        for path in file_paths:
-            if path.lower().endswith(".csv"):
-                dest_path = os.path.join(dest_dir, os.path.basename(path))
-                shutil.copy(path, dest_path)
-        messagebox.showinfo("Success", f"Imported {len(file_paths)} file(s) to /data/")
+        csv_paths = [path for path in file_paths if path.lower().endswith(".csv")]
+        try:
+            # Form exports are merged into the current form file, one submission per person
+            reports, copied = import_form_exports(csv_paths, dest_dir)
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not import files:\n{e}")
+            return
+        lines = [report.summary() for report in reports]
+        if copied:
+            lines.append(f"Copied: {', '.join(copied)}")
+        messagebox.showinfo("Success", f"Imported {len(csv_paths)} file(s) to /data/\n\n" + "\n".join(lines))
         refresh_file_list()
 
 def run_command(command):
@@ -54,26 +68,36 @@ def run_command(command):
         messagebox.showerror("Invalid Date", "Please use DD/MM/YYYY format.")
         return
 
-    scheduler = ProgramSchedules(week_start)
+    try:
+        seeds = int(portfolio_var.get().strip() or 0)
+    except ValueError:
+        messagebox.showerror("Invalid Seeds", "Portfolio seeds must be a whole number (0 to turn it off).")
+        return
+
+    group_by = group_by_var.get()
+    scheduler = ProgramSchedules(week_start, catalog=catalog, group_by=None if group_by == "none" else group_by,
+                                 portfolio=Portfolio(runs=seeds) if seeds > 0 else None)
 
     try:
         if command == "run-full-schedule":
             scheduler.run_full_schedule()
         elif command == "assign-off-times":
             scheduler.assign_off_times()
-            scheduler.clean_output_files()
+        elif command == "generate-night-coverage":
+            scheduler.generate_night_coverage()
         elif command == "assign-freetime-locations":
             scheduler.assign_freetime_locations()
-            scheduler.clean_output_files()
         elif command == "generate-coverage-schedule":
             scheduler.generate_coverage_schedule()
-            scheduler.clean_output_files()
         elif command == "assign-skills-classes":
             scheduler.assign_skills_classes()
-            scheduler.clean_output_files()
         elif command == "assign-campers-to-skills":
             scheduler.assign_campers_to_skills()
-            scheduler.clean_output_files()
+        elif command == "analyze-capacity":
+            analysis = scheduler.analyze_capacity()
+            messagebox.showinfo("Capacity Analysis", analysis.summary())
+            refresh_file_list()
+            return
         else:
             messagebox.showwarning("Unknown Command", f"Unknown command: {command}")
             return
@@ -87,6 +111,8 @@ def run_command(command):
 # ---- GUI Setup ----
 
 root = tk.Tk()
+catalog = RunCatalog(os.path.join(os.getcwd(), "Output"))
+listed_paths = []  # run folder (or zip) of each listed run, by position
 root.title("Abnaki Program Scheduler")
 
 # Week Start Input
@@ -94,39 +120,50 @@ tk.Label(root, text="Week Start (DD/MM/YYYY):").grid(row=0, column=0, padx=10, p
 week_start_var = tk.StringVar(value=get_next_monday())
 tk.Entry(root, textvariable=week_start_var, width=20).grid(row=0, column=1, padx=10, pady=5, sticky="w")
 
+# Camper grouping (campers who listed each other as friends, or cabin mates, are seated together)
+tk.Label(root, text="Group Campers By:").grid(row=1, column=0, padx=10, pady=5, sticky="w")
+group_by_var = tk.StringVar(value="none")
+tk.OptionMenu(root, group_by_var, "none", *GROUP_SOURCES).grid(row=1, column=1, padx=10, pady=5, sticky="w")
+
+# Seeds tried for the time-off and camper stages (0: the standard ordering only)
+tk.Label(root, text="Portfolio Seeds:").grid(row=2, column=0, padx=10, pady=5, sticky="w")
+portfolio_var = tk.StringVar(value="0")
+tk.Entry(root, textvariable=portfolio_var, width=20).grid(row=2, column=1, padx=10, pady=5, sticky="w")
+
 # Command Buttons
 commands = [
     ("Run Full Schedule", "run-full-schedule"),
     ("Assign Off Times", "assign-off-times"),
+    ("Generate Night Coverage", "generate-night-coverage"),
     ("Assign Freetime Locations", "assign-freetime-locations"),
     ("Generate Coverage Schedule", "generate-coverage-schedule"),
     ("Assign Skills Classes", "assign-skills-classes"),
     ("Assign Campers to Skills", "assign-campers-to-skills"),
+    ("Analyze Capacity", "analyze-capacity"),
 ]
 
-for i, (label, cmd) in enumerate(commands, start=1):
+for i, (label, cmd) in enumerate(commands, start=3):
     tk.Button(root, text=label, width=30, command=lambda c=cmd: run_command(c)).grid(
         row=i, column=0, columnspan=2, padx=10, pady=2
     )
 
 # Import File Button
 tk.Button(root, text="Import CSV File(s) to /data/", command=import_files, width=30).grid(
-    row=len(commands)+1, column=0, columnspan=2, pady=10
+    row=len(commands)+3, column=0, columnspan=2, pady=10
 )
 
 # File List Display
-tk.Label(root, text="Output Folders:").grid(row=len(commands)+2, column=0, columnspan=2, sticky="w", padx=10)
-file_listbox = tk.Listbox(root, width=50, height=10)
-file_listbox.grid(row=len(commands)+3, column=0, columnspan=2, padx=10, pady=5)
+tk.Label(root, text="Output Folders:").grid(row=len(commands)+4, column=0, columnspan=2, sticky="w", padx=10)
+file_listbox = tk.Listbox(root, width=80, height=10)
+file_listbox.grid(row=len(commands)+5, column=0, columnspan=2, padx=10, pady=5)
 
 def open_selected_file(event):
     selection = file_listbox.curselection()
     if not selection:
         return
-    filename = file_listbox.get(selection[0])
-    if filename == "(no files in /Output/)":
+    if selection[0] >= len(listed_paths):
         return
-    filepath = os.path.join(os.getcwd(), "Output", filename)
+    filepath = listed_paths[selection[0]]
     if not os.path.exists(filepath):
         messagebox.showerror("File Not Found", f"File does not exist:\n{filepath}")
         return
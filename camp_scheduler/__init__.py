@@ -1,3 +1,15 @@
 from .scheduler import ProgramSchedules
+from .validation import validate_inputs, ValidationReport, InputValidationError
+from .analysis import analyze_capacity, CapacityAnalysis
+from .grid import ScheduleGrid
+from .scenarios import run_scenarios, ScenarioBase
+from .portfolio import Portfolio
+from .timetable import Timetable
+from .diff import diff_runs, diff_outputs, ScheduleDiff
+from .snapshot import InputSnapshot
+from .waitlists import Waitlists
 
-__all__ = ['ProgramSchedules']
\ No newline at end of file
+__all__ = ['ProgramSchedules', 'validate_inputs', 'ValidationReport', 'InputValidationError',
+           'analyze_capacity', 'CapacityAnalysis', 'ScheduleGrid',
+           'run_scenarios', 'ScenarioBase', 'Portfolio', 'Timetable',
+           'diff_runs', 'diff_outputs', 'ScheduleDiff', 'InputSnapshot', 'Waitlists']
\ No newline at end of file
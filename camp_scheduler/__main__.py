@@ -0,0 +1,221 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import timedelta
+
+from .analysis import analyze_capacity
+from .catalog import RunCatalog, run_label, completed_runs, latest_run_dir
+from .diff import diff_runs, load_run_outputs
+from .groups import GROUP_SOURCES
+from .ingest import import_form_exports
+from .inputs import get_data_dir
+from .portfolio import Portfolio
+from .scheduler import ProgramSchedules
+from .service import ScheduleService
+from .sheets import render_sheets, SHEET_KINDS, SHEET_FORMATS
+from .scenarios import run_scenarios
+from .snapshot import InputSnapshot
+from .waitlists import Waitlists
+from .watcher import DataWatcher
+
+
+def add_portfolio_options(parser):
+    parser.add_argument("--portfolio", type=int, default=None, metavar="SEEDS",
+                        help="Try this many random seeds for the time-off and camper stages and keep the best")
+    parser.add_argument("--portfolio-budget", type=float, default=5.0,
+                        help="Seconds the seed search may take per stage (with --portfolio)")
+
+
+def make_portfolio(args):
+    return Portfolio(runs=args.portfolio, time_budget=args.portfolio_budget) if args.portfolio else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="camp_scheduler", description="Abnaki Program Scheduler")
+    subparsers = parser.add_subparsers(dest="command")
+
+    analyze = subparsers.add_parser("analyze-capacity", help="Check seat and staff capacity without scheduling")
+    analyze.add_argument("--data-dir", default=None, help="Directory with the input files (default: packaged data)")
+
+    run = subparsers.add_parser("run", help="Run the full schedule for a week")
+    run.add_argument("week_start", help="Monday of the week to schedule (DD/MM/YYYY)")
+    run.add_argument("--store", default=None, help="SQLite file that also receives the run's results")
+    run.add_argument("--group-by", choices=GROUP_SOURCES, default=None,
+                     help="Seat campers who listed each other as friends, or cabin mates, together")
+    add_portfolio_options(run)
+
+    serve = subparsers.add_parser("serve", help="Serve the latest run's schedules as local JSON lookups")
+    serve.add_argument("--output-dir", default="Output", help="Folder holding the run folders")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--poll-interval", type=float, default=2.0, help="Seconds between checks for a new run")
+
+    scenarios = subparsers.add_parser("scenarios", help="Compare what-if config patches in parallel")
+    scenarios.add_argument("patches", help="JSON file with a list of {name, classes, fixed_skills_off} patches")
+    scenarios.add_argument("--data-dir", default=None, help="Directory with the input files (default: packaged data)")
+    scenarios.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per core)")
+    scenarios.add_argument("--output", default=None, help="Write the comparison table to this CSV file")
+
+    diff = subparsers.add_parser("diff", help="List what changed between two runs")
+    diff.add_argument("runs", nargs="*", help="Before and after run folders (default: the two latest runs)")
+    diff.add_argument("--output-dir", default="Output", help="Folder holding the run folders")
+    diff.add_argument("--output", default=None, help="Write the per-person change list to this CSV file")
+
+    watch = subparsers.add_parser("watch", help="Rerun the affected stages whenever the data files change")
+    watch.add_argument("week_start", help="Monday of the week to schedule (DD/MM/YYYY)")
+    watch.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between checks of the data folder")
+    watch.add_argument("--debounce", type=float, default=2.0, help="Quiet seconds to wait after the last write")
+    watch.add_argument("--store", default=None, help="SQLite file that also receives each run's results")
+    watch.add_argument("--warm-start", action="store_true",
+                       help="Keep the previous run's still-valid skills and camper assignments when rerunning")
+    watch.add_argument("--group-by", choices=GROUP_SOURCES, default=None,
+                       help="Seat campers who listed each other as friends, or cabin mates, together")
+    add_portfolio_options(watch)
+
+    sheets = subparsers.add_parser("sheets", help="Write per-staff, per-camper and per-cabin documents for a run")
+    sheets.add_argument("run", nargs="?", default=None, help="Run folder (default: the latest run)")
+    sheets.add_argument("--output-dir", default="Output", help="Folder holding the run folders")
+    sheets.add_argument("--format", choices=SHEET_FORMATS, default="html")
+    sheets.add_argument("--kinds", nargs="+", choices=SHEET_KINDS, default=SHEET_KINDS)
+    sheets.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per core)")
+
+    ingest = subparsers.add_parser("ingest", help="Merge form exports into the data folder, one submission per person")
+    ingest.add_argument("files", nargs="+", help="Exported CSV files, oldest first")
+    ingest.add_argument("--data-dir", default=None, help="Directory with the input files (default: packaged data)")
+    ingest.add_argument("--replace", action="store_true", help="Start from the exports only, not the current form files")
+
+    drop = subparsers.add_parser("drop", help="Drop a camper from a class in a finished run and promote from the waitlists")
+    drop.add_argument("camper_id")
+    drop.add_argument("--class", dest="class_name", default=None,
+                      help="Class to drop (default: every class, for a camper who left camp)")
+    drop.add_argument("--run", default=None, help="Run folder (default: the latest run)")
+    drop.add_argument("--output-dir", default="Output", help="Folder holding the run folders")
+    drop.add_argument("--data-dir", default=None, help="Directory with the input files (default: packaged data)")
+
+    runs = subparsers.add_parser("runs", help="List runs from the run catalog, or prune and zip old ones")
+    runs.add_argument("--output-dir", default="Output", help="Folder holding the run folders")
+    runs.add_argument("--week", default=None, help="Only runs of this week (Monday, YYYY-MM-DD)")
+    runs.add_argument("--limit", type=int, default=20, help="Runs per page")
+    runs.add_argument("--page", type=int, default=1)
+    runs.add_argument("--sync", action="store_true", help="Re-index the run folders before listing")
+    runs.add_argument("--prune", action="store_true",
+                      help="Delete superseded partial runs and zip run folders older than --older-than days")
+    runs.add_argument("--older-than", type=float, default=14, help="Age in days before a run folder is zipped")
+    runs.add_argument("--dry-run", action="store_true", help="With --prune, only list what would change")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "analyze-capacity":
+        analysis = analyze_capacity(args.data_dir or get_data_dir())
+        print(analysis.summary())
+        return 1 if analysis.unassigned_lower_bound else 0
+
+    if args.command == "run":
+        scheduler = ProgramSchedules(args.week_start, store=args.store, portfolio=make_portfolio(args),
+                                     group_by=args.group_by)
+        scheduler.run_full_schedule()
+        print(f"Run saved to {scheduler.output_dir}")
+        return 0
+
+    if args.command == "serve":
+        ScheduleService(args.output_dir, args.host, args.port, args.poll_interval).serve_forever()
+        return 0
+
+    if args.command == "scenarios":
+        with open(args.patches) as f:
+            patches = json.load(f)
+        comparison = run_scenarios(patches, data_dir=args.data_dir or get_data_dir(), max_workers=args.workers)
+        print(comparison.to_string(index=False))
+        if args.output:
+            comparison.to_csv(args.output, index=False)
+        return 0
+
+    if args.command == "diff":
+        runs = args.runs or completed_runs(args.output_dir)[-2:]
+        if len(runs) != 2:
+            print("[ERROR] Need two runs to compare (pass two run folders or keep two runs in --output-dir)")
+            return 2
+        changes = diff_runs(runs[0], runs[1])
+        print(f"Comparing {runs[0]} -> {runs[1]}")
+        print(changes.summary())
+        if args.output:
+            with open(args.output, "w", newline="") as f:
+                csv.writer(f).writerows(changes.notification_rows())
+        return 0
+
+    if args.command == "watch":
+        DataWatcher(args.week_start, poll_interval=args.poll_interval, debounce=args.debounce,
+                    store=args.store, portfolio=make_portfolio(args), warm_start=args.warm_start,
+                    group_by=args.group_by).run_forever()
+        return 0
+
+    if args.command == "sheets":
+        run_dir = args.run or latest_run_dir(args.output_dir)
+        if run_dir is None:
+            print(f"[ERROR] No completed run found in {args.output_dir}")
+            return 2
+        sheets_dir = os.path.join(run_dir, "sheets")
+        counts = render_sheets(load_run_outputs(run_dir), sheets_dir, args.kinds, args.format, args.workers)
+        print(f"Sheets saved to {sheets_dir}: " + ", ".join(f"{n} {kind}" for kind, n in counts.items()))
+        return 0
+
+    if args.command == "drop":
+        run_dir = args.run or latest_run_dir(args.output_dir)
+        if run_dir is None:
+            print(f"[ERROR] No completed run found in {args.output_dir}")
+            return 2
+        inputs = InputSnapshot(args.data_dir)
+        waitlists = Waitlists.from_run(run_dir, inputs.get("classes.json"), inputs.get("camper_choices.csv"))
+        held = waitlists.assignments.get(args.camper_id)
+        if held is None:
+            print(f"[ERROR] Camper {args.camper_id} is not in {run_dir}")
+            return 2
+        if args.class_name is not None and args.class_name not in held.values():
+            print(f"[ERROR] Camper {args.camper_id} is not in {args.class_name}")
+            return 2
+        if not held:
+            print(f"[ERROR] Camper {args.camper_id} holds no classes")
+            return 2
+        moves = waitlists.drop(args.camper_id, args.class_name)
+        waitlists.save(run_dir)
+        print(f"Dropped camper {args.camper_id} from {args.class_name or 'every class'} in {run_dir}")
+        for move in moves:
+            left = f" (left {', '.join(move['left'])})" if move["left"] else ""
+            periods = ", ".join(f"P{p}" for p in move["periods"])
+            print(f"Promoted {move['id']} into {move['class']} {periods}{left}")
+        if not moves:
+            print("Nobody on the waitlists could take the freed seats")
+        return 0
+
+    if args.command == "runs":
+        catalog = RunCatalog(args.output_dir)
+        if args.sync:
+            added, forgotten = catalog.sync()
+            print(f"Catalog synced: {added} run(s) added, {forgotten} missing run(s) dropped")
+        if args.prune:
+            changes = catalog.apply_retention(timedelta(days=args.older_than), dry_run=args.dry_run)
+            verb = "Would remove" if args.dry_run else "Removed"
+            print(f"{verb} {len(changes['removed'])} superseded partial run(s): {', '.join(changes['removed']) or '-'}")
+            verb = "Would zip" if args.dry_run else "Zipped"
+            print(f"{verb} {len(changes['compressed'])} old run(s): {', '.join(changes['compressed']) or '-'}")
+            return 0
+        for run in catalog.list_runs(args.limit, (args.page - 1) * args.limit, week_start=args.week):
+            print(run_label(run))
+        return 0
+
+    if args.command == "ingest":
+        reports, copied = import_form_exports(args.files, args.data_dir or get_data_dir(), args.replace)
+        for report in reports:
+            print(report.summary())
+        if copied:
+            print(f"Copied: {', '.join(copied)}")
+        return 0
+
+    parser.print_help()
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+import pandas as pd
+
+from .snapshot import InputSnapshot
+from .validation import CHOICE_COLUMNS
+
+# Certification a staff member needs before they can be placed on a class
+CLASS_CERTIFICATIONS = {
+    "Waterfront": "lifeguard certification",
+    "Archery": "archery certification",
+    "High Ropes": "high ropes certification",
+    "Fishing": "fishing proficiency",
+}
+
+
+class CapacityAnalysis:
+    """Capacity and feasibility bounds computed straight from the input files"""
+
+    def __init__(self, num_campers, num_staff, seats, staffed_seats, class_rows, warnings):
+        self.periods = list(seats)
+        self.num_campers = num_campers
+        self.num_staff = num_staff
+        self.seats = seats                    # period -> camper seats over all assignable classes
+        self.staffed_seats = staffed_seats    # period -> seats in classes that can actually be staffed
+        self.class_rows = class_rows          # one dict per (class, period)
+        self.warnings = warnings
+
+    @property
+    def unassigned_lower_bound(self):
+        """Campers that must miss at least one period, whatever the assignment order"""
+        return max(max(0, self.num_campers - self.seats[p]) for p in self.periods)
+
+    def summary(self):
+        lines = ["== Capacity Analysis =="]
+        lines.append(f"Campers: {self.num_campers}, Staff: {self.num_staff}")
+        for p in self.periods:
+            status = "OK" if self.staffed_seats[p] >= self.num_campers else "SHORT"
+            lines.append(
+                f"Period {p}: {self.seats[p]} seats, {self.staffed_seats[p]} staffable seats "
+                f"for {self.num_campers} campers [{status}]"
+            )
+        lines.append(f"Lower bound on campers left unassigned: {self.unassigned_lower_bound}")
+        lines.extend(self.warnings)
+        return "\n".join(lines)
+
+    def to_rows(self):
+        header = ["Class", "Period", "Camper Assignable", "Staff Required", "Eligible Staff",
+                  "Camper Limit", "First Choice Demand", "Total Demand"]
+        rows = [header]
+        for row in self.class_rows:
+            rows.append([row["class"], row["period"], row["camper_assignable"], row["staff_required"],
+                         row["eligible_staff"], row["camper_limit"], row["first_choice_demand"],
+                         row["total_demand"]])
+        return rows
+
+
+def analyze_capacity(inputs):
+    """
+    Computes seat capacity, certified staff per class and period, choice demand
+    and a lower bound on unassigned campers without running any stage.
+
+    inputs: the InputSnapshot a run schedules from, or a data directory to read one from
+    """
+    if not isinstance(inputs, InputSnapshot):
+        inputs = InputSnapshot(inputs)
+    timetable = inputs.timetable
+    class_configs = inputs.get("classes.json")
+    fixed_off_periods = inputs.get("fixed_skills_off.json")
+    staff_df = inputs.table("index.csv")
+    campers_df = inputs.table("camper_choices.csv")
+
+    staff_ids = staff_df["id"].str.strip()
+
+    # Fixed OFF takes the earliest listed period (same rule as assign_skills_classes)
+    fixed_off = {str(sid): min(periods) for sid, periods in fixed_off_periods.items() if periods}
+    off_period = staff_ids.map(fixed_off)
+    available = {p: off_period != p for p in timetable.periods}
+
+    # Choice demand per class, total and first-choice only
+    choices = campers_df[CHOICE_COLUMNS].apply(lambda col: col.str.strip())
+    total_demand = choices.stack().value_counts()
+    first_demand = choices["class1"].value_counts()
+
+    seats = {p: 0 for p in timetable.periods}
+    staffed_seats = {p: 0 for p in timetable.periods}
+    class_rows = []
+    warnings = []
+    for class_name, config in class_configs.items():
+        staff_required = config.get("staff_required", 1)
+        camper_limit = 8 * staff_required
+        assignable = config.get("camper_assignable", True)
+        cert_col = CLASS_CERTIFICATIONS.get(class_name)
+        if cert_col:
+            certified = staff_df[cert_col].str.strip().str.lower() == "yes"
+        else:
+            certified = pd.Series(True, index=staff_df.index)
+
+        for p in config.get("preferred_periods", []):
+            if p not in seats:
+                continue
+            # Multi-period classes starting late in the day are cut short
+            span = timetable.span(config, p)
+            mask = certified
+            for q in span:
+                mask = mask & available[q]
+            eligible = int(mask.sum())
+
+            if assignable:
+                for q in span:
+                    seats[q] += camper_limit
+                    if eligible >= staff_required:
+                        staffed_seats[q] += camper_limit
+            if eligible < staff_required:
+                warnings.append(
+                    f"[WARN] {class_name} P{p}: {eligible} eligible staff for {staff_required} required"
+                )
+
+            class_rows.append({
+                "class": class_name,
+                "period": p,
+                "camper_assignable": assignable,
+                "staff_required": staff_required,
+                "eligible_staff": eligible,
+                "camper_limit": camper_limit if assignable else 0,
+                "first_choice_demand": int(first_demand.get(class_name, 0)),
+                "total_demand": int(total_demand.get(class_name, 0)),
+            })
+
+    for class_name in sorted(set(total_demand.index) - set(class_configs) - {""}):
+        warnings.append(f"[WARN] {class_name} is requested {int(total_demand[class_name])} times but not in classes.json")
+
+    # Classes asked for far beyond what they can seat across all their periods
+    for class_name, config in class_configs.items():
+        if not config.get("camper_assignable", True):
+            continue
+        offered = len([p for p in config.get("preferred_periods", []) if p in seats])
+        capacity = offered * 8 * config.get("staff_required", 1)
+        demand = int(first_demand.get(class_name, 0))
+        if demand > capacity:
+            warnings.append(f"[WARN] {class_name}: {demand} first choices for {capacity} seats")
+
+    return CapacityAnalysis(len(campers_df), len(staff_df), seats, staffed_seats, class_rows, warnings)
@@ -0,0 +1,369 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import zipfile
+from datetime import datetime, timedelta
+
+CATALOG_NAME = "catalog.db"
+
+# A run is complete once export_output_summary has written its summary
+RUN_COMPLETE_MARKER = "summary.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    week_start TEXT,
+    created TEXT NOT NULL,
+    stages TEXT NOT NULL DEFAULT '',
+    complete INTEGER NOT NULL DEFAULT 0,
+    archived INTEGER NOT NULL DEFAULT 0,
+    input_hash TEXT,
+    inputs TEXT,
+    summary TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_catalog_created ON runs (created);
+CREATE INDEX IF NOT EXISTS idx_catalog_week ON runs (week_start, complete, created);
+"""
+
+# Outputs whose Date column (DD/MM/YYYY) dates a run folder that has no week_start in its summary
+DATED_OUTPUTS = ["freetime_schedule.csv", "night_coverage.csv"]
+
+RUN_ID = re.compile(r"^(\d{4}-\d{2}-\d{2})_(\d{2})-(\d{2})-(\d{2})(?:_(\d+))?$")
+
+
+def content_hashes(contents):
+    """{filename: sha1} for {filename: bytes}"""
+    return {filename: hashlib.sha1(data).hexdigest() for filename, data in contents.items()}
+
+
+def input_hash(hashes):
+    """One hash over every input file's hash, equal for runs made from the same data"""
+    if not hashes:
+        return None
+    return hashlib.sha1(json.dumps(hashes, sort_keys=True).encode()).hexdigest()
+
+
+def summary_stats(stats):
+    """Headline numbers from a run's stats, small enough to keep per run in the catalog"""
+    summary = {"files": stats.get("files", {})}
+    if "time_off" in stats:
+        summary["time_off_unassigned"] = stats["time_off"].get("unassigned")
+    if "nights" in stats:
+        summary["nights_uncovered"] = stats["nights"].get("status_counts", {}).get("UNCOVERED", 0)
+    if "campers" in stats:
+        summary["campers"] = stats["campers"].get("campers")
+        summary["campers_fully_assigned"] = stats["campers"].get("fully_assigned")
+    return summary
+
+
+def _created_from_id(run_id, path):
+    """Creation time of a run from its folder name (mtime for other names), as ISO text"""
+    match = RUN_ID.match(run_id)
+    if match is None:
+        return datetime.fromtimestamp(os.path.getmtime(path)).isoformat()
+    date, hour, minute, second, n = match.groups()
+    # Runs started in the same second are numbered from 2; keep them in order
+    return f"{date}T{hour}:{minute}:{second}.{int(n or 1):06d}"
+
+
+class RunCatalog:
+    """
+    Index of the run folders under an Output directory, in Output/catalog.db.
+
+    ProgramSchedules records each run as it goes: the week, the stages it
+    ran, hashes of the data files it read, whether it finished (wrote its
+    summary) and headline stats. Listing is a LIMIT/OFFSET query on the
+    creation index, so it costs the same with ten runs or ten thousand and
+    never touches the folders themselves.
+
+    Folders made before the catalog existed (or by runs with the catalog
+    switched off) are picked up by sync(), which is the only call that scans
+    the directory; a new catalog syncs once when it is created.
+    """
+
+    def __init__(self, output_root="Output", path=None):
+        self.output_root = output_root
+        self.path = path or os.path.join(output_root, CATALOG_NAME)
+        os.makedirs(output_root, exist_ok=True)
+        new = not os.path.exists(self.path)
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._write_lock = threading.Lock()  # runs in other threads may share the catalog
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        if new:
+            self.sync()
+
+    def close(self):
+        self.conn.close()
+
+    # --- Recording ---
+
+    def record(self, run_id, path, week_start=None, stages=(), complete=False, inputs=None, summary=None,
+               created=None):
+        """
+        Add or update a run. week_start is a datetime (the Monday of the
+        scheduled week); inputs is {data file: hash}. created is only used
+        when the run is first recorded.
+        """
+        week = week_start.strftime("%Y-%m-%d") if week_start is not None else None
+        created = created or _created_from_id(run_id, path)
+        with self._write_lock, self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO runs (run_id, path, created) VALUES (?, ?, ?)",
+                              (run_id, path, created))
+            self.conn.execute(
+                "UPDATE runs SET path = ?, week_start = ?, stages = ?, complete = ?, archived = ?, "
+                "input_hash = ?, inputs = ?, summary = ? WHERE run_id = ?",
+                (path, week, ",".join(stages), int(complete), int(path.endswith(".zip")),
+                 input_hash(inputs), json.dumps(inputs or {}), json.dumps(summary or {}), run_id),
+            )
+
+    def forget(self, run_id):
+        with self._write_lock, self.conn:
+            self.conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    def sync(self):
+        """
+        Bring the catalog in line with the Output directory: index run folders
+        and archives it does not know yet and forget runs whose folder or
+        archive is gone. Returns (added, forgotten).
+
+        A run is read from its summary.json. Folders from before the catalog
+        (no summary, or one without week_start) get their stages from the
+        files they hold and their week from the dates in their outputs; runs
+        whose week stays unknown are left out of retention. Known runs with no
+        week are looked at again, as they may have been indexed before their
+        week could be worked out.
+        """
+        from .scheduler import STAGES, STAGE_OUTPUTS
+
+        rows = self.conn.execute("SELECT run_id, path, week_start FROM runs").fetchall()
+        known = {row["run_id"]: row["path"] for row in rows}
+        undated = {row["run_id"] for row in rows if row["week_start"] is None}
+        seen = set()
+        added = 0
+        for entry in os.scandir(self.output_root):
+            if entry.is_dir():
+                run_id = entry.name
+            elif entry.name.endswith(".zip"):
+                run_id = entry.name[:-len(".zip")]
+            else:
+                continue
+            seen.add(run_id)
+            if run_id in known and run_id not in undated:
+                continue
+            stats = self._read_summary(entry.path)
+            week = stats.get("week_start") or self._week_from_outputs(entry.path)
+            if run_id in undated and not week:
+                continue
+            files = stats.get("files") or self._run_files(entry.path)
+            self.record(
+                run_id, entry.path,
+                week_start=datetime.strptime(week, "%Y-%m-%d") if week else None,
+                stages=[s for s in STAGES if any(f in files for f in STAGE_OUTPUTS[s])],
+                complete=bool(stats), summary=summary_stats(stats) if stats else None,
+            )
+            added += 1
+        gone = [run_id for run_id, path in known.items() if run_id not in seen or not os.path.exists(path)]
+        for run_id in gone:
+            self.forget(run_id)
+        return added, len(gone)
+
+    @staticmethod
+    def _read_member(path, filename):
+        """Text of a file in a run folder or archive, None when it is not there"""
+        try:
+            if path.endswith(".zip"):
+                with zipfile.ZipFile(path) as archive:
+                    return archive.read(filename).decode("utf-8")
+            with open(os.path.join(path, filename), newline='') as f:
+                return f.read()
+        except (OSError, KeyError, UnicodeDecodeError, zipfile.BadZipFile):
+            return None
+
+    @staticmethod
+    def _run_files(path):
+        """Names of the files in a run folder or archive"""
+        try:
+            if path.endswith(".zip"):
+                with zipfile.ZipFile(path) as archive:
+                    return archive.namelist()
+            return os.listdir(path)
+        except (OSError, zipfile.BadZipFile):
+            return []
+
+    def _read_summary(self, path):
+        """A run's summary.json (from its folder or archive) as a dict, {} when it has none"""
+        try:
+            return json.loads(self._read_member(path, RUN_COMPLETE_MARKER) or "{}")
+        except ValueError:
+            return {}
+
+    def _week_from_outputs(self, path):
+        """Monday ("YYYY-MM-DD") of the first date in a run's dated outputs, None when there is none"""
+        for filename in DATED_OUTPUTS:
+            dates = []
+            for row in csv.DictReader(io.StringIO(self._read_member(path, filename) or "")):
+                try:
+                    dates.append(datetime.strptime((row.get("Date") or "").strip(), "%d/%m/%Y"))
+                except ValueError:
+                    continue
+            if dates:
+                first = min(dates)
+                return (first - timedelta(days=first.weekday())).strftime("%Y-%m-%d")
+        return None
+
+    # --- Listing ---
+
+    @staticmethod
+    def _row(row):
+        run = dict(row)
+        run["stages"] = run["stages"].split(",") if run["stages"] else []
+        run["complete"] = bool(run["complete"])
+        run["archived"] = bool(run["archived"])
+        run["inputs"] = json.loads(run["inputs"] or "{}")
+        run["summary"] = json.loads(run["summary"] or "{}")
+        return run
+
+    def list_runs(self, limit=50, offset=0, week_start=None, complete=None):
+        """One page of runs, newest first; week_start is "YYYY-MM-DD", complete True/False filters"""
+        where, params = [], []
+        if week_start is not None:
+            where.append("week_start = ?")
+            params.append(week_start)
+        if complete is not None:
+            where.append("complete = ?")
+            params.append(int(complete))
+        sql = "SELECT * FROM runs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created DESC LIMIT ? OFFSET ?"
+        return [self._row(row) for row in self.conn.execute(sql, params + [limit, offset])]
+
+    def get(self, run_id):
+        row = self.conn.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return self._row(row) if row is not None else None
+
+    def latest(self, complete=True):
+        """Newest run still in a folder (finished ones only, unless complete is None), or None"""
+        sql = "SELECT * FROM runs WHERE archived = 0"
+        params = []
+        if complete is not None:
+            sql += " AND complete = ?"
+            params.append(int(complete))
+        row = self.conn.execute(sql + " ORDER BY created DESC LIMIT 1", params).fetchone()
+        return self._row(row) if row is not None else None
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    # --- Retention ---
+
+    def superseded_partial_runs(self, grace=timedelta(hours=1), now=None):
+        """
+        Partial runs (no summary: single-stage commands, capacity checks,
+        failed runs) made before a finished run of the same week that ran
+        every stage they did. Runs of an unknown week are never superseded,
+        and runs younger than grace are left alone, as they may still be going.
+        """
+        cutoff = ((now or datetime.now()) - grace).isoformat()
+        rows = self.conn.execute(
+            "SELECT * FROM runs WHERE complete = 0 AND archived = 0 AND week_start IS NOT NULL "
+            "AND created < ? ORDER BY created",
+            (cutoff,),
+        )
+        superseded = []
+        for run in [self._row(row) for row in rows]:
+            later = self.conn.execute(
+                "SELECT stages FROM runs WHERE complete = 1 AND week_start = ? AND created > ?",
+                (run["week_start"], run["created"]),
+            )
+            if any(set(run["stages"]) <= set(row["stages"].split(",")) for row in later):
+                superseded.append(run)
+        return superseded
+
+    def compressible_runs(self, older_than=timedelta(days=14), now=None):
+        """
+        Run folders created before older_than ago, except each week's newest
+        finished run (the one reports, diffs and warm starts read), the
+        newest finished run overall and runs of an unknown week.
+        """
+        cutoff = ((now or datetime.now()) - older_than).isoformat()
+        newest = self.latest()
+        rows = self.conn.execute(
+            "SELECT * FROM runs AS r WHERE archived = 0 AND week_start IS NOT NULL AND created < ? "
+            "AND NOT (complete = 1 AND NOT EXISTS (SELECT 1 FROM runs AS c WHERE c.complete = 1 "
+            "AND c.week_start = r.week_start AND c.created > r.created)) ORDER BY created",
+            (cutoff,),
+        )
+        return [self._row(row) for row in rows if newest is None or row["run_id"] != newest["run_id"]]
+
+    def compress(self, run):
+        """Replace a run folder with Output/<run id>.zip; returns the archive path"""
+        base = os.path.join(self.output_root, run["run_id"])
+        archive = shutil.make_archive(base, "zip", root_dir=run["path"])
+        shutil.rmtree(run["path"])
+        with self._write_lock, self.conn:
+            self.conn.execute("UPDATE runs SET path = ?, archived = 1 WHERE run_id = ?", (archive, run["run_id"]))
+        return archive
+
+    def apply_retention(self, older_than=timedelta(days=14), grace=timedelta(hours=1), now=None, dry_run=False):
+        """
+        Delete superseded partial runs, then zip run folders older than
+        older_than (see compressible_runs). With dry_run nothing is touched.
+        Returns {"removed": [run ids], "compressed": [run ids]}.
+        """
+        removed = self.superseded_partial_runs(grace, now)
+        if not dry_run:
+            for run in removed:
+                shutil.rmtree(run["path"], ignore_errors=True)
+                self.forget(run["run_id"])
+        compressed = self.compressible_runs(older_than, now)
+        if dry_run:
+            removed_ids = {run["run_id"] for run in removed}
+            compressed = [run for run in compressed if run["run_id"] not in removed_ids]
+        else:
+            for run in compressed:
+                self.compress(run)
+        return {"removed": [run["run_id"] for run in removed], "compressed": [run["run_id"] for run in compressed]}
+
+
+def completed_runs(output_root="Output"):
+    """Output/<timestamp> directories that finished a full run, oldest first"""
+    if not os.path.isdir(output_root):
+        return []
+    runs = [
+        entry.path for entry in os.scandir(output_root)
+        if entry.is_dir() and os.path.exists(os.path.join(entry.path, RUN_COMPLETE_MARKER))
+    ]
+    return sorted(runs, key=os.path.basename)
+
+
+def latest_run_dir(output_root="Output"):
+    """Newest Output/<timestamp> directory that finished a full run, or None"""
+    # One indexed query when the run catalog exists, instead of checking every folder
+    if os.path.exists(os.path.join(output_root, CATALOG_NAME)):
+        catalog = RunCatalog(output_root)
+        try:
+            run = catalog.latest()
+        finally:
+            catalog.close()
+        if run is not None and os.path.isdir(run["path"]):
+            return run["path"]
+    runs = completed_runs(output_root)
+    return runs[-1] if runs else None
+
+
+def run_label(run):
+    """One line describing a catalogued run, for listings"""
+    status = "complete" if run["complete"] else "partial"
+    if run["archived"]:
+        status += ", zipped"
+    stages = ", ".join(run["stages"]) or "no stages"
+    return f"{run['run_id']}  week {run['week_start'] or '?'}  {stages}  ({status})"
@@ -0,0 +1,219 @@
+import os
+
+import pandas as pd
+
+from .timetable import PERIOD_COLUMN, SLOT_COLUMN
+
+# category -> (output file, who the rows belong to)
+DIFF_SOURCES = {
+    "campers": ("camper_assignments.csv", "camper"),
+    "skills": ("skills_schedule.csv", "staff"),
+    "coverage": ("coverage_schedule.csv", "staff"),
+    "freetime": ("freetime_schedule.csv", "staff"),
+    "time_off": ("time_off_results.csv", "staff"),
+}
+
+CHANGE_COLUMNS = ["category", "kind", "id", "slot", "before", "after", "change"]
+
+
+def load_run_outputs(run_dir):
+    """{filename: DataFrame} for the diffable outputs present in a run directory"""
+    outputs = {}
+    for filename, _ in DIFF_SOURCES.values():
+        path = os.path.join(run_dir, filename)
+        if os.path.exists(path):
+            try:
+                outputs[filename] = pd.read_csv(path, dtype=str, keep_default_na=False)
+            except pd.errors.EmptyDataError:
+                continue
+    return outputs
+
+
+def as_frame(content):
+    """Output content as written by _write_output (DataFrame, list of dicts or rows) -> DataFrame of str"""
+    if isinstance(content, pd.DataFrame):
+        df = content
+    elif content and isinstance(content[0], dict):
+        df = pd.DataFrame(content)
+    elif content:
+        df = pd.DataFrame(content[1:], columns=content[0])
+    else:
+        df = pd.DataFrame()
+    return df.fillna("").astype(str)
+
+
+def _long(category, df):
+    """One row per (id, slot) with its value, the join key for the diff"""
+    if df.empty or "id" not in df.columns:
+        return pd.DataFrame(columns=["id", "slot", "value"])
+    if category == "freetime":
+        long = df[["id", "Day", "Location"]].rename(columns={"Day": "slot", "Location": "value"})
+    else:
+        if category in ("campers", "skills"):
+            slots = [c for c in df.columns if PERIOD_COLUMN.match(c)]
+        elif category == "coverage":
+            slots = [c for c in df.columns if SLOT_COLUMN.match(c)]
+        else:
+            slots = [c for c in ("day_off", "night_off") if c in df.columns]
+        long = df.melt(id_vars="id", value_vars=slots, var_name="slot", value_name="value")
+    long = long[long["id"] != ""]
+    if category == "coverage":
+        long = long[long["value"] != ""]  # an empty coverage cell is no duty, not a value
+    return long.drop_duplicates(["id", "slot"], keep="last")
+
+
+def _people(outputs):
+    """(kind, id) -> {"name", "email"} from the enriched output columns"""
+    people = {}
+    for category, (filename, kind) in DIFF_SOURCES.items():
+        df = outputs.get(filename)
+        if df is None:
+            continue
+        df = as_frame(df)
+        if "id" not in df.columns:
+            continue
+        for col in ("name", "email"):
+            if col not in df.columns:
+                continue
+            for person_id, value in zip(df["id"], df[col]):
+                if value:
+                    people.setdefault((kind, person_id), {}).setdefault(col, value)
+    return people
+
+
+class ScheduleDiff:
+    """
+    Changes between two runs, one row per (category, person, slot).
+
+    change is "added", "removed" or "changed". Categories: campers (moved
+    campers), skills/freetime/time_off (reassigned staff) and coverage.
+    """
+
+    def __init__(self, changes, people):
+        self.changes = changes   # DataFrame with CHANGE_COLUMNS
+        self.people = people
+
+    def __len__(self):
+        return len(self.changes)
+
+    def category(self, name):
+        return self.changes[self.changes["category"] == name]
+
+    @property
+    def moved_campers(self):
+        return sorted(self.category("campers")["id"].unique(), key=id_order)
+
+    @property
+    def reassigned_staff(self):
+        staff = self.changes[self.changes["category"].isin(["skills", "freetime", "time_off"])]
+        return sorted(staff["id"].unique(), key=id_order)
+
+    @property
+    def changed_coverage(self):
+        return self.category("coverage")
+
+    def summary(self):
+        lines = ["== Schedule Changes =="]
+        counts = self.changes["category"].value_counts()
+        for category in DIFF_SOURCES:
+            lines.append(f"{category}: {int(counts.get(category, 0))} change(s)")
+        lines.append(f"Campers moved: {len(self.moved_campers)}")
+        lines.append(f"Staff reassigned: {len(self.reassigned_staff)}")
+        return "\n".join(lines)
+
+    def notifications(self):
+        """
+        Per-person change lists: [{"kind", "id", "name", "email", "changes": [...]}]
+        with one readable line per changed slot.
+        """
+        result = []
+        ordered = self.changes.sort_values(["kind", "id", "category", "slot"], key=_sort_key)
+        for (kind, person_id), rows in ordered.groupby(["kind", "id"], sort=False):
+            info = self.people.get((kind, person_id), {})
+            result.append({
+                "kind": kind,
+                "id": person_id,
+                "name": info.get("name", ""),
+                "email": info.get("email", ""),
+                "changes": [_describe(row) for row in rows.itertuples(index=False)],
+            })
+        return result
+
+    def notification_rows(self):
+        rows = [["kind", "id", "name", "email", "change"]]
+        for person in self.notifications():
+            for line in person["changes"]:
+                rows.append([person["kind"], person["id"], person["name"], person["email"], line])
+        return rows
+
+    def changed_outputs(self, after_outputs):
+        """
+        {filename: DataFrame} holding only the rows of after_outputs whose
+        person changed, for publishing just the updated assignments.
+        """
+        changed = {}
+        for category, (filename, _) in DIFF_SOURCES.items():
+            ids = set(self.category(category)["id"])
+            if not ids or filename not in after_outputs:
+                continue
+            df = as_frame(after_outputs[filename])
+            changed[filename] = df[df["id"].isin(ids)]
+        return changed
+
+
+def id_order(value):
+    return (0, int(value)) if str(value).isdigit() else (1, str(value))
+
+
+def _sort_key(column):
+    if column.name == "id":
+        return column.map(id_order)
+    return column
+
+
+def _describe(row):
+    label = {"campers": "Class", "skills": "Skills", "coverage": "Coverage",
+             "freetime": "Freetime", "time_off": "Time off"}[row.category]
+    if row.change == "added":
+        return f"{label} {row.slot}: now {row.after}"
+    if row.change == "removed":
+        return f"{label} {row.slot}: no longer {row.before}"
+    return f"{label} {row.slot}: {row.before or '(none)'} -> {row.after or '(none)'}"
+
+
+def diff_outputs(before, after):
+    """
+    Compare two runs given as {filename: DataFrame or rows}, e.g. from
+    load_run_outputs or ProgramSchedules.outputs. Each category is one hash
+    join on (id, slot), so the cost is linear in the number of rows.
+    """
+    frames = []
+    for category, (filename, kind) in DIFF_SOURCES.items():
+        if filename not in before and filename not in after:
+            continue
+        old = _long(category, as_frame(before.get(filename, [])))
+        new = _long(category, as_frame(after.get(filename, [])))
+        joined = old.merge(new, on=["id", "slot"], how="outer", suffixes=("_before", "_after"), indicator=True)
+        joined = joined.fillna({"value_before": "", "value_after": ""})
+        joined = joined[(joined["_merge"] != "both") | (joined["value_before"] != joined["value_after"])]
+        if joined.empty:
+            continue
+        change = joined["_merge"].map({"left_only": "removed", "right_only": "added", "both": "changed"}).astype(str)
+        frames.append(pd.DataFrame({
+            "category": category,
+            "kind": kind,
+            "id": joined["id"].values,
+            "slot": joined["slot"].values,
+            "before": joined["value_before"].values,
+            "after": joined["value_after"].values,
+            "change": change.values,
+        }))
+    changes = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=CHANGE_COLUMNS)
+    people = _people(before)
+    people.update(_people(after))
+    return ScheduleDiff(changes, people)
+
+
+def diff_runs(before_dir, after_dir):
+    """Compare two Output/<timestamp> run directories"""
+    return diff_outputs(load_run_outputs(before_dir), load_run_outputs(after_dir))
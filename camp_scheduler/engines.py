@@ -0,0 +1,650 @@
+import random
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+
+from . import reasons
+from .reasons import ReasonLog, GLOBAL
+from .timetable import Timetable
+
+
+def is_consecutive(date1_str, date2_str):
+    """Return True if two dates are consecutive calendar days (in either order)"""
+    try:
+        date1 = datetime.strptime(date1_str, "%d/%m/%Y")
+        date2 = datetime.strptime(date2_str, "%d/%m/%Y")
+        return abs((date1 - date2).days) == 1
+    except:
+        return False
+
+
+def assign_days_off(off_requests, index_data, dates_config, week_start_date, rng=None, shuffle=False):
+    """
+    Assigns a day off and a night off to each staff member who submitted the form.
+
+    off_requests: form rows with 'id' already mapped from the email
+    rng: random source for the automatic fallback (defaults to the random module)
+    shuffle: process requests in a random order instead of form order
+    Returns (assignments, unassigned_log, used_days, used_nights).
+    """
+    rng = rng or random
+
+    # Process blackout periods with 1-day buffer
+    blackout_days = set()
+    for period in dates_config["blackout_periods"].values():
+        start = datetime.strptime(period["start"], "%Y-%m-%d")
+        end = datetime.strptime(period["end"], "%Y-%m-%d")
+        blackout_days.update([
+            start - timedelta(days=1),
+            start,
+            end,
+            end + timedelta(days=1)
+        ])
+
+    # Helper functions
+    def is_valid_date(date_str):
+        try:
+            date = datetime.strptime(date_str, "%d/%m/%Y")
+            return date not in blackout_days
+        except ValueError:
+            return False
+
+    def has_coverage_conflict(staff_id, date_str, time_type):
+        coverage_id = index_data.get(staff_id, {}).get("coverage", "").strip()
+        if not coverage_id:
+            return False
+        co_staff_assignments = staff_assignments.get(coverage_id, {})
+        return co_staff_assignments.get(time_type) == date_str
+
+    # Initialize tracking
+    assignments = []
+    unassigned_log = []
+    used_days = defaultdict(set)
+    used_nights = defaultdict(set)
+    staff_assignments = defaultdict(dict)
+    max_per_slot = max(1, int(len(index_data) * 0.25))
+
+    # Process each staff member
+    if shuffle:
+        off_requests = list(off_requests)
+        rng.shuffle(off_requests)
+    for request in off_requests:
+        person_id = request['id']
+        if person_id not in index_data:
+            continue
+
+        assignment = {
+            'id': person_id,
+            'name': request['name'],
+            'email': request['email'],
+            'day_off': "Unassigned",
+            'night_off': "Unassigned",
+            'notes': request.get('notes', ''),
+            'assignment_type': 'Unassigned'
+        }
+
+        # Try preferred day off
+        day_options = [d for d in [request['first option day'], request['second option day']] if d]
+        for option in day_options:
+            if (is_valid_date(option) and
+                len(used_days[option]) < max_per_slot and
+                not has_coverage_conflict(person_id, option, 'day')):  # New check
+                assignment['day_off'] = option
+                assignment['assignment_type'] = 'Preferred'
+                used_days[option].add(person_id)
+                staff_assignments[person_id]['day'] = option
+                break
+
+        # Try preferred night off
+        night_options = [d for d in [request['first option night'], request['second option night']] if d]
+        for option in night_options:
+            if (is_valid_date(option) and
+                len(used_nights[option]) < max_per_slot and
+                not has_coverage_conflict(person_id, option, 'night') and
+                not (assignment['day_off'] != "Unassigned" and 
+                    is_consecutive(assignment['day_off'], option))):
+                assignment['night_off'] = option
+                assignment['assignment_type'] = 'Preferred'
+                used_nights[option].add(person_id)
+                staff_assignments[person_id]['night'] = option
+                break
+
+        # Automatic assignment fallback
+        all_dates = [
+            (week_start_date + timedelta(days=x)).strftime("%d/%m/%Y") 
+            for x in range(7)
+        ]
+        valid_dates = [d for d in all_dates if is_valid_date(d)]
+
+        if assignment['day_off'] == "Unassigned":
+            available_days = [
+                d for d in valid_dates 
+                if (len(used_days[d]) < max_per_slot and
+                    not has_coverage_conflict(person_id, d, 'day'))
+            ]
+            if available_days:
+                day_off = rng.choice(available_days)
+                assignment['day_off'] = day_off
+                assignment['assignment_type'] = 'Automatic'
+                used_days[day_off].add(person_id)
+                staff_assignments[person_id]['day'] = day_off
+
+        if assignment['night_off'] == "Unassigned":
+            available_nights = [
+                d for d in valid_dates 
+                if (len(used_nights[d]) < max_per_slot and
+                    not has_coverage_conflict(person_id, d, 'night') and
+                    not (assignment['day_off'] != "Unassigned" and 
+                        is_consecutive(assignment['day_off'], d)))
+            ]
+            if available_nights:
+                night_off = rng.choice(available_nights)
+                assignment['night_off'] = night_off
+                assignment['assignment_type'] = 'Automatic'
+                used_nights[night_off].add(person_id)
+                staff_assignments[person_id]['night'] = night_off
+
+        assignments.append(assignment)
+
+        # Log unassigned
+        if assignment['day_off'] == "Unassigned" or assignment['night_off'] == "Unassigned":
+            reason = []
+            if assignment['day_off'] == "Unassigned":
+                reason.append("day: no valid slot")
+            if assignment['night_off'] == "Unassigned":
+                reason.append("night: no valid slot")
+            unassigned_log.append({**assignment, 'reason': "; ".join(reason)})
+
+    return assignments, unassigned_log, used_days, used_nights
+
+
+# Classes a staff member may only teach with a certification (index.csv column)
+CERTIFICATIONS = {
+    "Waterfront": "lifeguard certification",
+    "Archery": "archery certification",
+    "High Ropes": "high ropes certification",
+    "Fishing": "fishing proficiency",
+}
+
+
+def is_certified(class_name, info):
+    """Whether a staff member (row from index.csv) may teach the class"""
+    column = CERTIFICATIONS.get(class_name)
+    return column is None or info[column] == "Yes"
+
+
+def staff_role(class_name, info):
+    """Role of a non-coordinator teaching the class"""
+    if class_name == "Fishing" and info["fishing proficiency"] == "Yes":
+        return "lead"
+    return "assistant"
+
+
+def assign_staff_patterns(class_configs, fixed_off_periods, staff_data, timetable=None, seed=None):
+    """
+    Builds the fixed weekly pattern (one entry per period) for each staff member.
+
+    staff_data: {staff_id: row from index.csv}
+    timetable: Timetable with the periods of the day (defaults to P1-P3)
+    seed: {staff_id: pattern} of slots kept from a previous run (see
+          warmstart.seed_staff_patterns); they are taken out of the needs
+          and only the remaining slots are filled
+    Returns (staff_weekly_pattern, period_class_needs); the needs left over
+    are the staff slots no one could fill.
+    """
+    timetable = timetable or Timetable()
+    periods = timetable.periods
+
+    # --- 1. Assign fixed weekly pattern for each staff member ---
+
+    period_class_needs = {p: [] for p in periods}
+    for class_name, config in class_configs.items():
+        for period in config["preferred_periods"]:
+            if period not in period_class_needs or not timetable.fits(config, period):
+                continue
+            for n in range(config["staff_required"]):
+                period_class_needs[period].append((class_name, config))
+
+    seed = seed or {}
+    for pattern in seed.values():
+        for i, slot in enumerate(pattern):
+            # A span's slots share its class; its need is listed at the start period
+            if not slot or slot["class"] in ("OFF", "Help") or (i and pattern[i - 1] and pattern[i - 1]["class"] == slot["class"]):
+                continue
+            needs = period_class_needs[periods[i]]
+            needs.pop(next(k for k, (class_name, _) in enumerate(needs) if class_name == slot["class"]))
+
+    staff_weekly_pattern = {}
+    assigned_classes = set()
+    for staff_id, info in staff_data.items():
+        pattern = list(seed[staff_id]) if staff_id in seed else [None] * len(periods)
+        for class_name, config in class_configs.items():
+            if staff_id in config.get("coordinators", []):
+                for i, period in enumerate(periods):
+                    if period in config["preferred_periods"]:
+                        if not timetable.fits(config, period):
+                            continue
+                        pattern[i] = {"class": class_name, "role": "lead"}
+                        assigned_classes.add((period, class_name, staff_id))
+                        break
+        staff_weekly_pattern[staff_id] = pattern
+
+    # --- UPDATED: Use new fixed_skills_off.json structure ---
+    for staff_id, off_periods in fixed_off_periods.items():
+        pattern = staff_weekly_pattern.get(int(staff_id), [None] * len(periods))
+        for i, period in enumerate(periods):
+            if period in off_periods and pattern[i] is None:
+                pattern[i] = {"class": "OFF", "role": "none"}
+                break
+        staff_weekly_pattern[int(staff_id)] = pattern
+
+    for staff_id, info in staff_data.items():
+        pattern = staff_weekly_pattern.get(staff_id, [None] * len(periods))
+
+        # Determine which period to assign OFF first (if not fixed already)
+        off_assigned = any(x and x["class"] == "OFF" for x in pattern)
+        if not off_assigned:
+            # Find period with least demand to assign OFF
+            period_off_candidates = sorted(periods, key=lambda p: len(period_class_needs[p]))
+            for p in period_off_candidates:
+                if pattern[timetable.period_index[p]] is None:
+                    pattern[timetable.period_index[p]] = {"class": "OFF", "role": "none"}
+                    break
+
+        # Assign two classes
+        assigned_count = sum(1 for x in pattern if x and x["class"] not in ("OFF", "Help"))
+        for i, period in enumerate(periods):
+            if pattern[i] is not None or assigned_count >= 2:
+                continue
+            for idx, (class_name, config) in enumerate(period_class_needs[period]):
+                if staff_id in config.get("coordinators", []):
+                    continue
+                if any(x and x.get("class") == class_name for x in pattern):
+                    continue
+                if not is_certified(class_name, info):
+                    continue
+
+                # Handle multi-period spans (double periods)
+                span = timetable.span(config, period)
+                if timetable.span_length(config) > 1:
+                    if not timetable.fits(config, period):
+                        continue  # No room for the whole span before the end of the day
+                    if any(pattern[i + k] is not None for k in range(1, len(span))):
+                        continue  # Later period already filled
+                    # Assign every period of the span
+                    role = staff_role(class_name, info)
+                    for k, q in enumerate(span):
+                        pattern[i + k] = {"class": class_name, "role": role}
+                        assigned_classes.add((q, class_name, staff_id))
+                    del period_class_needs[period][idx]
+                    assigned_count += len(span)
+                    break
+                else:
+                    role = staff_role(class_name, info)
+                    pattern[i] = {"class": class_name, "role": role}
+                    assigned_classes.add((period, class_name, staff_id))
+                    del period_class_needs[period][idx]
+                    assigned_count += 1
+                    break
+
+        # Fallback fill: if any unassigned left, mark as Help (but ensure exactly 1 OFF remains)
+        off_count = sum(1 for x in pattern if x and x["class"] == "OFF")
+        for i in range(len(periods)):
+            if pattern[i] is None:
+                if off_count < 1:
+                    pattern[i] = {"class": "OFF", "role": "none"}
+                    off_count += 1
+                else:
+                    pattern[i] = {"class": "Help", "role": "none"}
+
+        staff_weekly_pattern[staff_id] = pattern
+
+    return staff_weekly_pattern, period_class_needs
+
+
+# Rank charged for a class the camper did not list (final-pass placements)
+UNRANKED_RANK = 6
+
+
+class CamperAssignment:
+    """Result of assign_campers: per-camper classes, inactive classes and reasons"""
+
+    def __init__(self, campers, class_configs, assignments, inactive_classes, unassign_reasons, timetable=None,
+                 groups=None):
+        self.campers = campers                    # sorted by submission_time
+        self.class_configs = class_configs
+        self.assignments = assignments            # camper_id -> period -> class
+        self.inactive_classes = inactive_classes  # set of (class, period)
+        self.unassign_reasons = unassign_reasons  # ReasonLog, rendered per camper on demand
+        self.timetable = timetable or Timetable()
+        self.groups = groups or {}                # group placement counts, when campers were grouped
+        self.pinned = set()                       # (camper_id, class) seated with a group; later moves keep them
+
+    def missing_periods(self, camper_id):
+        """Periods not covered by a class (a multi-period class covers its span from each stored period)"""
+        covered = set()
+        for p, cname in self.assignments[camper_id].items():
+            covered.update(self.timetable.span(self.class_configs.get(cname, {}), p) or (p,))
+        return [p for p in self.timetable.periods if p not in covered]
+
+    def unassigned_campers(self):
+        return [c['id'] for c in self.campers if self.missing_periods(c['id'])]
+
+    def preference_ranks(self):
+        """Count of classes received by choice rank ("1".."5", or "unranked")"""
+        rank_counts = defaultdict(int)
+        for camper in self.campers:
+            choices = [camper.get(f'class{i}') for i in range(1, 6)]
+            for cname in set(self.assignments[camper['id']].values()):
+                rank = str(choices.index(cname) + 1) if cname in choices else "unranked"
+                rank_counts[rank] += 1
+        return {k: rank_counts[k] for k in sorted(rank_counts)}
+
+    def enrollment(self):
+        """(class, period) -> number of campers"""
+        enrolled = defaultdict(int)
+        for camper in self.campers:
+            for p, cname in self.assignments[camper['id']].items():
+                enrolled[(cname, p)] += 1
+        return enrolled
+
+
+def assign_campers(class_configs, campers, rng=None, timetable=None, reason_limit=None, seed=None, groups=None):
+    """
+    Greedy camper-to-class assignment by preference rank, FIFO on submission_time.
+
+    campers: rows from camper_choices.csv (not modified)
+    rng: optional random.Random; when given, ties in submission_time, the camper
+         order within each preference rank and the class order are randomized
+    timetable: Timetable with the periods of the day (defaults to P1-P3)
+    reason_limit: most unassignment reasons kept per camper (all when None)
+    seed: {camper_id: {period: class}} kept from a previous run (see
+          warmstart.seed_camper_assignments); placed before the first pass
+    groups: lists of camper ids to place together (see groups.camper_groups).
+            Each group is one unit that asks for every class all of its
+            members chose, in the first pass, at its members' worst rank for
+            the class and after its last member, so it never takes a seat
+            from a camper who would have been placed before any member. A
+            group seated together nowhere is halved and its halves try the
+            seats left. Whatever a group leaves open is filled per camper as
+            usual. The result's groups stats count the campers seated
+            together, the splits, the classes shared and the rank cost
+            (ranks members accepted below their own to share a class).
+    Returns a CamperAssignment.
+    """
+    timetable = timetable or Timetable()
+    periods = timetable.periods
+    num_periods = len(periods)
+
+    # Random tie-break keys (camper ID order when no rng is given)
+    if rng is not None:
+        tie_break = {camper['id']: rng.random() for camper in campers}
+    else:
+        tie_break = {camper['id']: int(camper['id']) for camper in campers}
+
+    # Sort campers by submission_time (earlier submissions first)
+    if rng is not None:
+        campers = sorted(campers, key=lambda x: (x.get("submission_time", "9999-12-31T23:59:59"), tie_break[x['id']]))
+    else:
+        campers = sorted(campers, key=lambda x: x.get("submission_time", "9999-12-31T23:59:59"))
+
+    unassign_reasons = ReasonLog([camper['id'] for camper in campers], timetable, class_configs, reason_limit)
+    add_reason = unassign_reasons.add
+
+    # Build demand list with weights
+    class_demand = defaultdict(list)  # class -> list of (weight, camper_id, camper_data, group unit or None)
+    for camper in campers:
+        for i in range(1, 6):
+            choice = camper[f'class{i}']
+            if choice and choice in class_configs:
+                class_demand[choice].append((i, camper['id'], camper, None))
+            elif choice and choice not in class_configs:
+                add_reason(camper['id'], GLOBAL, reasons.CHOICE_NOT_CONFIGURED, choice)
+
+    # Groups: contracted to one unit each, demanding every class all of its
+    # members chose at the worst rank among them, in the place of its last
+    # member, so a unit never goes ahead of a camper it would not follow alone
+    group_stats = {}
+    pinned = set()
+    units = []
+    choice_ranks = {}  # camper_id -> {class: rank}, for grouped campers
+
+    def unit_choices(unit):
+        """(class, worst rank among the members) for every configured class all members chose, best first"""
+        shared = [c for c in choice_ranks[unit[0]] if c in class_configs and all(c in choice_ranks[m] for m in unit)]
+        return sorted(((c, max(choice_ranks[m][c] for m in unit)) for c in shared), key=lambda x: x[1])
+
+    if groups:
+        for camper in campers:
+            ranks = choice_ranks[camper['id']] = {}
+            for i in range(1, 6):
+                if camper[f'class{i}']:
+                    ranks.setdefault(camper[f'class{i}'], i)
+        units = [[m for m in group if m in choice_ranks] for group in groups]
+        units = [sorted(u, key=tie_break.get) for u in units if len(u) > 1]
+        group_stats = {"groups": len(units), "campers": sum(map(len, units)), "seated_together": 0, "splits": 0,
+                       "classes_together": 0, "rank_cost": 0}
+        for unit in units:
+            for class_name, weight in unit_choices(unit):
+                class_demand[class_name].append((weight, unit[-1], None, unit))
+
+    # Sort demand FIFO style with preference weighting (a unit just before a camper in the same place)
+    for class_name in class_demand:
+        class_demand[class_name].sort(key=lambda x: (x[0], tie_break[x[1]], x[3] is None))
+    if rng is not None:
+        class_order = list(class_demand)
+        rng.shuffle(class_order)
+        class_demand = {class_name: class_demand[class_name] for class_name in class_order}
+
+    # Assignments and tracking
+    camper_assignments = defaultdict(dict)  # camper_id -> period -> class
+    class_rosters = defaultdict(lambda: defaultdict(list))  # class -> period -> list of camper ids
+    inactive_classes = set()
+
+    # Helper: Check if camper already has this class (single or multi-period)
+    def camper_has_class(camper_id, class_name):
+        return class_name in camper_assignments[camper_id].values()
+
+    def span_free(camper_id, span):
+        return not any(q in camper_assignments[camper_id] for q in span)
+
+    def enroll(camper_id, class_name, span):
+        for q in span:
+            camper_assignments[camper_id][q] = class_name
+            class_rosters[class_name][q].append(camper_id)
+
+    # Placements kept from a previous run, in FIFO order so any overfill trims the latest
+    if seed:
+        for camper in campers:
+            for p, class_name in sorted(seed.get(camper['id'], {}).items()):
+                enroll(camper['id'], class_name, (p,))
+
+    def place_unit(unit, class_name, weight):
+        """
+        Seat the unit in one period of the class, joining members who already
+        hold it there; returns whether it is now seated together.
+        """
+        config = class_configs[class_name]
+        camper_limit = 8 * config.get("staff_required", 1)
+        for p in sorted(config.get("preferred_periods", [])):
+            span = timetable.span(config, p)
+            if not span:
+                continue
+            joining = [m for m in unit if any(camper_assignments[m].get(q) != class_name for q in span)]
+            if any(camper_has_class(m, class_name) or not span_free(m, span) for m in joining):
+                continue
+            if any(len(class_rosters[class_name][q]) + len(joining) > camper_limit for q in span):
+                continue
+            for m in joining:
+                enroll(m, class_name, span)
+                # What members gave up to be together: ranks below their own for this class
+                group_stats["rank_cost"] += weight - choice_ranks[m][class_name]
+            for m in unit:
+                pinned.add((m, class_name))
+            group_stats["classes_together"] += 1
+            return True
+        return False
+
+    # First pass: assign up to one class per period
+    together = set()  # units seated together in at least one class
+    for priority in range(1, 6):
+        for class_name, demand_list in class_demand.items():
+            config = class_configs.get(class_name, {})
+            preferred_periods = config.get("preferred_periods", [])
+            is_multi = timetable.span_length(config) > 1
+
+            for weight, camper_id, camper, unit in demand_list:
+                if weight != priority:
+                    continue
+                if unit is not None:
+                    if place_unit(unit, class_name, weight):
+                        together.add(tuple(unit))
+                    continue
+                if len(camper_assignments[camper_id]) >= num_periods:
+                    continue
+
+                assigned = False
+                for p in sorted(preferred_periods):
+                    if camper_has_class(camper_id, class_name):
+                        add_reason(camper_id, p, reasons.ALREADY_HAS_CLASS, class_name)
+                        continue
+                    staff_count = config.get("staff_required", 1)
+                    camper_limit = 8 * staff_count
+
+                    if len(class_rosters[class_name][p]) >= camper_limit:
+                        add_reason(camper_id, p, reasons.CLASS_FULL, class_name)
+                        continue
+
+                    span = timetable.span(config, p)
+                    if not span:
+                        continue
+                    if span_free(camper_id, span):
+                        enroll(camper_id, class_name, span)
+                        assigned = True
+                        break
+                    if is_multi:
+                        # Spans cut short at the end of the day only need their last period
+                        code = reasons.SPAN_TAKEN if len(span) > 1 else reasons.SPAN_CUT_SHORT
+                        add_reason(camper_id, p, code, class_name)
+                    else:
+                        add_reason(camper_id, p, reasons.PERIOD_TAKEN)
+                if assigned and len(camper_assignments[camper_id]) >= num_periods:
+                    break
+
+    # Units seated nowhere together are halved (in FIFO order) and each half
+    # that is still a group tries its shared choices in the seats left
+    retry = deque(unit for unit in units if tuple(unit) not in together)
+    while retry:
+        unit = retry.popleft()
+        half = (len(unit) + 1) // 2
+        group_stats["splits"] += 1
+        for h in (unit[:half], unit[half:]):
+            if len(h) < 2:
+                continue
+            for class_name, weight in unit_choices(h):
+                if place_unit(h, class_name, weight):
+                    together.add(tuple(h))
+            if tuple(h) not in together:
+                retry.append(h)
+    if group_stats:
+        group_stats["seated_together"] = sum(len(unit) for unit in together)
+
+    # Enforce camper limit: 8 campers per staff
+    for class_name, period_map in class_rosters.items():
+        for period, camper_list in period_map.items():
+            config = class_configs[class_name]
+            staff_count = config.get("staff_required", 1)
+            camper_limit = 8 * staff_count
+            if len(camper_list) > camper_limit:
+                overfill = camper_list[camper_limit:]
+                class_rosters[class_name][period] = camper_list[:camper_limit]
+                for camper_id in overfill:
+                    del camper_assignments[camper_id][period]
+                    add_reason(camper_id, period, reasons.OVERFILL_REMOVED, class_name)
+
+    # Identify underfilled classes
+    for class_name, period_map in class_rosters.items():
+        for period, roster in period_map.items():
+            staff_count = class_configs[class_name]["staff_required"]
+            if len(roster) < 3 * staff_count:
+                inactive_classes.add((class_name, period))
+
+    # Remove inactive class assignments
+    for camper in campers:
+        camper_id = camper['id']
+        periods_to_remove = [p for p, cname in camper_assignments[camper_id].items() if (cname, p) in inactive_classes]
+        for p in periods_to_remove:
+            cname = camper_assignments[camper_id][p]
+            del camper_assignments[camper_id][p]
+            add_reason(camper_id, p, reasons.WENT_INACTIVE, cname)
+
+    # Refill with preferred classes
+    for camper in campers:
+        camper_id = camper['id']
+        if len(camper_assignments[camper_id]) >= num_periods:
+            continue
+
+        for i in range(1, 6):
+            cname = camper[f'class{i}']
+            config = class_configs.get(cname, {})
+            if not config:
+                add_reason(camper_id, GLOBAL, reasons.CLASS_NOT_CONFIGURED, cname)
+                continue
+            preferred_periods = config.get("preferred_periods", [])
+            is_multi = timetable.span_length(config) > 1
+            staff_count = config.get("staff_required", 1)
+            camper_limit = 8 * staff_count
+
+            for p in sorted(preferred_periods):
+                if camper_has_class(camper_id, cname):
+                    add_reason(camper_id, p, reasons.ALREADY_ELSEWHERE, cname)
+                    continue
+                span = timetable.span(config, p)
+                if span and span_free(camper_id, span) and len(class_rosters[cname][p]) < camper_limit:
+                    enroll(camper_id, cname, span)
+                elif is_multi:
+                    add_reason(camper_id, p, reasons.DOUBLE_NOT_ASSIGNABLE, cname)
+                else:
+                    add_reason(camper_id, p, reasons.NOT_ASSIGNABLE, cname)
+                if len(camper_assignments[camper_id]) >= num_periods:
+                    break
+            if len(camper_assignments[camper_id]) >= num_periods:
+                break
+
+    # FINAL assignment pass: assign any camper with missing periods to ANY open class
+    for camper in campers:
+        camper_id = camper['id']
+        if len(camper_assignments[camper_id]) >= num_periods:
+            continue
+        for p in periods:
+            if p in camper_assignments[camper_id]:
+                continue
+            assigned = False
+            for cname, config in class_configs.items():
+                if not config.get("camper_assignable", True):
+                    add_reason(camper_id, p, reasons.NOT_CAMPER_ASSIGNABLE, cname)
+                    continue
+                if camper_has_class(camper_id, cname):
+                    add_reason(camper_id, p, reasons.ALREADY_ELSEWHERE, cname)
+                    continue
+                if p not in config.get("preferred_periods", []):
+                    add_reason(camper_id, p, reasons.NOT_OFFERED, cname)
+                    continue
+                staff_count = config.get("staff_required", 1)
+                camper_limit = 8 * staff_count
+                if len(class_rosters[cname][p]) >= camper_limit:
+                    add_reason(camper_id, p, reasons.CLASS_FULL, cname)
+                    continue
+                span = timetable.span(config, p)
+                if span_free(camper_id, span):
+                    enroll(camper_id, cname, span)
+                    assigned = True
+                    break
+                if timetable.span_length(config) > 1:
+                    add_reason(camper_id, p, reasons.DOUBLE_NOT_ASSIGNABLE, cname)
+            if not assigned:
+                add_reason(camper_id, p, reasons.NO_CLASS)
+
+    result = CamperAssignment(campers, class_configs, camper_assignments, inactive_classes, unassign_reasons, timetable,
+                              groups=group_stats)
+    result.pinned = {(m, c) for m, c in pinned if c in camper_assignments[m].values()}
+    return result
@@ -0,0 +1,184 @@
+import numpy as np
+
+from .timetable import WEEKDAYS, PERIODS
+
+UNASSIGNED = -1
+NO_COVER = -1
+
+# Class codes 0 and 1 are reserved for the two non-teaching slots
+OFF = 0
+HELP = 1
+
+ROLES = ["none", "lead", "assistant"]
+ROLE_NONE, ROLE_LEAD, ROLE_ASSISTANT = range(3)
+
+
+class Interner:
+    """Two-way table between names and small integer codes"""
+
+    def __init__(self, names=()):
+        self.names = []
+        self.codes = {}
+        for name in names:
+            self.code(name)
+
+    def code(self, name):
+        """Return the code for name, adding it to the table if needed"""
+        code = self.codes.get(name)
+        if code is None:
+            code = len(self.names)
+            self.codes[name] = code
+            self.names.append(name)
+        return code
+
+    def get(self, name, default=UNASSIGNED):
+        return self.codes.get(name, default)
+
+    def name(self, code):
+        return self.names[code] if code >= 0 else None
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.codes
+
+
+class ScheduleGrid:
+    """
+    Compact staff x day x period schedule.
+
+    class_codes holds interned class codes (int16, UNASSIGNED when empty) and
+    roles the parallel role codes. cover_for holds the staff index being covered
+    in that slot, and freetime the interned location for each staff member and day.
+    """
+
+    def __init__(self, staff_ids, days=WEEKDAYS, periods=PERIODS, class_names=()):
+        self.staff_ids = [int(s) for s in staff_ids]
+        self.staff_index = {sid: i for i, sid in enumerate(self.staff_ids)}
+        self.days = list(days)
+        self.day_index = {d: i for i, d in enumerate(self.days)}
+        self.periods = list(periods)
+        self.period_index = {p: i for i, p in enumerate(self.periods)}
+        self.classes = Interner(["OFF", "Help"] + list(class_names))
+        self.locations = Interner()
+
+        shape = (len(self.staff_ids), len(self.days), len(self.periods))
+        self.class_codes = np.full(shape, UNASSIGNED, dtype=np.int16)
+        self.roles = np.zeros(shape, dtype=np.int8)
+        self.cover_for = np.full(shape, NO_COVER, dtype=np.int32)
+        self.freetime = np.full(shape[:2], UNASSIGNED, dtype=np.int16)
+
+    # --- Writing ---
+
+    def set_pattern(self, staff_id, pattern):
+        """Store a weekly pattern (one entry per period) on every day at once"""
+        i = self.staff_index[int(staff_id)]
+        for j, entry in enumerate(pattern):
+            if not entry:
+                continue
+            self.class_codes[i, :, j] = self.classes.code(entry["class"])
+            self.roles[i, :, j] = ROLES.index(entry.get("role", "none"))
+
+    def set_location(self, staff_id, day, location):
+        self.freetime[self.staff_index[int(staff_id)], self.day_index[day]] = self.locations.code(location)
+
+    # --- Queries ---
+
+    def entry(self, staff_id, day, period):
+        """Return {"class", "role"} for one slot, or None when unassigned"""
+        i = self.staff_index[int(staff_id)]
+        code = self.class_codes[i, self.day_index[day], self.period_index[period]]
+        if code == UNASSIGNED:
+            return None
+        role = self.roles[i, self.day_index[day], self.period_index[period]]
+        return {"class": self.classes.name(code), "role": ROLES[role]}
+
+    def teaching_mask(self):
+        """Boolean staff x day x period array of slots spent on a class"""
+        return self.class_codes > HELP
+
+    def free_staff(self, day, period):
+        """Staff not teaching in the given slot (OFF, Help or unassigned)"""
+        free = ~self.teaching_mask()[:, self.day_index[day], self.period_index[period]]
+        return [self.staff_ids[i] for i in np.flatnonzero(free)]
+
+    def class_roster(self, day, period, class_name):
+        """List of (staff_id, role) teaching class_name in the given slot"""
+        code = self.classes.get(class_name)
+        d, p = self.day_index[day], self.period_index[period]
+        rows = np.flatnonzero(self.class_codes[:, d, p] == code)
+        return [(self.staff_ids[i], ROLES[self.roles[i, d, p]]) for i in rows]
+
+    def staff_at(self, day, location):
+        """Staff assigned to a freetime location on the given day"""
+        code = self.locations.get(location)
+        rows = np.flatnonzero(self.freetime[:, self.day_index[day]] == code)
+        return [self.staff_ids[i] for i in rows]
+
+    def unassigned_slots(self):
+        """(staff_id, day, period) for every slot without a class, OFF or Help"""
+        return [
+            (self.staff_ids[i], self.days[d], self.periods[p])
+            for i, d, p in np.argwhere(self.class_codes == UNASSIGNED)
+        ]
+
+    # --- Adapters to the CSV layouts ---
+
+    def _label(self, code, role):
+        if code == UNASSIGNED:
+            return "Unassigned"
+        if code == OFF:
+            return "OFF"
+        if code == HELP:
+            return "Help"
+        if role == ROLE_LEAD:
+            return f"Lead {self.classes.name(code)}"
+        if role == ROLE_ASSISTANT:
+            return f"Assistant {self.classes.name(code)}"
+        return "Unassigned"
+
+    def to_skills_rows(self, names, day=None):
+        """id,name,P1..Pn rows for the weekly pattern (first day unless given)"""
+        d = self.day_index[day] if day else 0
+        rows = [["id", "name"] + [f"P{p}" for p in self.periods]]
+        for i, staff_id in enumerate(self.staff_ids):
+            row = [staff_id, names.get(staff_id, "")]
+            for j in range(len(self.periods)):
+                row.append(self._label(self.class_codes[i, d, j], self.roles[i, d, j]))
+            rows.append(row)
+        return rows
+
+    def to_coverage_rows(self):
+        """id,'<Day> P<n>'... rows with 'Cover for <id>' cells"""
+        header = ["id"] + [f"{day} P{p}" for day in self.days for p in self.periods]
+        rows = [header]
+        flat = self.cover_for.reshape(len(self.staff_ids), -1)
+        for i, staff_id in enumerate(self.staff_ids):
+            row = [staff_id]
+            for covered in flat[i]:
+                row.append(f"Cover for {self.staff_ids[covered]}" if covered != NO_COVER else "")
+            rows.append(row)
+        return rows
+
+    def to_freetime_rows(self, day_to_date):
+        """Day,Date,Location,id rows grouped by day and location"""
+        rows = [["Day", "Date", "Location", "id"]]
+        for d, day in enumerate(self.days):
+            codes = self.freetime[:, d]
+            assigned = np.flatnonzero(codes != UNASSIGNED)
+            # Stable sort keeps staff order within each location
+            for i in assigned[np.argsort(codes[assigned], kind="stable")]:
+                rows.append([day, day_to_date[day], self.locations.name(codes[i]), self.staff_ids[i]])
+        return rows
+
+    def class_assignments(self):
+        """Nested {day: {period: {class: [(staff_id, role)]}}} view of the teaching slots"""
+        result = {}
+        for i, d, p in np.argwhere(self.teaching_mask()):
+            class_name = self.classes.name(self.class_codes[i, d, p])
+            day_map = result.setdefault(self.days[d], {})
+            day_map.setdefault(self.periods[p], {}).setdefault(class_name, []).append(
+                (self.staff_ids[i], ROLES[self.roles[i, d, p]])
+            )
+        return result
@@ -0,0 +1,74 @@
+import re
+
+GROUP_SOURCES = ["friends", "cabin"]
+
+FRIEND_SEPARATORS = re.compile(r"[;,\s]+")
+
+
+class UnionFind:
+    """Disjoint sets over hashable items, with path halving and union by size"""
+
+    def __init__(self, items=()):
+        self.parent = {}
+        self.size = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a
+
+    def groups(self):
+        """{root: [items]} in insertion order"""
+        groups = {}
+        for item in self.parent:
+            groups.setdefault(self.find(item), []).append(item)
+        return groups
+
+
+def camper_groups(campers, by="friends"):
+    """
+    Campers who asked to be placed together, as lists of camper ids.
+
+    by="friends": the optional friends column lists camper ids (separated by
+    commas, semicolons or spaces); requests link both ways and chain, so
+    friends of friends end up in one group. Unknown ids are ignored.
+    by="cabin": campers sharing a cabin form a group.
+    Only groups of two or more are returned, in the order of their first
+    member in `campers`.
+    """
+    if by not in GROUP_SOURCES:
+        raise ValueError(f"Unknown camper grouping: {by} (expected one of {GROUP_SOURCES})")
+    ids = [camper['id'] for camper in campers]
+    sets = UnionFind(ids)
+    if by == "friends":
+        known = set(ids)
+        for camper in campers:
+            for friend in FRIEND_SEPARATORS.split(camper.get("friends") or ""):
+                if friend in known and friend != camper['id']:
+                    sets.union(camper['id'], friend)
+    else:
+        first_in_cabin = {}
+        for camper in campers:
+            cabin = (camper.get("cabin") or "").strip()
+            if cabin:
+                sets.union(first_in_cabin.setdefault(cabin, camper['id']), camper['id'])
+    return [members for members in sets.groups().values() if len(members) > 1]
@@ -0,0 +1,162 @@
+import csv
+import os
+import shutil
+from datetime import datetime
+
+TIME_COLUMN = "submission_time"
+
+# Per form: the column identifying a person, and whether a resubmission keeps
+# the person's first submission_time (camper choices are served FIFO, so
+# editing a form must not lose a camper's place in the queue)
+FORM_POLICIES = {
+    "off_times_form.csv": {"key": "email", "keep_earliest_time": False},
+    "camper_choices.csv": {"key": "id", "keep_earliest_time": True},
+}
+
+TIME_FORMATS = [
+    "%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d",
+    "%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y",
+]
+
+
+def parse_submission_time(value):
+    """datetime for a submission_time cell, or None when blank or unreadable"""
+    value = (value or "").strip()
+    if not value:
+        return None
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    return None
+
+
+def detect_form(path):
+    """Data file name a form export belongs to (from its header), or None"""
+    with open(path, newline='', encoding="utf-8-sig") as f:
+        header = next(csv.reader(f), [])
+    columns = {c.strip() for c in header}
+    if {"id", "class1"} <= columns:
+        return "camper_choices.csv"
+    if "email" in columns and {"first option day", "first option night"} & columns:
+        return "off_times_form.csv"
+    return None
+
+
+class MergeReport:
+    """Counts from one merge_form_exports call"""
+
+    def __init__(self, form, dest):
+        self.form = form
+        self.dest = dest
+        self.files = 0
+        self.rows_read = 0
+        self.people = 0
+        self.replaced = 0      # older submissions superseded by a later one
+        self.unkeyed = 0       # rows without a key, passed through as-is
+
+    def summary(self):
+        return (f"{self.form}: {self.rows_read} row(s) from {self.files} file(s) -> {self.people} "
+                f"submission(s), {self.replaced} superseded, {self.unkeyed} without {FORM_POLICIES[self.form]['key']}")
+
+
+def merge_form_exports(paths, dest, form=None):
+    """
+    Merge any number of exports of one form into a single deduplicated file.
+
+    The files are streamed row by row in the order given, and a hash index
+    keyed on the person (email, lowercased, or camper id) holds only that
+    person's current submission. Memory therefore grows with the number of
+    people, not with the number or size of the exports.
+
+    A later submission replaces an earlier one: the later submission_time
+    wins, and rows without a readable time fall back to arrival order (later
+    file, later row). Where the form's policy says so, the kept row carries
+    the person's earliest submission_time, so a resubmitting camper keeps
+    their FIFO priority. People keep the position of their first appearance.
+    Rows with no key are kept as they are for validation to report.
+
+    dest may be one of the inputs (the current data file); the result is
+    written to a temporary file and swapped in when complete.
+    """
+    form = form or os.path.basename(dest)
+    if form not in FORM_POLICIES:
+        raise ValueError(f"No merge policy for {form} (expected one of {sorted(FORM_POLICIES)})")
+    key_column = FORM_POLICIES[form]["key"]
+    keep_earliest = FORM_POLICIES[form]["keep_earliest_time"]
+
+    report = MergeReport(form, dest)
+    columns = {}      # union of the headers, in first-seen order
+    latest = {}       # key -> (time, row)
+    earliest = {}     # key -> (time, raw value), FIFO forms only
+    for path in paths:
+        report.files += 1
+        with open(path, newline='', encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            columns.update((c.strip(), None) for c in reader.fieldnames or [])
+            for row in reader:
+                report.rows_read += 1
+                row = {k.strip(): v for k, v in row.items() if k is not None}
+                key = (row.get(key_column) or "").strip()
+                if key_column == "email":
+                    key = key.lower()
+                if not key:
+                    report.unkeyed += 1
+                    latest[("unkeyed", report.rows_read)] = (None, row)
+                    continue
+
+                raw = row.get(TIME_COLUMN, "")
+                when = parse_submission_time(raw)
+                if keep_earliest and when is not None and (key not in earliest or when < earliest[key][0]):
+                    earliest[key] = (when, raw)
+                current = latest.get(key)
+                if current is not None:
+                    report.replaced += 1
+                    # Only an explicitly older timestamp keeps the current row
+                    if when is not None and current[0] is not None and when < current[0]:
+                        continue
+                latest[key] = (when, row)
+
+    # Hidden while incomplete, so the data watcher only sees the final file
+    tmp = os.path.join(os.path.dirname(dest), "." + os.path.basename(dest) + ".tmp")
+    with open(tmp, "w", newline='', encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(columns), extrasaction="ignore")
+        writer.writeheader()
+        for key, (_, row) in latest.items():
+            if key in earliest:
+                row[TIME_COLUMN] = earliest[key][1]
+            writer.writerow(row)
+    os.replace(tmp, dest)
+    report.people = len(latest) - report.unkeyed
+    return report
+
+
+def import_form_exports(paths, data_dir, replace=False):
+    """
+    Bring exported CSV files into the data directory.
+
+    Form exports (recognised by their header) are merged per form with
+    merge_form_exports, together with the form file already in data_dir
+    unless replace is set. Any other CSV is copied over the file of the same
+    name. Returns [MergeReport] for the merged forms and the copied file names.
+    """
+    by_form = {}
+    copied = []
+    for path in paths:
+        form = detect_form(path)
+        if form is None:
+            dest = os.path.join(data_dir, os.path.basename(path))
+            if os.path.abspath(path) != os.path.abspath(dest):
+                shutil.copyfile(path, dest)
+            copied.append(os.path.basename(path))
+        else:
+            by_form.setdefault(form, []).append(path)
+
+    reports = []
+    for form, form_paths in by_form.items():
+        dest = os.path.join(data_dir, form)
+        existing = [] if replace or not os.path.exists(dest) else [dest]
+        sources = existing + [p for p in form_paths if os.path.abspath(p) != os.path.abspath(dest)]
+        reports.append(merge_form_exports(sources, dest, form))
+    return reports, copied
@@ -0,0 +1,13 @@
+import os
+import importlib.resources
+
+
+def get_data_dir():
+    """Return the path to the packaged data directory"""
+    with importlib.resources.path('camp_scheduler', 'data') as data_path:
+        return str(data_path)
+
+
+def get_data_path(data_dir, filename):
+    """Helper to get paths to data files"""
+    return os.path.join(data_dir, filename)
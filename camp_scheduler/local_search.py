@@ -0,0 +1,341 @@
+import time
+
+from .engines import UNRANKED_RANK
+
+# One missing period outweighs any amount of preference-rank cost
+MISSING_PERIOD_COST = 1000
+
+
+class CamperLocalSearch:
+    """
+    Improves a CamperAssignment in place with local moves.
+
+    Moves:
+        reassign  - a camper drops at most one class and takes open seats (fills
+                    missing periods, moves a class to another period or upgrades it)
+        swap      - two campers exchange classes that cover the same periods
+        chain     - a camper takes a full seat after its holder is moved on,
+                    up to max_chain campers deep; each level tries open seats
+                    first (from the open-seat index) and frees at most
+                    `fanout` full classes one level down
+
+    Every move only touches classes the camper can be assigned to, in rosters
+    that are already running. Rosters never drop below their minimum size, so
+    the set of inactive classes (and the staff schedule) does not change.
+    Classes a camper was seated in with their group (result.pinned) are
+    never given up.
+    """
+
+    def __init__(self, result, max_chain=2, fanout=4):
+        self.result = result
+        self.configs = result.class_configs
+        self.timetable = result.timetable
+        self.periods = set(self.timetable.periods)
+        self.max_chain = max_chain
+        self.fanout = fanout
+        self.deadline = float("inf")  # perf_counter time the run must stop by
+        self._chains = {}   # (class, span, depth, blocked) -> best chain, until the next applied move
+        self._failed = set()  # the same keys with no chain at all, for the rest of the pass
+        self.pinned = result.pinned
+        self.stats = {"reassign": 0, "swap": 0, "chain": 0}
+
+        self.ranks = {}
+        for camper in result.campers:
+            choices = [camper.get(f'class{i}') for i in range(1, 6)]
+            self.ranks[camper['id']] = {c: choices.index(c) + 1 for c in choices if c}
+
+        # camper -> {class: periods held}, and (class, period) -> set of campers
+        self.placements = {}
+        self.rosters = {}
+        for camper in result.campers:
+            held = {}
+            for p, cname in sorted(result.assignments[camper['id']].items()):
+                held.setdefault(cname, []).append(p)
+                self.rosters.setdefault((cname, p), set()).add(camper['id'])
+            self.placements[camper['id']] = {c: tuple(periods) for c, periods in held.items()}
+
+        # Running rosters that still have seats, per period: period -> {class: seats}
+        self.open_seats = {p: {} for p in self.timetable.periods}
+        for (cname, p), roster in self.rosters.items():
+            if self._running(cname, p) and len(roster) < self._limit(cname):
+                self.open_seats[p][cname] = self._limit(cname) - len(roster)
+
+        # Every (class, periods) a camper could be placed in, also by (class, start period)
+        self.options = []
+        self.option_at = {}
+        for cname, config in self.configs.items():
+            if not config.get("camper_assignable", True):
+                continue
+            for start in sorted(config.get("preferred_periods", [])):
+                span = self.timetable.span(config, start)
+                if span and all(self._running(cname, p) for p in span):
+                    self.options.append((cname, span))
+                    self.option_at[(cname, span[0])] = span
+
+    # --- Rosters and the open-seat index ---
+
+    def _limit(self, cname):
+        return 8 * self.configs[cname].get("staff_required", 1)
+
+    def _minimum(self, cname):
+        return 3 * self.configs[cname].get("staff_required", 1)
+
+    def _running(self, cname, p):
+        return bool(self.rosters.get((cname, p))) and (cname, p) not in self.result.inactive_classes
+
+    def _has_seat(self, cname, span):
+        return all(self.open_seats[p].get(cname, 0) > 0 for p in span)
+
+    def _open_options(self, free):
+        """(class, span) with a seat in every period, within the periods `free`, from the open-seat index"""
+        for p in free:
+            for cname in self.open_seats[p]:
+                span = self.option_at.get((cname, p))
+                if span and free.issuperset(span) and self._has_seat(cname, span):
+                    yield cname, span
+
+    def _can_leave(self, cname, span):
+        return all(len(self.rosters[(cname, p)]) > self._minimum(cname) for p in span)
+
+    def _join(self, camper_id, cname, span):
+        for p in span:
+            self.rosters[(cname, p)].add(camper_id)
+            seats = self.open_seats[p][cname] - 1
+            if seats:
+                self.open_seats[p][cname] = seats
+            else:
+                del self.open_seats[p][cname]
+        self.placements[camper_id][cname] = span
+
+    def _leave(self, camper_id, cname):
+        span = self.placements[camper_id].pop(cname)
+        for p in span:
+            self.rosters[(cname, p)].discard(camper_id)
+            self.open_seats[p][cname] = self.open_seats[p].get(cname, 0) + 1
+        return span
+
+    # --- Objective ---
+
+    def _covered(self, held):
+        covered = set()
+        for cname, span in held.items():
+            covered.update(span)
+            # A multi-period class stored in fewer periods still covers its full span (see missing_periods)
+            covered.update(self.timetable.span(self.configs.get(cname, {}), span[0]))
+        return covered
+
+    def cost(self, camper_id, held=None):
+        held = self.placements[camper_id] if held is None else held
+        ranks = self.ranks[camper_id]
+        missing = len(self.periods - self._covered(held))
+        return MISSING_PERIOD_COST * missing + sum(ranks.get(c, UNRANKED_RANK) for c in held)
+
+    def total_cost(self):
+        return sum(self.cost(camper_id) for camper_id in self.placements)
+
+    # --- Moves ---
+
+    def _best_fill(self, camper_id, held, exclude=None):
+        """Cheapest open seats for the periods `held` leaves free, picked greedily by rank"""
+        ranks = self.ranks[camper_id]
+        held = dict(held)
+        added = []
+        for cname, span in sorted(self.options, key=lambda o: ranks.get(o[0], UNRANKED_RANK)):
+            if cname in held or (cname, span) == exclude:
+                continue
+            if self._covered(held) & set(span) or not self._has_seat(cname, span):
+                continue
+            held[cname] = span
+            added.append((cname, span))
+        return held, added
+
+    def _reassign(self, camper_id):
+        """Best 'drop one class, refill from open seats' move, applied if it lowers the cost"""
+        current = self.placements[camper_id]
+        before = self.cost(camper_id)
+        best = None
+        for dropped in [None] + list(current):
+            if dropped is not None and ((camper_id, dropped) in self.pinned
+                                        or not self._can_leave(dropped, current[dropped])):
+                continue
+            kept = {c: s for c, s in current.items() if c != dropped}
+            # The dropped class may come back in other periods
+            held, added = self._best_fill(camper_id, kept, exclude=(dropped, current.get(dropped)))
+            delta = self.cost(camper_id, held) - before
+            if delta < 0 and (best is None or delta < best[0]):
+                best = (delta, dropped, added)
+        if best is None:
+            return False
+        _, dropped, added = best
+        if dropped is not None:
+            self._leave(camper_id, dropped)
+        for cname, span in added:
+            self._join(camper_id, cname, span)
+        self.stats["reassign"] += 1
+        return True
+
+    def _swap(self, camper_id):
+        """Exchange a class with another camper holding a better-ranked class in the same periods"""
+        ranks = self.ranks[camper_id]
+        for cname, span in list(self.placements[camper_id].items()):
+            if (camper_id, cname) in self.pinned:
+                continue
+            rank = ranks.get(cname, UNRANKED_RANK)
+            for other_class, other_span in self.options:
+                if other_span != span or ranks.get(other_class, UNRANKED_RANK) >= rank:
+                    continue
+                if other_class in self.placements[camper_id]:
+                    continue
+                for other in sorted(self.rosters[(other_class, span[0])]):
+                    held = self.placements[other]
+                    if held.get(other_class) != span or cname in held or (other, other_class) in self.pinned:
+                        continue
+                    other_ranks = self.ranks[other]
+                    delta = (ranks.get(other_class, UNRANKED_RANK) - rank
+                             + other_ranks.get(cname, UNRANKED_RANK) - other_ranks.get(other_class, UNRANKED_RANK))
+                    if delta < 0:
+                        self._leave(camper_id, cname)
+                        self._leave(other, other_class)
+                        self._join(camper_id, other_class, span)
+                        self._join(other, cname, span)
+                        self.stats["swap"] += 1
+                        return True
+        return False
+
+    def _out_of_time(self):
+        return time.perf_counter() > self.deadline
+
+    def _free_seat(self, cname, span, depth, visited, blocked):
+        """
+        Moves that free one seat in cname over span by moving a holder elsewhere.
+        visited: campers already on the chain, blocked: classes being freed by it
+        Returns (delta, moves) with the lowest delta, or None.
+
+        A holder moves into an open seat, or (depth > 1) into a full class
+        that is freed in turn; at most `fanout` full classes are tried per
+        level. Results are cached until the next applied move, and failures
+        for the rest of the pass. Gives up (returning None) past the deadline.
+        """
+        key = (cname, span, depth, frozenset(blocked))
+        if key in self._failed:
+            return None
+        if key in self._chains:
+            return self._chains[key]
+        best = None
+        blocked = blocked | {cname}
+        deeper = {}  # (class, span) -> best chain freeing it, shared by every holder
+        for holder in sorted(self.rosters[(cname, span[0])]):
+            if self._out_of_time():
+                return None
+            if holder in visited or self.placements[holder].get(cname) != span or (holder, cname) in self.pinned:
+                continue
+            before = self.cost(holder)
+            kept = {c: s for c, s in self.placements[holder].items() if c != cname}
+            free = self.periods - self._covered(kept)
+            for other_class, other_span in self._open_options(free):
+                if other_class in blocked or other_class in kept:
+                    continue
+                delta = self.cost(holder, dict(kept, **{other_class: other_span})) - before
+                if best is None or delta < best[0]:
+                    best = (delta, [(holder, cname, other_class, other_span)])
+            if depth <= 1:
+                continue
+            for other_class, other_span in self.options:
+                if (other_class in blocked or other_class in kept or not free.issuperset(other_span)
+                        or self._has_seat(other_class, other_span)):
+                    continue
+                target = (other_class, other_span)
+                if target not in deeper:
+                    if len(deeper) >= self.fanout:
+                        continue
+                    deeper[target] = self._free_seat(other_class, other_span, depth - 1, visited | {holder}, blocked)
+                chain = deeper[target]
+                if chain is None or any(move[0] == holder for move in chain[1]):
+                    continue
+                delta = self.cost(holder, dict(kept, **{other_class: other_span})) - before + chain[0]
+                if best is None or delta < best[0]:
+                    best = (delta, chain[1] + [(holder, cname, other_class, other_span)])
+        if self._out_of_time():
+            return None  # cut short, so not a result to keep
+        if best is None:
+            self._failed.add(key)
+        else:
+            self._chains[key] = best
+        return best
+
+    def _chain(self, camper_id):
+        """Place a camper with a missing period into a full class by moving its holder on"""
+        current = self.placements[camper_id]
+        free = self.periods - self._covered(current)
+        if not free:
+            return False
+        before = self.cost(camper_id)
+        ranks = self.ranks[camper_id]
+        for cname, span in sorted(self.options, key=lambda o: ranks.get(o[0], UNRANKED_RANK)):
+            if cname in current or not set(span) <= free or self._has_seat(cname, span):
+                continue
+            gain = self.cost(camper_id, dict(current, **{cname: span})) - before
+            freed = self._free_seat(cname, span, self.max_chain, {camper_id}, set())
+            if self._out_of_time():
+                return False
+            if freed is None or gain + freed[0] >= 0 or any(move[0] == camper_id for move in freed[1]):
+                continue
+            for holder, old_class, new_class, new_span in freed[1]:
+                self._leave(holder, old_class)
+                self._join(holder, new_class, new_span)
+            self._join(camper_id, cname, span)
+            self.stats["chain"] += 1
+            return True
+        return False
+
+    # --- Driver ---
+
+    def run(self, max_iterations=10000, time_budget=None):
+        """
+        Apply improving moves until none is found or max_iterations camper
+        visits are used, so the result does not depend on machine speed.
+        time_budget (seconds) optionally also stops the search early.
+        Writes the result back into result.assignments and returns summary stats.
+        """
+        start = time.perf_counter()
+        if time_budget is not None:
+            self.deadline = start + time_budget
+        cost_before = self.total_cost()
+        unassigned_before = len(self.result.unassigned_campers())
+        iterations = 0
+
+        improved = True
+        while improved:
+            improved = False
+            self._failed.clear()
+            # Campers with missing periods and poor ranks first
+            for camper_id in sorted(self.placements, key=lambda c: -self.cost(c)):
+                if iterations >= max_iterations or self._out_of_time():
+                    improved = False
+                    break
+                iterations += 1
+                if self._reassign(camper_id) or self._chain(camper_id) or self._swap(camper_id):
+                    improved = True
+                    self._chains.clear()  # cached chains may use seats this move took
+
+        for camper_id, held in self.placements.items():
+            assigned = self.result.assignments[camper_id]
+            assigned.clear()
+            for cname, span in held.items():
+                for p in span:
+                    assigned[p] = cname
+
+        return {
+            "iterations": iterations,
+            "moves": dict(self.stats),
+            "unassigned_before": unassigned_before,
+            "unassigned_after": len(self.result.unassigned_campers()),
+            "cost_before": cost_before,
+            "cost_after": self.total_cost(),
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+
+
+def improve_camper_assignment(result, max_iterations=10000, time_budget=None, max_chain=2, fanout=4):
+    """Run CamperLocalSearch over a CamperAssignment (modified in place); returns its stats"""
+    return CamperLocalSearch(result, max_chain=max_chain, fanout=fanout).run(max_iterations, time_budget)
@@ -0,0 +1,240 @@
+import numpy as np
+
+from .timetable import ALL_DAYS, WEEKDAYS
+
+# Markers in the staff x day assignment matrix
+UNASSIGNED = -1
+COORDINATOR = -2   # pinned to a coordinator location that has no rule
+
+# Keys a locations.json entry may use (a plain string is a location with no rules)
+RULE_KEYS = {"name", "days", "certification", "department", "min_staff", "max_staff"}
+
+
+class LocationRule:
+    """
+    One freetime location from locations.json.
+
+    days: days the location runs (every program day when omitted)
+    certification: index.csv column that must be "Yes" for staff placed there
+    department: only staff from this department may be placed there
+    min_staff / max_staff: headcount; staff beyond min_staff are only added
+        after every location's minimum has been matched
+    """
+
+    def __init__(self, name, days=None, certification=None, department=None, min_staff=1, max_staff=None):
+        self.name = name
+        self.days = list(days) if days is not None else None
+        self.certification = certification
+        self.department = department
+        self.min_staff = min_staff
+        self.max_staff = max_staff if max_staff is not None else max(min_staff, 1)
+
+    @classmethod
+    def from_config(cls, entry):
+        if isinstance(entry, str):
+            return cls(entry)
+        if not isinstance(entry, dict) or "name" not in entry:
+            raise ValueError(f"Location entry must be a name or an object with a 'name': {entry!r}")
+        unknown = set(entry) - RULE_KEYS
+        if unknown:
+            raise ValueError(f"Location '{entry['name']}': unknown key(s) {sorted(unknown)}")
+        rule = cls(**entry)
+        bad_days = [d for d in rule.days or [] if d not in ALL_DAYS]
+        if bad_days:
+            raise ValueError(f"Location '{rule.name}': unknown day(s) {bad_days}")
+        if not 0 <= rule.min_staff <= rule.max_staff:
+            raise ValueError(f"Location '{rule.name}': need 0 <= min_staff <= max_staff")
+        return rule
+
+    def runs_on(self, day):
+        return self.days is None or day in self.days
+
+    @property
+    def multi_staff(self):
+        return self.max_staff > 1
+
+
+def parse_location_rules(config):
+    """locations.json content -> list of LocationRule (raises ValueError on a bad entry)"""
+    return [LocationRule.from_config(entry) for entry in config]
+
+
+class CompiledLocations:
+    """
+    Location rules compiled against the roster.
+
+    eligible[l, d] is a boolean mask over staff (index.csv order) of who may be
+    placed at location l on day d, combining the day, certification and
+    department rules, so assignment only needs mask intersections.
+    """
+
+    def __init__(self, rules, index_data, days=WEEKDAYS):
+        self.rules = list(rules)
+        self.days = list(days)
+        self.staff_ids = list(index_data)
+        self.staff_index = {sid: i for i, sid in enumerate(self.staff_ids)}
+        self.location_index = {rule.name: l for l, rule in enumerate(self.rules)}
+
+        rows = [index_data[sid] for sid in self.staff_ids]
+        self.eligible = np.zeros((len(self.rules), len(self.days), len(self.staff_ids)), dtype=bool)
+        for l, rule in enumerate(self.rules):
+            mask = np.ones(len(self.staff_ids), dtype=bool)
+            if rule.certification:
+                mask &= np.array([(row.get(rule.certification) or "").strip().lower() == "yes" for row in rows], dtype=bool)
+            if rule.department:
+                mask &= np.array([(row.get("department") or "").strip() == rule.department for row in rows], dtype=bool)
+            for d, day in enumerate(self.days):
+                if rule.runs_on(day):
+                    self.eligible[l, d] = mask
+
+    def is_open(self, location, d):
+        l = self.location_index.get(location)
+        return l is None or self.rules[l].runs_on(self.days[d])
+
+    def staff_mask(self, staff_ids):
+        mask = np.zeros(len(self.staff_ids), dtype=bool)
+        for sid in staff_ids:
+            i = self.staff_index.get(sid)
+            if i is not None:
+                mask[i] = True
+        return mask
+
+
+def assign_freetime(compiled, coordinator_data, unavailable):
+    """
+    Assign staff to freetime locations for the whole week as one matching.
+
+    compiled: CompiledLocations
+    coordinator_data: {location: [staff ids in priority order]}
+    unavailable: {day: set of staff ids} (day after a day off)
+    Returns {day: {location: staff id, or a list for multi-staff locations and "Off"}}.
+
+    Coordinators are pinned first. Every (day, location) minimum headcount is
+    then matched across the week, scarcest slots first, picking the least
+    loaded eligible staff member and re-routing a busy one through an
+    augmenting path when nobody eligible is free. Extra headcount comes next,
+    and a final pass hands slots from heavily loaded staff to idle ones until
+    no single reassignment can make the sorted load vector lexicographically
+    smaller. Ties go to the earlier staff member in index.csv, so the output
+    is deterministic.
+    """
+    num_days, num_staff = len(compiled.days), len(compiled.staff_ids)
+    available = np.ones((num_days, num_staff), dtype=bool)
+    for d, day in enumerate(compiled.days):
+        available[d] &= ~compiled.staff_mask(unavailable.get(day, ()))
+
+    # assigned[d, i]: location index, COORDINATOR for pinned staff, UNASSIGNED when free
+    assigned = np.full((num_days, num_staff), UNASSIGNED, dtype=np.int32)
+    load = np.zeros(num_staff, dtype=np.int32)
+    headcount = np.zeros((len(compiled.rules), num_days), dtype=np.int32)
+    pinned = {}  # (d, i) -> coordinator location
+
+    def free(d):
+        return available[d] & (assigned[d] == UNASSIGNED)
+
+    def place(d, l, i):
+        assigned[d, i] = l
+        headcount[l, d] += 1
+        load[i] += 1
+
+    def least_loaded(mask):
+        candidates = np.flatnonzero(mask)
+        return candidates[np.argmin(load[candidates])] if len(candidates) else None
+
+    # --- 1. Coordinators, in their listed priority order ---
+    for d in range(num_days):
+        for location, ids in coordinator_data.items():
+            if not compiled.is_open(location, d):
+                continue
+            for sid in ids:
+                i = compiled.staff_index.get(str(sid))
+                if i is not None and available[d, i] and assigned[d, i] == UNASSIGNED:
+                    l = compiled.location_index.get(location)
+                    if l is None:
+                        assigned[d, i] = COORDINATOR
+                        pinned[(d, i)] = location
+                        load[i] += 1
+                    else:
+                        place(d, l, i)
+                        pinned[(d, i)] = location
+                    break
+
+    # --- 2. Minimum headcounts for the whole week, scarcest slots first ---
+    slots = []
+    for l, rule in enumerate(compiled.rules):
+        for d in range(num_days):
+            need = rule.min_staff - headcount[l, d]
+            if need > 0 and compiled.eligible[l, d].any():
+                scarcity = int((compiled.eligible[l, d] & available[d]).sum())
+                slots.extend([(scarcity, d, l)] * need)
+    slots.sort()
+
+    for _, d, l in slots:
+        i = least_loaded(compiled.eligible[l, d] & free(d))
+        if i is not None:
+            place(d, l, i)
+            continue
+        # Augmenting path: move a busy eligible staff member here and refill their slot
+        busy = np.flatnonzero(compiled.eligible[l, d] & (assigned[d] >= 0) & (assigned[d] != l))
+        best = None
+        for other in np.unique(assigned[d, busy]):
+            k = least_loaded(compiled.eligible[other, d] & free(d))
+            if k is not None and (best is None or load[k] < load[best[2]]):
+                j = next((j for j in busy if assigned[d, j] == other and (d, j) not in pinned), None)
+                best = (other, j, k) if j is not None else best
+        if best is not None:
+            other, j, k = best
+            assigned[d, j] = l
+            headcount[other, d] -= 1
+            headcount[l, d] += 1
+            place(d, other, k)
+
+    # --- 3. Extra headcount, one round across every slot at a time ---
+    extra = True
+    while extra:
+        extra = False
+        for l, rule in enumerate(compiled.rules):
+            for d in range(num_days):
+                if rule.min_staff <= headcount[l, d] < rule.max_staff:
+                    i = least_loaded(compiled.eligible[l, d] & free(d))
+                    if i is not None:
+                        place(d, l, i)
+                        extra = True
+
+    # --- 4. Lexicographic rebalancing: hand slots from busy staff to idle ones ---
+    moved = True
+    while moved:
+        moved = False
+        for j in np.argsort(-load, kind="stable"):
+            for d in np.flatnonzero(assigned[:, j] >= 0):
+                if (d, j) in pinned:
+                    continue
+                l = assigned[d, j]
+                k = least_loaded(compiled.eligible[l, d] & free(d))
+                if k is not None and load[k] + 1 < load[j]:
+                    assigned[d, j] = UNASSIGNED
+                    load[j] -= 1
+                    assigned[d, k] = l
+                    load[k] += 1
+                    moved = True
+
+    # --- 5. Back to the {day: {location: staff}} layout ---
+    schedule = {}
+    for d, day in enumerate(compiled.days):
+        day_schedule = {}
+        for i in np.flatnonzero(assigned[d] != UNASSIGNED):
+            sid = compiled.staff_ids[i]
+            if (d, i) in pinned and assigned[d, i] == COORDINATOR:
+                day_schedule[pinned[(d, i)]] = sid
+                continue
+            rule = compiled.rules[assigned[d, i]]
+            if rule.multi_staff:
+                day_schedule.setdefault(rule.name, []).append(sid)
+            else:
+                day_schedule[rule.name] = sid
+        off = [compiled.staff_ids[i] for i in np.flatnonzero(free(d))]
+        if off:
+            day_schedule["Off"] = off
+        schedule[day] = day_schedule
+
+    return schedule
@@ -0,0 +1,151 @@
+import numpy as np
+
+# Scores are in [0, 1]; a near match is accepted when it clears MIN_SCORE and
+# beats the runner-up by MARGIN, and reported for review above REVIEW_SCORE
+MIN_SCORE = 0.85
+MARGIN = 0.1
+REVIEW_SCORE = 0.6
+CANDIDATES = 8
+
+
+def _normalize(text):
+    return " ".join(str(text or "").strip().lower().split())
+
+
+def _grams(text, n=3):
+    padded = f"^{text}$"
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+
+def edit_distance(a, b):
+    """Optimal string alignment distance (insert, delete, substitute, swap neighbours)"""
+    if a == b:
+        return 0
+    # Shared prefixes and suffixes (the domain, usually) never change the distance
+    start = 0
+    while start < min(len(a), len(b)) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < min(len(a), len(b)) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if not a or not b:
+        return len(a) + len(b)
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def similarity(a, b):
+    """1 - edit distance / longer length"""
+    if not a and not b:
+        return 1.0
+    return 1.0 - edit_distance(a, b) / max(len(a), len(b))
+
+
+class IdentityMatch:
+    """Outcome of IdentityIndex.match"""
+
+    def __init__(self, staff_id, score, method, candidates=()):
+        self.staff_id = staff_id       # None when unresolved
+        self.score = score
+        self.method = method           # "exact", "near", "ambiguous" or "none"
+        self.candidates = list(candidates)  # [(staff_id, email, score)] best first
+
+    def describe(self):
+        shown = ", ".join(f"{sid} <{email}> {score:.2f}" for sid, email, score in self.candidates[:3])
+        if self.method == "ambiguous":
+            return f"ambiguous email match: {shown}"
+        if self.method == "near":
+            return f"near email match {self.score:.2f}"
+        return "no matching staff email" + (f" (closest: {shown})" if shown else "")
+
+
+class IdentityIndex:
+    """
+    Roster lookup for form emails that may contain typos, built once from index.csv.
+
+    Exact (case-insensitive) emails resolve with one dict lookup. Anything
+    else is looked up in a character-trigram inverted index: one bincount over
+    the query's posting lists gives the Dice overlap with every roster email,
+    and only the best CANDIDATES are rescored by edit distance, plus name
+    similarity when the form row has a name. A near match is accepted only
+    when it is both confident and clearly ahead of the runner-up; otherwise
+    the candidates are kept for the report.
+    """
+
+    def __init__(self, index_data, min_score=MIN_SCORE, margin=MARGIN):
+        self.min_score = min_score
+        self.margin = margin
+        self.staff_ids = []
+        self.emails = []
+        self.names = []
+        self.by_email = {}
+        self.by_name = {}
+        postings = {}
+        gram_counts = []
+        for staff_id, row in index_data.items():
+            email = _normalize(row.get("email"))
+            if not email:
+                continue
+            i = len(self.staff_ids)
+            self.staff_ids.append(staff_id)
+            self.emails.append(email)
+            self.names.append(_normalize(row.get("name")))
+            self.by_email.setdefault(email, staff_id)
+            self.by_name.setdefault(self.names[i], []).append(i)
+            grams = _grams(email)
+            gram_counts.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self.gram_counts = np.array(gram_counts, dtype=np.float64)
+
+    def _candidates(self, email, name):
+        grams = _grams(email)
+        lists = [self.postings[g] for g in grams if g in self.postings]
+        found = set(self.by_name.get(name, ())) if name else set()
+        if lists:
+            shared = np.bincount(np.concatenate(lists), minlength=len(self.staff_ids))
+            dice = 2 * shared / (len(grams) + self.gram_counts)
+            top = np.argpartition(-dice, min(CANDIDATES, len(dice)) - 1)[:CANDIDATES]
+            found.update(int(i) for i in top if shared[i])
+        return found
+
+    def _score(self, i, email, name):
+        email_score = similarity(email, self.emails[i])
+        if not name:
+            return email_score
+        # A matching name is strong evidence; a similar one only a little
+        name_score = 1.0 if name == self.names[i] else 0.5 * similarity(name, self.names[i])
+        return 0.6 * email_score + 0.4 * name_score
+
+    def match(self, email, name=""):
+        email, name = _normalize(email), _normalize(name)
+        staff_id = self.by_email.get(email)
+        if staff_id is not None:
+            return IdentityMatch(staff_id, 1.0, "exact")
+        if not email or not self.staff_ids:
+            return IdentityMatch(None, 0.0, "none")
+
+        scored = sorted(
+            ((self._score(i, email, name), i) for i in self._candidates(email, name)),
+            key=lambda c: (-c[0], c[1]),
+        )
+        candidates = [(self.staff_ids[i], self.emails[i], round(score, 3)) for score, i in scored]
+        if not scored:
+            return IdentityMatch(None, 0.0, "none")
+        best = scored[0][0]
+        runner_up = scored[1][0] if len(scored) > 1 else 0.0
+        if best >= self.min_score and best - runner_up >= self.margin:
+            return IdentityMatch(candidates[0][0], round(best, 3), "near", candidates)
+        if best >= REVIEW_SCORE:
+            return IdentityMatch(None, round(best, 3), "ambiguous", candidates)
+        return IdentityMatch(None, round(best, 3), "none", candidates)
@@ -0,0 +1,156 @@
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+
+from .groups import UnionFind
+from .timetable import ALL_DAYS
+
+# Night coverage statuses
+STAFFED = "staffed"
+COVERED = "covered"
+CROSS_COVERED = "covered (other department)"
+UNCOVERED = "UNCOVERED"
+
+
+def night_posts(index_data):
+    """
+    Cabins (or other night posts) and the staff who sleep there.
+
+    When index.csv has a "cabin" column, each cabin is one post. Otherwise
+    the coverage pairs are used: staff linked through the coverage column
+    share a post, named after its members. Staff in no post are floaters.
+    Returns ({post: {"department", "staff": [ids]}}, [floater ids]).
+    """
+    ids = [staff_id for staff_id in index_data if staff_id]
+    cabins = {staff_id: (index_data[staff_id].get("cabin") or "").strip() for staff_id in ids}
+    groups = defaultdict(list)
+    if any(cabins.values()):
+        for staff_id in ids:
+            if cabins[staff_id]:
+                groups[cabins[staff_id]].append(staff_id)
+    else:
+        # Connected groups of coverage partners
+        sets = UnionFind(ids)
+        linked = set()
+        for staff_id in ids:
+            partner = (index_data[staff_id].get("coverage") or "").strip()
+            if partner.endswith(".0"):
+                partner = partner[:-2]
+            if partner in sets.parent and partner != staff_id:
+                sets.union(staff_id, partner)
+                linked.update((staff_id, partner))
+        for staff in sets.groups().values():
+            if staff[0] in linked:
+                groups["/".join(sorted(staff, key=_id_key))] = staff
+
+    posts = {}
+    for name, staff in groups.items():
+        departments = [(index_data[s].get("department") or "").strip() for s in staff]
+        posts[name] = {"department": max(set(departments), key=departments.count), "staff": sorted(staff, key=_id_key)}
+    in_post = {s for post in posts.values() for s in post["staff"]}
+    floaters = [s for s in ids if s not in in_post]
+    return posts, floaters
+
+
+def _id_key(staff_id):
+    return (0, int(staff_id), "") if str(staff_id).isdigit() else (1, 0, str(staff_id))
+
+
+class NightCoverage:
+    """Result of assign_night_coverage"""
+
+    def __init__(self, nights, posts, floaters):
+        self.nights = nights          # [(date "DD/MM/YYYY", day name)], every night of the week
+        self.posts = posts
+        self.floaters = floaters      # staff in no post
+        self.rows = []                # one dict per (night, post)
+        self.load = defaultdict(int)  # staff id -> nights spent covering
+        self.shortfalls = []          # (date, department, posts needing cover, staff able to cover)
+
+    def uncovered(self):
+        return [row for row in self.rows if row["Status"] == UNCOVERED]
+
+    def counts(self):
+        counts = defaultdict(int)
+        for row in self.rows:
+            counts[row["Status"]] += 1
+        return dict(counts)
+
+
+def assign_night_coverage(index_data, nights_off, week_start_date):
+    """
+    Make sure every night post has a staff member on each of the week's seven nights.
+
+    nights_off: {staff_id: night off date (DD/MM/YYYY)} from time_off_results
+    A post whose staff are all off that night gets a coverer: a staff member
+    on duty that night whose own post keeps someone else, who is not covering
+    elsewhere that night, from the post's department when possible and any
+    department otherwise. Coverers come off a per-(night, department) heap
+    keyed on the nights they have covered so far, so the load spreads evenly.
+    Shortfalls (more posts to cover than people who could) are worked out
+    before any assignment. Returns a NightCoverage.
+    """
+    posts, floaters = night_posts(index_data)
+    department = {s: (index_data[s].get("department") or "").strip() for s in index_data if s}
+    nights = [((week_start_date + timedelta(days=i)).strftime("%d/%m/%Y"), ALL_DAYS[(week_start_date.weekday() + i) % 7])
+              for i in range(7)]
+    result = NightCoverage(nights, posts, floaters)
+    post_of = {s: name for name, post in posts.items() for s in post["staff"]}
+
+    for date, day in nights:
+        present = {name: [s for s in post["staff"] if nights_off.get(s) != date] for name, post in posts.items()}
+        need = [name for name in posts if not present[name]]
+
+        # Who can leave their post (or has none) tonight, indexed by department
+        able = [s for s in department if nights_off.get(s) != date
+                and (s not in post_of or len(present[post_of[s]]) > 1)]
+        heaps = defaultdict(list)
+        for s in able:
+            heaps[department[s]].append((result.load[s], _id_key(s), s))
+        for heap in heaps.values():
+            heapq.heapify(heap)
+
+        # Up-front shortfall report per department (cross-department cover may still help)
+        by_department = defaultdict(int)
+        for name in need:
+            by_department[posts[name]["department"]] += 1
+        for dept, n in sorted(by_department.items()):
+            if n > len(heaps.get(dept, ())):
+                result.shortfalls.append((date, dept, n, len(heaps.get(dept, ()))))
+
+        leaving = defaultdict(int)
+
+        def take(heap):
+            # Each staff member is in one heap, so a popped one is never offered twice tonight;
+            # skip those whose post the others have already left to cover
+            while heap:
+                _, _, s = heapq.heappop(heap)
+                if s in post_of and len(present[post_of[s]]) - leaving[post_of[s]] <= 1:
+                    continue
+                return s
+            return None
+
+        for name in posts:
+            post = posts[name]
+            row = {"Date": date, "Day": day, "Post": name, "Department": post["department"],
+                   "On duty": " ".join(present[name]), "Covered by": "", "Status": STAFFED}
+            if not present[name]:
+                coverer = take(heaps.get(post["department"], []))
+                row["Status"] = COVERED
+                if coverer is None:
+                    # Any department, least loaded first
+                    others = [h for dept, h in heaps.items() if dept != post["department"] and h]
+                    for heap in sorted(others, key=lambda h: h[0]):
+                        coverer = take(heap)
+                        if coverer is not None:
+                            break
+                    row["Status"] = CROSS_COVERED
+                if coverer is None:
+                    row["Status"] = UNCOVERED
+                else:
+                    if coverer in post_of:
+                        leaving[post_of[coverer]] += 1
+                    result.load[coverer] += 1
+                    row["Covered by"] = coverer
+            result.rows.append(row)
+    return result
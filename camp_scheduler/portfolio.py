@@ -0,0 +1,141 @@
+import multiprocessing
+import random
+import time
+
+from .engines import assign_days_off, assign_campers, UNRANKED_RANK
+
+# Default objective weights per stage (lower scores are better)
+DEFAULT_WEIGHTS = {
+    "off_times": {"unassigned": 1000.0, "automatic": 10.0, "fairness": 1.0},
+    "campers": {"unassigned": 1000.0, "rank_sum": 1.0, "fairness": 10.0},
+}
+
+
+def _variance(values):
+    if not values:
+        return 0.0
+    mean = sum(values) / len(values)
+    return sum((v - mean) ** 2 for v in values) / len(values)
+
+
+def off_times_metrics(assignments, used_days):
+    """Unassigned staff, automatic (non-preferred) placements and day-off load variance"""
+    return {
+        "unassigned": sum(1 for a in assignments if "Unassigned" in (a['day_off'], a['night_off'])),
+        "automatic": sum(1 for a in assignments if a['assignment_type'] == 'Automatic'),
+        "fairness": _variance([len(ids) for ids in used_days.values()]),
+    }
+
+
+def camper_metrics(result):
+    """Unassigned campers, preference-rank sum and variance of per-camper mean rank"""
+    rank_sum = 0
+    per_camper = []
+    for camper in result.campers:
+        choices = [camper.get(f'class{i}') for i in range(1, 6)]
+        classes = set(result.assignments[camper['id']].values())
+        ranks = [choices.index(c) + 1 if c in choices else UNRANKED_RANK for c in classes]
+        rank_sum += sum(ranks)
+        if ranks:
+            per_camper.append(sum(ranks) / len(ranks))
+    return {
+        "unassigned": len(result.unassigned_campers()),
+        "rank_sum": rank_sum,
+        "fairness": _variance(per_camper),
+    }
+
+
+def run_stage(stage, inputs, seed):
+    """
+    Run one randomized stage. seed=None reproduces the standard (deterministic) ordering.
+    Returns (result, metrics).
+    """
+    rng = random.Random(seed) if seed is not None else None
+    if stage == "off_times":
+        off_requests, index_data, dates_config, week_start_date = inputs
+        result = assign_days_off(off_requests, index_data, dates_config, week_start_date,
+                                 rng=rng or random.Random(0), shuffle=rng is not None)
+        return result, off_times_metrics(result[0], result[2])
+    if stage == "campers":
+        class_configs, campers, timetable, reason_limit, warm_seed, groups = inputs
+        result = assign_campers(class_configs, campers, rng=rng, timetable=timetable, reason_limit=reason_limit,
+                                seed=warm_seed, groups=groups)
+        return result, camper_metrics(result)
+    raise ValueError(f"Unknown portfolio stage: {stage}")
+
+
+# Worker processes receive the stage inputs once, through the pool initializer
+_worker_stage = None
+
+
+def _init_worker(stage, inputs):
+    global _worker_stage
+    _worker_stage = (stage, inputs)
+
+
+def _evaluate_seed(seed):
+    # Only the metrics travel back; the parent re-runs the winning seed
+    stage, inputs = _worker_stage
+    return seed, run_stage(stage, inputs, seed)[1]
+
+
+class Portfolio:
+    """
+    Runs a stage under many random seeds in parallel and keeps the best result.
+
+    runs: number of seeds to try (in addition to the standard ordering)
+    time_budget: wall-clock seconds; the search returns (and stops the seeds still running) once it is spent
+    weights: {metric: weight} for the stage's objective, merged over DEFAULT_WEIGHTS
+    """
+
+    def __init__(self, runs=32, time_budget=5.0, weights=None, max_workers=None, base_seed=0):
+        self.runs = runs
+        self.time_budget = time_budget
+        self.weights = weights or {}
+        self.max_workers = max_workers
+        self.base_seed = base_seed
+
+    def score(self, stage, metrics):
+        weights = dict(DEFAULT_WEIGHTS[stage], **self.weights)
+        return sum(weights.get(name, 0.0) * value for name, value in metrics.items())
+
+    def search(self, stage, inputs):
+        """
+        Returns (result, info) for the best seed found within the budget.
+        info has the winning seed, its metrics/score and how many seeds were tried.
+        """
+        deadline = time.monotonic() + self.time_budget
+
+        # The standard ordering always runs first, so there is a result even with no budget left
+        best_seed = None
+        best_result, best_metrics = run_stage(stage, inputs, None)
+        best_score = self.score(stage, best_metrics)
+        tried = 1
+
+        seeds = [self.base_seed + i for i in range(self.runs)]
+        if seeds and time.monotonic() < deadline:
+            pool = multiprocessing.Pool(self.max_workers, _init_worker, (stage, inputs))
+            try:
+                results = pool.imap_unordered(_evaluate_seed, seeds)
+                for _ in seeds:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        seed, metrics = results.next(timeout=remaining)
+                    except multiprocessing.TimeoutError:
+                        break
+                    tried += 1
+                    score = self.score(stage, metrics)
+                    if score < best_score:
+                        best_seed, best_metrics, best_score = seed, metrics, score
+            finally:
+                # Seeds still running when the budget is spent are stopped, not left to finish
+                pool.terminate()
+                pool.join()
+
+            if best_seed is not None:
+                best_result, best_metrics = run_stage(stage, inputs, best_seed)
+
+        info = {"seed": best_seed, "score": best_score, "metrics": best_metrics, "tried": tried}
+        return best_result, info
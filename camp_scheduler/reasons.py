@@ -0,0 +1,135 @@
+from array import array
+
+import numpy as np
+
+# Reason codes recorded by assign_campers; the text is only built when rendered
+CHOICE_NOT_CONFIGURED = 0
+ALREADY_HAS_CLASS = 1
+CLASS_FULL = 2
+SPAN_TAKEN = 3
+SPAN_CUT_SHORT = 4
+PERIOD_TAKEN = 5
+OVERFILL_REMOVED = 6
+WENT_INACTIVE = 7
+CLASS_NOT_CONFIGURED = 8
+ALREADY_ELSEWHERE = 9
+DOUBLE_NOT_ASSIGNABLE = 10
+NOT_ASSIGNABLE = 11
+NOT_CAMPER_ASSIGNABLE = 12
+NOT_OFFERED = 13
+NO_CLASS = 14
+
+REASON_NAMES = [
+    "choice_not_configured", "already_has_class", "class_full", "span_taken", "span_cut_short",
+    "period_taken", "overfill_removed", "went_inactive", "class_not_configured", "already_elsewhere",
+    "double_not_assignable", "not_assignable", "not_camper_assignable", "not_offered", "no_class",
+]
+
+REASON_TEXT = {
+    CHOICE_NOT_CONFIGURED: "Choice {cls} not in class_configs",
+    ALREADY_HAS_CLASS: "Already assigned to {cls} in another period",
+    CLASS_FULL: "Class {cls} full in period {p}",
+    SPAN_TAKEN: "Double-period {cls} needs {span}, but already assigned in one",
+    SPAN_CUT_SHORT: "Double-period {cls} needs P{p}, but already assigned in P{p}",
+    PERIOD_TAKEN: "Already assigned in period {p}",
+    OVERFILL_REMOVED: "Removed from {cls} in period {p} due to overfill",
+    WENT_INACTIVE: "Class {cls} in period {p} went inactive (underfilled)",
+    CLASS_NOT_CONFIGURED: "Class {cls} not in config",
+    ALREADY_ELSEWHERE: "Already assigned to {cls} elsewhere",
+    DOUBLE_NOT_ASSIGNABLE: "Double-period {cls} not assignable in period {p} (conflict or full)",
+    NOT_ASSIGNABLE: "Class {cls} not assignable in period {p} (conflict or full)",
+    NOT_CAMPER_ASSIGNABLE: "Class {cls} not camper-assignable",
+    NOT_OFFERED: "Class {cls} not offered in period {p}",
+    NO_CLASS: "No available class for period {p}",
+}
+
+GLOBAL = -1  # slot of reasons that are not tied to one period
+
+
+class ReasonLog:
+    """
+    Why campers missed classes, as compact (camper, slot, code, class) records.
+
+    Each add() appends four integers to typed arrays; nothing is formatted
+    until for_camper() renders one camper's reasons, which is only done for
+    campers written to camper_unassigned_log.csv. counts() aggregates the
+    records per reason for the run summary.
+
+    max_per_camper caps the detail kept per camper. Later reasons for that
+    camper are still counted but not stored, and rendering notes how many
+    were left out.
+    """
+
+    def __init__(self, camper_ids, timetable, class_configs, max_per_camper=None):
+        self.camper_index = {cid: i for i, cid in enumerate(camper_ids)}
+        self.camper_ids = list(camper_ids)
+        self.timetable = timetable
+        self.class_configs = class_configs
+        self.max_per_camper = max_per_camper
+        self.class_names = []
+        self.class_index = {}
+
+        self.campers = array("i")
+        self.slots = array("i")
+        self.codes = array("b")
+        self.classes = array("i")
+        self.per_camper = np.zeros(len(self.camper_ids), dtype=np.int32)
+        self.dropped = np.zeros(len(self.camper_ids), dtype=np.int32)
+        self.code_counts = [0] * len(REASON_NAMES)
+        self._groups = None
+
+    def _class_id(self, class_name):
+        i = self.class_index.get(class_name)
+        if i is None:
+            i = self.class_index[class_name] = len(self.class_names)
+            self.class_names.append(class_name)
+        return i
+
+    def add(self, camper_id, slot, code, class_name=None):
+        """Record a reason; slot is a period or GLOBAL"""
+        i = self.camper_index[camper_id]
+        self.code_counts[code] += 1
+        if self.max_per_camper is not None and self.per_camper[i] >= self.max_per_camper:
+            self.dropped[i] += 1
+            return
+        self.per_camper[i] += 1
+        self.campers.append(i)
+        self.slots.append(slot)
+        self.codes.append(code)
+        self.classes.append(-1 if class_name is None else self._class_id(class_name))
+        self._groups = None
+
+    def __len__(self):
+        return len(self.codes)
+
+    def counts(self):
+        """{reason name: times recorded}, including reasons dropped by the cap"""
+        return {REASON_NAMES[code]: n for code, n in enumerate(self.code_counts) if n}
+
+    def render(self, k):
+        """Text of record k"""
+        code, p = self.codes[k], self.slots[k]
+        cls = self.class_names[self.classes[k]] if self.classes[k] >= 0 else ""
+        span = ""
+        if code == SPAN_TAKEN:
+            span = " and ".join(f"P{q}" for q in self.timetable.span(self.class_configs[cls], p))
+        return REASON_TEXT[code].format(cls=cls, p=p, span=span)
+
+    def for_camper(self, camper_id):
+        """{period or "global": [reason text, in recorded order]} for one camper"""
+        if self._groups is None:
+            # One stable sort groups every camper's records, keeping their order
+            campers = np.frombuffer(self.campers, dtype=np.int32) if len(self.campers) else np.zeros(0, np.int32)
+            order = np.argsort(campers, kind="stable")
+            bounds = np.searchsorted(campers[order], np.arange(len(self.camper_ids) + 1))
+            self._groups = (order, bounds)
+        order, bounds = self._groups
+
+        i = self.camper_index[camper_id]
+        reasons = {}
+        for k in order[bounds[i]:bounds[i + 1]]:
+            slot = self.slots[k]
+            reasons.setdefault("global" if slot == GLOBAL else slot, []).append(self.render(k))
+        if self.dropped[i]:
+            reasons.setdefault("global", []).append(f"{self.dropped[i]} more reason(s) not recorded")
+        return reasons
@@ -0,0 +1,118 @@
+import copy
+import csv
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from .engines import assign_staff_patterns, assign_campers
+from .inputs import get_data_dir, get_data_path
+from .timetable import Timetable
+
+
+class ScenarioBase:
+    """Parsed inputs shared (read-only) by every scenario"""
+
+    def __init__(self, class_configs, fixed_off_periods, staff_data, campers, timetable=None):
+        self.class_configs = class_configs
+        self.fixed_off_periods = fixed_off_periods
+        self.staff_data = staff_data
+        self.campers = campers
+        self.timetable = timetable or Timetable()
+
+    @classmethod
+    def load(cls, data_dir):
+        with open(get_data_path(data_dir, "classes.json")) as f:
+            class_configs = json.load(f)
+        with open(get_data_path(data_dir, "fixed_skills_off.json")) as f:
+            fixed_off_periods = json.load(f)
+        staff_data = pd.read_csv(get_data_path(data_dir, "index.csv")).set_index("id").to_dict("index")
+        with open(get_data_path(data_dir, "camper_choices.csv")) as f:
+            campers = list(csv.DictReader(f))
+        return cls(class_configs, fixed_off_periods, staff_data, campers, Timetable.load(data_dir))
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Base over an InputSnapshot's already parsed files"""
+        return cls(snapshot.get("classes.json"), snapshot.get("fixed_skills_off.json"),
+                   snapshot.get("staff_records"), snapshot.get("camper_choices.csv"), snapshot.timetable)
+
+
+def apply_patch(config, patch):
+    """
+    Return a copy of config with patch merged in.
+
+    Nested dicts are merged, other values replace the original, and a value
+    of None removes the key. e.g. {"Archery": {"preferred_periods": [2]}}
+    """
+    merged = copy.deepcopy(config)
+    for key, value in patch.items():
+        if value is None:
+            merged.pop(key, None)
+        elif isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = apply_patch(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def evaluate_scenario(base, scenario):
+    """
+    Run assign_staff_patterns + assign_campers for one scenario.
+
+    scenario: {"name": ..., "classes": {...patch...}, "fixed_skills_off": {...patch...}}
+    Returns one row of the comparison table.
+    """
+    start = time.perf_counter()
+    class_configs = apply_patch(base.class_configs, scenario.get("classes", {}))
+    fixed_off_periods = apply_patch(base.fixed_off_periods, scenario.get("fixed_skills_off", {}))
+
+    _, period_class_needs = assign_staff_patterns(class_configs, fixed_off_periods, base.staff_data, base.timetable)
+    result = assign_campers(class_configs, base.campers, timetable=base.timetable)
+
+    ranks = result.preference_ranks()
+    ranked = {int(k): v for k, v in ranks.items() if k != "unranked"}
+    ranked_total = sum(ranked.values())
+    return {
+        "scenario": scenario.get("name", ""),
+        "unassigned_campers": len(result.unassigned_campers()),
+        "inactive_classes": len(result.inactive_classes),
+        "unfilled_staff_slots": sum(len(needs) for needs in period_class_needs.values()),
+        "first_choice_share": round(ranked.get(1, 0) / len(base.campers), 3) if base.campers else 0.0,
+        "mean_preference_rank": round(sum(k * v for k, v in ranked.items()) / ranked_total, 3) if ranked_total else None,
+        "unranked_classes": ranks.get("unranked", 0),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+# Worker processes receive the parsed base once, through the pool initializer
+_worker_base = None
+
+
+def _init_worker(base):
+    global _worker_base
+    _worker_base = base
+
+
+def _evaluate_in_worker(scenario):
+    return evaluate_scenario(_worker_base, scenario)
+
+
+def run_scenarios(scenarios, base=None, data_dir=None, max_workers=None, include_base=True):
+    """
+    Evaluate what-if scenarios in parallel worker processes.
+
+    scenarios: list of {"name", "classes", "fixed_skills_off"} patches
+    Returns a DataFrame comparing unassigned campers, inactive classes and
+    preference satisfaction, with the unpatched base as the first row.
+    """
+    base = base or ScenarioBase.load(data_dir or get_data_dir())
+    scenarios = ([{"name": "base"}] if include_base else []) + list(scenarios)
+
+    if max_workers == 1 or len(scenarios) == 1:
+        rows = [evaluate_scenario(base, s) for s in scenarios]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(base,)) as pool:
+            rows = list(pool.map(_evaluate_in_worker, scenarios))
+    return pd.DataFrame(rows)
@@ -1,224 +1,337 @@
 import os
 import csv
-import random
 import json
 from collections import defaultdict
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
-import importlib.resources
+
+from .inputs import get_data_path
+from .validation import InputValidationError
+from .analysis import analyze_capacity
+from .grid import ScheduleGrid, NO_COVER
+from .store import ScheduleStore, STAGE_TABLES
+from .catalog import RunCatalog, summary_stats
+from .engines import assign_staff_patterns, assign_campers, assign_days_off, is_consecutive
+from .scenarios import ScenarioBase, run_scenarios
+from .local_search import improve_camper_assignment
+from .groups import camper_groups
+from .nights import assign_night_coverage
+from .waitlists import Waitlists
+from .warmstart import WarmStart, seed_staff_patterns, seed_camper_assignments
+from .locations import assign_freetime
+from .snapshot import InputSnapshot
+from .sheets import render_sheets, SHEET_KINDS
+
+# Lookup columns joined onto each output right after its "id" column
+OUTPUT_ENRICHMENT = {
+    "camper_assignments.csv": ("campers", ["name", "cabin"]),
+    "camper_unassigned_log.csv": ("campers", ["name", "cabin"]),
+    "coverage_schedule.csv": ("staff", ["name", "email"]),
+    "freetime_schedule.csv": ("staff", ["name", "email"]),
+    "skills_schedule.csv": ("staff", ["email"]),
+    "skills_unassigned.csv": ("staff", ["name", "email"]),
+    "time_off_unassigned.csv": ("staff", ["name", "email"]),
+}
+
+# Pipeline stages in run order: the data files each reads, the outputs it
+# writes and its self.stats keys. Used to rerun only the stages a change affects.
+STAGES = ["off_times", "nights", "freetime", "skills", "campers"]
+STAGE_INPUTS = {
+    "off_times": ["dates.json", "off_times_form.csv", "index.csv"],
+    "nights": ["index.csv"],
+    "freetime": ["index.csv", "coordinators.json", "locations.json"],
+    "skills": ["classes.json", "fixed_skills_off.json", "index.csv"],
+    "campers": ["classes.json", "camper_choices.csv"],
+}
+STAGE_OUTPUTS = {
+    "off_times": ["time_off_results.csv", "time_off_unassigned.csv"],
+    "nights": ["night_coverage.csv", "night_uncovered.csv"],
+    "freetime": ["freetime_schedule.csv"],
+    "skills": ["skills_schedule.csv", "skills_unassigned.csv", "coverage_schedule.csv"],
+    "campers": ["camper_assignments.csv", "skills_not_run.csv", "camper_unassigned_log.csv", "waitlists.csv"],
+}
+STAGE_STATS = {
+    "off_times": ["time_off", "email_matches"],
+    "nights": ["nights"],
+    "freetime": ["freetime"],
+    "skills": [],
+    "campers": ["campers", "local_search"],
+}
 
 class ProgramSchedules:
-    def __init__(self, week_start_date):
-        self.index_data = {}
+    def __init__(self, week_start_date, store=None, portfolio=None, inputs=None, output_root="Output",
+                 warm_start=None, catalog=True, group_by=None):
+        """
+        week_start_date: Monday of the week to schedule (DD/MM/YYYY)
+        store: optional ScheduleStore (or path to its SQLite file) that receives each stage's results
+        portfolio: optional Portfolio; the time-off and camper stages then keep the best of many seeded runs
+        inputs: optional InputSnapshot shared with other runs (the packaged data is parsed when omitted)
+        output_root: folder the run's Output/<timestamp> folder is created in
+        warm_start: optional previous run to seed the skills and camper stages
+                    from, as a run folder, a run id in `store` ("latest" for
+                    the newest) or a WarmStart; only the assignments the
+                    current inputs invalidate are redone
+        catalog: RunCatalog the run is recorded in (True: the one in output_root, False: none)
+        group_by: optional camper grouping ("friends" or "cabin") the camper stage seats together
+
+        Everything the run changes lives on this object, so several runs can
+        go at once (one per thread) over a single InputSnapshot.
+        """
+        self.inputs = inputs if inputs is not None else InputSnapshot()
+        self.index_data = self.inputs.index_data  # shared, read-only
+        self.staff_info = {}  # filled by load_staff_info
         self.day_off_data = {}
         self.week_start_date = datetime.strptime(week_start_date, "%d/%m/%Y")
-        self.skills_schedule = {}
-        self.skills_by_staff = {}
+        self.grid = None  # compact staff x day x period schedule shared by all stages
+        # Statistics gathered by each stage as it runs (used by export_output_summary)
+        self.stats = {"files": {}}
+        self.outputs = {}  # filename -> content as written, for diffing against another run
+        self._skills_rows = None
+        self.waitlists = None  # Waitlists, once campers have been assigned
+        self.group_by = group_by
+        self._reused_files = set()  # outputs copied from a previous run rather than made by this one
+        self._catalogued = None  # (stages, complete) last recorded in the catalog
         
-        # Get paths to data files (updated approach)
-        with importlib.resources.path('camp_scheduler', 'data') as data_path:
-            self.data_dir = str(data_path)
+        self.data_dir = self.inputs.data_dir
+        self.index_path = self.inputs.path("index.csv")
+        self.timetable = self.inputs.timetable  # days and periods of the program
+        self.stats["calendar"] = self.timetable.to_dict()
         
-        self.index_path = os.path.join(self.data_dir, "index.csv")
-        self.staff_info = pd.read_csv(self.index_path)
-        
-        # Create output directory
-        self.timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        self.output_dir = os.path.join("Output", self.timestamp)
-        os.makedirs(self.output_dir, exist_ok=True)
+        # Opened first, so a new catalog's initial sync does not see this run's empty folder
+        if catalog is True:
+            catalog = RunCatalog(output_root)
+        self.catalog = catalog or None
+
+        # Create output directory (runs started in the same second get a numbered suffix)
+        self._created = datetime.now()
+        stamp = self._created.strftime("%Y-%m-%d_%H-%M-%S")
+        self.timestamp, n = stamp, 1
+        while True:
+            self.output_dir = os.path.join(output_root, self.timestamp)
+            try:
+                os.makedirs(self.output_dir)
+                break
+            except FileExistsError:
+                n += 1
+                self.timestamp = f"{stamp}_{n}"
+
+        # Optional SQLite history of stage results
+        if isinstance(store, str):
+            store = ScheduleStore(store)
+        self.store = store
+        self.portfolio = portfolio
+        # Loaded before this run is registered, so "latest" means the previous run
+        if warm_start is not None and not isinstance(warm_start, WarmStart):
+            warm_start = WarmStart.load(warm_start, self.store)
+        self.warm_start = warm_start
+        if self.store is not None:
+            self.store.register_run(self.timestamp, self.week_start_date)
+        self._catalog_run()
 
     def _get_data_path(self, filename):
         """Helper to get paths to data files"""
-        return os.path.join(self.data_dir, filename)
+        return get_data_path(self.data_dir, filename)
+
+    def _lookup_table(self, source):
+        """Staff or camper lookup table indexed by integer id, from the shared inputs"""
+        return self.inputs.lookup(source)
+
+    def _get_grid(self):
+        """Create the run's ScheduleGrid over the staff roster on first use"""
+        if self.grid is None:
+            self.grid = ScheduleGrid(self._lookup_table("staff").index, self.timetable.days, self.timetable.periods)
+        return self.grid
+
+    def _enrich(self, filename, df):
+        """Join name/email/cabin columns onto an output with one vectorized lookup"""
+        source, fields = OUTPUT_ENRICHMENT[filename]
+        fields = [f for f in fields if f not in df.columns]
+        if not fields or "id" not in df.columns:
+            return df
+
+        lookup = self._lookup_table(source)
+        keys = pd.to_numeric(df["id"], errors="coerce")
+        joined = lookup[fields].reindex(keys).fillna("")
+        joined.index = df.index
+
+        missing = sorted(set(keys[keys.notna() & ~keys.isin(lookup.index)].astype(int)))
+        if missing:
+            print(f"[Warning] No data found for {source} ID(s) in {filename}: {', '.join(map(str, missing))}")
+
+        pos = df.columns.get_loc("id") + 1  # new columns come right after the id
+        return pd.concat([df.iloc[:, :pos], joined, df.iloc[:, pos:]], axis=1)
 
     def _write_output(self, filename, content):
         """Helper to write output files directly to output directory"""
         path = os.path.join(self.output_dir, filename)
-        
+
+        # Outputs with a lookup join (or a store table) are handled as DataFrames
+        stored = self.store is not None and filename in STAGE_TABLES
+        if (filename in OUTPUT_ENRICHMENT or stored) and isinstance(content, list) and content:
+            if isinstance(content[0], dict):
+                content = pd.DataFrame(content)
+            else:
+                content = pd.DataFrame(content[1:], columns=content[0])
+        if isinstance(content, pd.DataFrame) and filename in OUTPUT_ENRICHMENT:
+            content = self._enrich(filename, content)
+        if stored and isinstance(content, pd.DataFrame):
+            self.store.write_stage(self.timestamp, filename, content, self.week_start_date, self.timetable.days)
+        self.outputs[filename] = content
+
         if isinstance(content, pd.DataFrame):
             content.to_csv(path, index=False)
+            rows = len(content)
         elif isinstance(content, list) and content and isinstance(content[0], dict):
             # Handle list of dictionaries
             df = pd.DataFrame(content)
             df.to_csv(path, index=False)
+            rows = len(content)
         elif isinstance(content, list):
             # Handle list of lists (rows)
             with open(path, 'w', newline='') as f:
                 writer = csv.writer(f)
                 writer.writerows(content)
+            rows = max(0, len(content) - 1)  # first row is the header
         else:
             with open(path, 'w') as f:
                 f.write(str(content))
+            rows = None
+        self.stats["files"][filename] = rows
+        self._catalog_run()
         return path
 
+    def _catalog_run(self, complete=False):
+        """Record the run in the catalog when the stages it has run (or its completion) change"""
+        if self.catalog is None:
+            return
+        made = set(self.stats["files"]) - self._reused_files
+        stages = [s for s in STAGES if made & set(STAGE_OUTPUTS[s])]
+        if (stages, complete) == self._catalogued:
+            return
+        self.catalog.record(
+            self.timestamp, self.output_dir, self.week_start_date, stages, complete, self.inputs.hashes,
+            summary_stats(self.stats), created=self._created.isoformat(timespec="microseconds"),
+        )
+        self._catalogued = (stages, complete)
+
+    def _search(self, stage, inputs):
+        """Run a stage through self.portfolio and record the winning seed in the stats"""
+        result, info = self.portfolio.search(stage, inputs)
+        self.stats.setdefault("portfolio", {})[stage] = info
+        seed = "standard order" if info["seed"] is None else f"seed {info['seed']}"
+        print(f"[INFO] {stage}: kept {seed} (score {info['score']:.1f}) out of {info['tried']} runs")
+        return result
+
+    def _record_warm_start(self, stage, kept, total):
+        """Note in the stats how much of the warm start a stage kept"""
+        info = self.stats.setdefault("warm_start", {"source": self.warm_start.source})
+        info[stage] = {"kept": kept, "previous": total}
+        print(f"[INFO] {stage}: warm start kept {kept} of {total} slots from {self.warm_start.source}")
+
     def _is_consecutive(self, date1_str, date2_str):
         """Return True if two dates are consecutive calendar days (in either order)"""
-        try:
-            date1 = datetime.strptime(date1_str, "%d/%m/%Y")
-            date2 = datetime.strptime(date2_str, "%d/%m/%Y")
-            return abs((date1 - date2).days) == 1
-        except:
-            return False
+        return is_consecutive(date1_str, date2_str)
 
-    def map_emails_to_ids_in_off_requests(self, off_requests):
+    def validate_inputs(self, strict=True):
         """
-        Replaces 'id' in off_requests using 'email' by matching it to self.index_data.
+        Pre-flight check of every data file before any expensive stage runs.
 
-        Modifies each request in-place. If a match is not found, leaves 'id' as None and logs a warning.
+        Writes validation_report.csv when issues are found. With strict=True,
+        raises InputValidationError if the report contains errors.
         """
-        email_to_id = {}
-        for staff_id, row in self.index_data.items():
-            email = row.get("email", "").strip().lower()
-            if email:
-                email_to_id[email] = staff_id
+        report = self.inputs.validation(self.week_start_date)
+        if report.issues:
+            report_path = self._write_output("validation_report.csv", report.to_rows())
+            print(report.summary())
+            print(f"Validation report saved to {report_path}")
+        if strict and not report.ok:
+            raise InputValidationError(report)
+        return report
+
+    def analyze_capacity(self):
+        """Quick feasibility check of the inputs without running the pipeline"""
+        analysis = analyze_capacity(self.inputs)
+        report_path = self._write_output("capacity_report.csv", analysis.to_rows())
+        print(analysis.summary())
+        print(f"Capacity report saved to {report_path}")
+        return analysis
+
+    def run_scenarios(self, scenarios, max_workers=None):
+        """Compare what-if patches to classes.json / fixed_skills_off.json (see scenarios.run_scenarios)"""
+        comparison = run_scenarios(scenarios, base=ScenarioBase.from_snapshot(self.inputs), max_workers=max_workers)
+        comparison_path = self._write_output("scenario_comparison.csv", comparison)
+        print(comparison.to_string(index=False))
+        print(f"Scenario comparison saved to {comparison_path}")
+        return comparison
+
+    def render_sheets(self, kinds=SHEET_KINDS, fmt="html", max_workers=None):
+        """Per-staff, per-camper and per-cabin documents from this run's outputs (see sheets.render_sheets)"""
+        sheets_dir = os.path.join(self.output_dir, "sheets")
+        counts = render_sheets(self.outputs, sheets_dir, kinds, fmt, max_workers)
+        print(f"Sheets saved to {sheets_dir}: " + ", ".join(f"{n} {kind}" for kind, n in counts.items()))
+        return counts
 
+    def map_emails_to_ids_in_off_requests(self, off_requests):
+        """
+        Replaces 'id' in off_requests using 'email', matched against the roster's IdentityIndex.
+
+        Modifies each request in-place. Exact emails and confident near matches
+        (typos, checked against the form name) get the staff id. Otherwise 'id'
+        is left as None, a warning is logged, and the request comes back in the
+        returned list of unassigned-report rows with the candidates and scores.
+        """
+        identities = self.inputs.get("identities")
+        unresolved = []
+        counts = {"exact": 0, "near": 0, "ambiguous": 0, "none": 0}
         for request in off_requests:
             email = request.get("email", "").strip().lower()
-            matched_id = email_to_id.get(email)
-            if matched_id:
-                request["id"] = matched_id
+            match = identities.match(email, request.get("name", ""))
+            counts[match.method] += 1
+            if match.staff_id is not None:
+                request["id"] = match.staff_id
+                if match.method == "near":
+                    print(f"[INFO] Matched email {email} to staff {match.staff_id} "
+                          f"<{match.candidates[0][1]}> (score {match.score:.2f})")
             else:
                 print(f"[WARN] No match found for email: {email}")
                 request["id"] = None  # Prevent assigning
+                unresolved.append({
+                    'id': '', 'name': request.get('name', ''), 'email': request.get('email', ''),
+                    'day_off': "Unassigned", 'night_off': "Unassigned", 'notes': request.get('notes', ''),
+                    'assignment_type': 'Unassigned', 'reason': match.describe(),
+                })
+        self.stats["email_matches"] = counts
+        return unresolved
 
     def assign_off_times(self):
         try:
-            # Load configuration files
-            with open(self._get_data_path("dates.json")) as f:
-                dates_config = json.load(f)
-            with open(self._get_data_path("off_times_form.csv")) as f:
-                off_requests = list(csv.DictReader(f))
-            with open(self.index_path) as f:
-                self.index_data = {row['id']: row for row in csv.DictReader(f)}
-
-            self.map_emails_to_ids_in_off_requests(off_requests)
-
-            # Process blackout periods with 1-day buffer
-            blackout_days = set()
-            for period in dates_config["blackout_periods"].values():
-                start = datetime.strptime(period["start"], "%Y-%m-%d")
-                end = datetime.strptime(period["end"], "%Y-%m-%d")
-                blackout_days.update([
-                    start - timedelta(days=1),
-                    start,
-                    end,
-                    end + timedelta(days=1)
-                ])
-
-            # Helper functions
-            def is_valid_date(date_str):
-                try:
-                    date = datetime.strptime(date_str, "%d/%m/%Y")
-                    return date not in blackout_days
-                except ValueError:
-                    return False
-
-            def has_coverage_conflict(staff_id, date_str, time_type):
-                coverage_id = self.index_data.get(staff_id, {}).get("coverage", "").strip()
-                if not coverage_id:
-                    return False
-                co_staff_assignments = staff_assignments.get(coverage_id, {})
-                return co_staff_assignments.get(time_type) == date_str
-
-            # Initialize tracking
-            assignments = []
-            unassigned_log = []
-            used_days = defaultdict(set)
-            used_nights = defaultdict(set)
-            staff_assignments = defaultdict(dict)
-            max_per_slot = max(1, int(len(self.index_data) * 0.25))
-
-            # Process each staff member
-            for request in off_requests:
-                person_id = request['id']
-                if person_id not in self.index_data:
-                    continue
+            # Configuration files (form rows are copied: their ids are filled in below)
+            dates_config = self.inputs.get("dates.json")
+            off_requests = [dict(row) for row in self.inputs.get("off_times_form.csv")]
+            self.inputs.get("index.csv")
 
-                assignment = {
-                    'id': person_id,
-                    'name': request['name'],
-                    'email': request['email'],
-                    'day_off': "Unassigned",
-                    'night_off': "Unassigned",
-                    'notes': request.get('notes', ''),
-                    'assignment_type': 'Unassigned'
-                }
+            unresolved = self.map_emails_to_ids_in_off_requests(off_requests)
 
-                # Try preferred day off
-                day_options = [d for d in [request['first option day'], request['second option day']] if d]
-                for option in day_options:
-                    if (is_valid_date(option) and
-                        len(used_days[option]) < max_per_slot and
-                        not has_coverage_conflict(person_id, option, 'day')):  # New check
-                        assignment['day_off'] = option
-                        assignment['assignment_type'] = 'Preferred'
-                        used_days[option].add(person_id)
-                        staff_assignments[person_id]['day'] = option
-                        break
-
-                # Try preferred night off
-                night_options = [d for d in [request['first option night'], request['second option night']] if d]
-                for option in night_options:
-                    if (is_valid_date(option) and
-                        len(used_nights[option]) < max_per_slot and
-                        not has_coverage_conflict(person_id, option, 'night') and
-                        not (assignment['day_off'] != "Unassigned" and 
-                            self._is_consecutive(assignment['day_off'], option))):
-                        assignment['night_off'] = option
-                        assignment['assignment_type'] = 'Preferred'
-                        used_nights[option].add(person_id)
-                        staff_assignments[person_id]['night'] = option
-                        break
-
-                # Automatic assignment fallback
-                all_dates = [
-                    (self.week_start_date + timedelta(days=x)).strftime("%d/%m/%Y") 
-                    for x in range(7)
-                ]
-                valid_dates = [d for d in all_dates if is_valid_date(d)]
-
-                if assignment['day_off'] == "Unassigned":
-                    available_days = [
-                        d for d in valid_dates 
-                        if (len(used_days[d]) < max_per_slot and
-                            not has_coverage_conflict(person_id, d, 'day'))
-                    ]
-                    if available_days:
-                        day_off = random.choice(available_days)
-                        assignment['day_off'] = day_off
-                        assignment['assignment_type'] = 'Automatic'
-                        used_days[day_off].add(person_id)
-                        staff_assignments[person_id]['day'] = day_off
-
-                if assignment['night_off'] == "Unassigned":
-                    available_nights = [
-                        d for d in valid_dates 
-                        if (len(used_nights[d]) < max_per_slot and
-                            not has_coverage_conflict(person_id, d, 'night') and
-                            not (assignment['day_off'] != "Unassigned" and 
-                                self._is_consecutive(assignment['day_off'], d)))
-                    ]
-                    if available_nights:
-                        night_off = random.choice(available_nights)
-                        assignment['night_off'] = night_off
-                        assignment['assignment_type'] = 'Automatic'
-                        used_nights[night_off].add(person_id)
-                        staff_assignments[person_id]['night'] = night_off
-
-                assignments.append(assignment)
-
-                # Log unassigned
-                if assignment['day_off'] == "Unassigned" or assignment['night_off'] == "Unassigned":
-                    reason = []
-                    if assignment['day_off'] == "Unassigned":
-                        reason.append("day: no valid slot")
-                    if assignment['night_off'] == "Unassigned":
-                        reason.append("night: no valid slot")
-                    unassigned_log.append({**assignment, 'reason': "; ".join(reason)})
+            inputs = (off_requests, self.index_data, dates_config, self.week_start_date)
+            if self.portfolio is not None:
+                assignments, unassigned_log, used_days, used_nights = self._search("off_times", inputs)
+            else:
+                assignments, unassigned_log, used_days, used_nights = assign_days_off(*inputs)
+            unassigned_log = unassigned_log + unresolved  # form rows no staff member could be matched to
 
             # Write outputs
             self._write_output("time_off_results.csv", assignments)
             self._write_output("time_off_unassigned.csv", unassigned_log)
+
+            self.stats["time_off"] = {
+                "staff": len(assignments),
+                "preferred": sum(1 for a in assignments if a['assignment_type'] == 'Preferred'),
+                "automatic": sum(1 for a in assignments if a['assignment_type'] == 'Automatic'),
+                "unassigned": len(unassigned_log),
+                "days_off_per_date": {d: len(ids) for d, ids in sorted(used_days.items())},
+                "nights_off_per_date": {d: len(ids) for d, ids in sorted(used_nights.items())},
+            }
             
             return assignments
 
@@ -229,13 +342,50 @@ class ProgramSchedules:
             self._write_output("time_off_unassigned.csv", empty)
             return []
 
+    def generate_night_coverage(self):
+        """
+        Night roster: every cabin (night post) has someone on each night of the week.
+
+        Built from the night_off column of this run's time_off_results.csv and
+        the cabin/coverage and department columns of index.csv (see
+        nights.assign_night_coverage). Posts nobody can cover are warned
+        about before the roster is written, and listed in night_uncovered.csv.
+        """
+        self.inputs.get("index.csv")
+        off_results_path = os.path.join(self.output_dir, "time_off_results.csv")
+        nights_off = {}
+        if os.path.exists(off_results_path):
+            with open(off_results_path, newline='') as f:
+                nights_off = {row['id']: row['night_off'] for row in csv.DictReader(f) if row.get('id')}
+        else:
+            print("[Warning] time_off_results.csv not found - night coverage assumes nobody is off")
+
+        coverage = assign_night_coverage(self.index_data, nights_off, self.week_start_date)
+        for date, department, needed, able in coverage.shortfalls:
+            print(f"[WARN] {date}: {needed} {department or 'no-department'} post(s) need night cover, "
+                  f"only {able} {department or 'no-department'} staff free to cover")
+
+        columns = ["Date", "Day", "Post", "Department", "On duty", "Covered by", "Status"]
+        coverage_path = self._write_output("night_coverage.csv", [columns] + [[row[c] for c in columns] for row in coverage.rows])
+        uncovered = coverage.uncovered()
+        uncovered_path = self._write_output("night_uncovered.csv", [columns] + [[row[c] for c in columns] for row in uncovered])
+
+        self.stats["nights"] = {
+            "posts": len(coverage.posts),
+            "nights": len(coverage.nights),
+            "floaters": len(coverage.floaters),
+            "status_counts": coverage.counts(),
+            "max_cover_nights": max(coverage.load.values(), default=0),
+            "shortfalls": len(coverage.shortfalls),
+        }
+        print(f"Night coverage saved to {coverage_path}")
+        if uncovered:
+            print(f"[WARN] {len(uncovered)} night post(s) uncovered, listed in {uncovered_path}")
+        return coverage
+
     def assign_freetime_locations(self):
         try:
-            # Load index.csv
-            with open(self.index_path, newline='') as index_file:
-                reader = csv.DictReader(index_file)
-                for row in reader:
-                    self.index_data[row['id']] = row
+            self.inputs.get("index.csv")
 
             # Load off_schedules/results.csv from output
             off_results_path = os.path.join(self.output_dir, "time_off_results.csv")
@@ -258,11 +408,11 @@ class ProgramSchedules:
                     if row.get('id') and row.get('day_off')
                 }
 
-            # Prepare day name and date mapping for Monday-Friday only (5 days)
-            weekdays = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+            # Prepare day name and date mapping for the program days
+            weekdays = self.timetable.days
             day_to_date = {}
-            for i, day in enumerate(weekdays):
-                date_str = (self.week_start_date + timedelta(days=i)).strftime("%d/%m/%Y")
+            for day in weekdays:
+                date_str = (self.week_start_date + timedelta(days=self.timetable.day_offset(day))).strftime("%d/%m/%Y")
                 day_to_date[day] = date_str
 
             # Determine unavailable staff per freetime day (day after off start)
@@ -276,675 +426,225 @@ class ProgramSchedules:
                 except:
                     continue  # skip malformed dates
 
-            # Load coordinators.json and locations.json from data directory
-            with open(self._get_data_path("coordinators.json")) as f:
-                coordinator_data = json.load(f)
-
-            with open(self._get_data_path("locations.json")) as f:
-                locations = json.load(f)
-
-            # Identify certified groups
-            lifeguards = {sid for sid, row in self.index_data.items() if row.get('lifeguard certification', '').strip().lower() == 'yes'}
-            archers = {sid for sid, row in self.index_data.items() if row.get('archery certification', '').strip().lower() == 'yes'}
-            climbers = {sid for sid, row in self.index_data.items() if row.get('high ropes certification', '').strip().lower() == 'yes'}
-            fishers = {sid for sid, row in self.index_data.items() if row.get('fishing proficiency', '').strip().lower() == 'yes'}
-
-            assignment_counts = defaultdict(int)
-            schedule = {day: {} for day in weekdays}
-
-            for day in weekdays:
-                assigned = set()
-                lifeguard_pool = lifeguards - unavailable[day]
-
-                # Assign coordinators
-                for location, ids in coordinator_data.items():
-                    for staff_id in ids:
-                        if staff_id not in unavailable[day] and staff_id not in assigned:
-                            schedule[day][location] = staff_id
-                            assigned.add(staff_id)
-                            assignment_counts[staff_id] += 1
-                            break
-
-                # Assign minimum 3 lifeguards
-                if "Lifeguard" not in schedule[day]:
-                    schedule[day]["Lifeguard"] = []
-                lg_assigned = 0
-                for lg in sorted(lifeguard_pool, key=lambda x: assignment_counts[x]):
-                    if lg not in assigned:
-                        schedule[day]["Lifeguard"].append(lg)
-                        assigned.add(lg)
-                        assignment_counts[lg] += 1
-                        lg_assigned += 1
-                        if lg_assigned >= 3:
-                            break
-
-                # Assign other locations
-                for location in locations:
-                    if location in schedule[day] or location == "Lifeguard":
-                        continue
-                    if location in ["Archery", "Climbing"] and day in ["Tuesday", "Thursday"]:
-                        continue
-                    if location == "Slingshot" and day not in ["Tuesday", "Thursday"]:
-                        continue
-
-                    # Certification pools
-                    if location == "Archery":
-                        pool = archers
-                    elif location == "Climbing":
-                        pool = climbers
-                    elif location == "Fishing":
-                        pool = fishers
-                    else:
-                        pool = set(self.index_data.keys())
-
-                    pool = pool - assigned - unavailable[day]
-
-                    # Apply department restriction
-                    restricted_departments = {"Mad City", "Chippe", "Tamakwa"}
-                    if location in restricted_departments:
-                        pool = {sid for sid in pool if self.index_data[sid].get("department", "").strip() == location}
-
-                    if not pool:
-                        continue
+            # coordinators.json, and locations.json with its day, certification and
+            # department rules already compiled to per-(location, day) staff masks
+            coordinator_data = self.inputs.get("coordinators.json")
+            compiled = self.inputs.get("locations")
+            schedule = assign_freetime(compiled, coordinator_data, unavailable)
 
-                    chosen = min(pool, key=lambda x: assignment_counts[x])
-                    schedule[day][location] = chosen
-                    assigned.add(chosen)
-                    assignment_counts[chosen] += 1
-
-                # Add more lifeguards if all other locations are covered
-                if isinstance(schedule[day].get("Lifeguard"), list) and len(schedule[day]) >= len(locations) - 2:
-                    while len(schedule[day]["Lifeguard"]) < 5:
-                        extra = [lg for lg in lifeguard_pool if lg not in assigned]
-                        if not extra:
-                            break
-                        chosen = min(extra, key=lambda x: assignment_counts[x])
-                        schedule[day]["Lifeguard"].append(chosen)
-                        assigned.add(chosen)
-                        assignment_counts[chosen] += 1
-
-                # Assign leftover staff to "Off"
-                off_candidates = set(self.index_data.keys()) - assigned - unavailable[day]
-                for staff_id in off_candidates:
-                    schedule[day].setdefault("Off", []).append(staff_id)
-                    assigned.add(staff_id)
-                    assignment_counts[staff_id] += 1
-
-            # Prepare output data
-            output_rows = []
+            # Store the week in the compact grid
+            grid = self._get_grid()
             for day in weekdays:
-                date = day_to_date[day]
                 for location, staff in schedule[day].items():
-                    if isinstance(staff, list):
-                        for s in staff:
-                            output_rows.append([day, date, location, s])
-                    else:
-                        output_rows.append([day, date, location, staff])
-                # Also write staff who are off that day explicitly
+                    for s in (staff if isinstance(staff, list) else [staff]):
+                        if int(s) in grid.staff_index:
+                            grid.set_location(s, day, location)
+                # Also record staff who are off that day explicitly
                 for staff_id in unavailable[day]:
-                    output_rows.append([day, date, "Day Off", staff_id])
+                    if int(staff_id) in grid.staff_index:
+                        grid.set_location(staff_id, day, "Day Off")
 
             # Write directly to output
-            freetime_path = self._write_output("freetime_schedule.csv", 
-                [["Day", "Date", "Location", "id"]] + output_rows)
+            freetime_path = self._write_output("freetime_schedule.csv", grid.to_freetime_rows(day_to_date))
 
             print(f"Weekly freetime schedule saved to {freetime_path}")
 
+            # Freetime load per staff member (staffed locations only, "Off"/"Day Off" not counted)
+            idle = [grid.locations.get(name) for name in ("Off", "Day Off")]
+            staffed = (grid.freetime >= 0) & ~np.isin(grid.freetime, idle)
+            self.stats["freetime"] = {
+                "load_per_staff": {str(sid): int(n) for sid, n in zip(grid.staff_ids, staffed.sum(axis=1))}
+            }
+
         except Exception as e:
             print(f"Error loading day off results: {str(e)}")
             self.day_off_data = {}  # Fallback to empty data
 
     def load_staff_info(self, index_path=None):
-        path = index_path if index_path else self.index_path
-        with open(path, newline='') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                staff_id = int(row["id"])
-                self.staff_info[staff_id] = {
-                    "email": row["email"],
-                    "name": row["name"],
-                    "lifeguard": row["lifeguard certification"].strip().lower() == "yes",
-                    "archery": row["archery certification"].strip().lower() == "yes",
-                    "high_ropes": row["high ropes certification"].strip().lower() == "yes",
-                    "fishing": row["fishing proficiency"].strip().lower() == "yes"
-                }
-
-    def generate_coverage_schedule(self, staff_skills_schedule, days_off_schedule, staff_data):
+        """Per-staff name, email and certification flags for this run (from index_path when given)"""
+        if index_path:
+            with open(index_path, newline='') as f:
+                rows = list(csv.DictReader(f))
+        else:
+            rows = self.inputs.get("index.csv")
+        self.staff_info = {}
+        for row in rows:
+            staff_id = int(row["id"])
+            self.staff_info[staff_id] = {
+                "email": row["email"],
+                "name": row["name"],
+                "lifeguard": row["lifeguard certification"].strip().lower() == "yes",
+                "archery": row["archery certification"].strip().lower() == "yes",
+                "high_ropes": row["high ropes certification"].strip().lower() == "yes",
+                "fishing": row["fishing proficiency"].strip().lower() == "yes"
+            }
+        return self.staff_info
+
+    def generate_coverage_schedule(self, grid=None, days_off_schedule=None):
         """
         Assigns coverage for staff who are OFF during their preferred periods, for each day.
+        grid: ScheduleGrid filled by assign_skills_classes (defaults to self.grid)
         days_off_schedule: {staff_id: [periods_off]}  # e.g., { "101": [1, 3], ... }
-        staff_skills_schedule: {staff_id: {day: {period: assignment_dict}}}
-        staff_data: dict of staff info
+
+        Fills grid.cover_for and returns it.
         """
-        coverage_schedule = defaultdict(lambda: defaultdict(lambda: None))
-        weekdays = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
-        periods = [1, 2, 3]
+        grid = grid if grid is not None else self.grid
+        if grid is None:
+            raise ValueError("No skills schedule in this run - run assign_skills_classes first")
+        if days_off_schedule is None:
+            days_off_schedule = self.inputs.get("fixed_skills_off.json")
+
+        # Staff x period mask of fixed OFF periods
+        fixed_off = np.zeros((len(grid.staff_ids), len(grid.periods)), dtype=bool)
+        for staff_id, off_periods in days_off_schedule.items():
+            i = grid.staff_index.get(int(staff_id))
+            if i is None:
+                continue
+            for period in off_periods:
+                if period in grid.period_index:
+                    fixed_off[i, grid.period_index[period]] = True
+
+        # Candidates: not teaching a class and not fixed OFF themselves
+        free = ~grid.teaching_mask()
+        grid.cover_for.fill(NO_COVER)
 
-        # Build a lookup for which staff are OFF each (day, period)
-        off_by_day_period = defaultdict(list)
         for staff_id, off_periods in days_off_schedule.items():
-            for day in weekdays:
+            off_idx = grid.staff_index.get(int(staff_id))
+            if off_idx is None:
+                continue
+            for d, day in enumerate(grid.days):
                 for period in off_periods:
-                    off_by_day_period[(day, period)].append(int(staff_id))
-
-        # For each (day, period) where someone is OFF, find a cover
-        for (day, period), off_staff_ids in off_by_day_period.items():
-            for off_id in off_staff_ids:
-                available_staff = []
-                for candidate_id in staff_data:
-                    if int(candidate_id) == int(off_id):
+                    p = grid.period_index.get(period)
+                    if p is None:
                         continue
-                    # Skip if candidate is also OFF this period (from days_off_schedule)
-                    candidate_off_periods = days_off_schedule.get(str(candidate_id), []) or days_off_schedule.get(int(candidate_id), [])
-                    if period in candidate_off_periods:
-                        continue
-                    # Skip if candidate is already assigned to a class (not OFF or Help)
-                    assignment = staff_skills_schedule.get(candidate_id, {}).get(day, {}).get(period)
-                    if assignment and assignment['class'] not in ['OFF', 'Help', 'Unassigned']:
-                        continue
-                    available_staff.append(candidate_id)
-
-                if available_staff:
-                    assigned_cover = available_staff[0]
-                    coverage_schedule[assigned_cover][f"{day} P{period}"] = f"Cover for {off_id}"
-                else:
-                    print(f"[Warning] No available staff to cover {off_id} during {day} P{period}")
+                    available = free[:, d, p] & ~fixed_off[:, p]
+                    available[off_idx] = False
+                    candidates = np.flatnonzero(available)
+                    if len(candidates):
+                        grid.cover_for[candidates[0], d, p] = off_idx
+                    else:
+                        print(f"[Warning] No available staff to cover {staff_id} during {day} P{period}")
 
-        return coverage_schedule
+        return grid.cover_for
 
     def assign_skills_classes(self):
         # Load required data
-        with open(self._get_data_path("classes.json")) as f:
-            class_configs = json.load(f)
-        with open(self._get_data_path("fixed_skills_off.json")) as f:
-            fixed_off_periods = json.load(f)
-
-        staff_df = pd.read_csv(self.index_path)
-        staff_data = staff_df.set_index("id").to_dict("index")
-
-        weekdays = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
-        periods = [1, 2, 3]
+        class_configs = self.inputs.get("classes.json")
+        fixed_off_periods = self.inputs.get("fixed_skills_off.json")
+        staff_data = self.inputs.get("staff_records")
 
         # --- 1. Assign fixed weekly pattern for each staff member ---
-
-        period_class_needs = {p: [] for p in periods}
-        for class_name, config in class_configs.items():
-            for period in config["preferred_periods"]:
-                if config.get("double_period") and period == 3:
-                    continue
-                for n in range(config["staff_required"]):
-                    period_class_needs[period].append((class_name, config))
-
-        staff_weekly_pattern = {}
-        assigned_classes = set()
-        for staff_id, info in staff_data.items():
-            pattern = [None, None, None]
-            for class_name, config in class_configs.items():
-                if staff_id in config.get("coordinators", []):
-                    for i, period in enumerate(periods):
-                        if period in config["preferred_periods"]:
-                            if config.get("double_period") and period == 3:
-                                continue
-                            pattern[i] = {"class": class_name, "role": "lead"}
-                            assigned_classes.add((period, class_name, staff_id))
-                            break
-            staff_weekly_pattern[staff_id] = pattern
-
-        # --- UPDATED: Use new fixed_skills_off.json structure ---
-        for staff_id, off_periods in fixed_off_periods.items():
-            pattern = staff_weekly_pattern.get(int(staff_id), [None, None, None])
-            for i, period in enumerate(periods):
-                if period in off_periods and pattern[i] is None:
-                    pattern[i] = {"class": "OFF", "role": "none"}
-                    break
-            staff_weekly_pattern[int(staff_id)] = pattern
-
-        for staff_id, info in staff_data.items():
-            pattern = staff_weekly_pattern.get(staff_id, [None, None, None])
-
-            # Determine which period to assign OFF first (if not fixed already)
-            off_assigned = any(x and x["class"] == "OFF" for x in pattern)
-            if not off_assigned:
-                # Find period with least demand to assign OFF
-                period_off_candidates = sorted(periods, key=lambda p: len(period_class_needs[p]))
-                for p in period_off_candidates:
-                    if pattern[p - 1] is None:
-                        pattern[p - 1] = {"class": "OFF", "role": "none"}
-                        break
-
-            # Assign two classes
-            assigned_count = sum(1 for x in pattern if x and x["class"] not in ("OFF", "Help"))
-            for i, period in enumerate(periods):
-                if pattern[i] is not None or assigned_count >= 2:
-                    continue
-                for idx, (class_name, config) in enumerate(period_class_needs[period]):
-                    if staff_id in config.get("coordinators", []):
-                        continue
-                    if any(x and x.get("class") == class_name for x in pattern):
-                        continue
-                    if class_name == "Waterfront" and info["lifeguard certification"] != "Yes":
-                        continue
-                    if class_name == "Archery" and info["archery certification"] != "Yes":
-                        continue
-                    if class_name == "High Ropes" and info["high ropes certification"] != "Yes":
-                        continue
-                    if class_name == "Fishing" and info["fishing proficiency"] != "Yes":
-                        continue
-
-                    # Handle double-periods
-                    if config.get("double_period", False):
-                        if period == 3 or i >= 2:
-                            continue  # No room for double period at P3
-                        if pattern[i + 1] is not None:
-                            continue  # Next period already filled
-                        # Assign both periods
-                        role = "assistant"
-                        if class_name == "Fishing" and info["fishing proficiency"] == "Yes":
-                            role = "lead"
-                        pattern[i] = {"class": class_name, "role": role}
-                        pattern[i + 1] = {"class": class_name, "role": role}
-                        assigned_classes.add((period, class_name, staff_id))
-                        assigned_classes.add((period + 1, class_name, staff_id))
-                        del period_class_needs[period][idx]
-                        assigned_count += 2
-                        break
-                    else:
-                        role = "assistant"
-                        if class_name == "Fishing" and info["fishing proficiency"] == "Yes":
-                            role = "lead"
-                        pattern[i] = {"class": class_name, "role": role}
-                        assigned_classes.add((period, class_name, staff_id))
-                        del period_class_needs[period][idx]
-                        assigned_count += 1
-                        break
-
-            # Fallback fill: if any unassigned left, mark as Help (but ensure exactly 1 OFF remains)
-            off_count = sum(1 for x in pattern if x and x["class"] == "OFF")
-            for i in range(3):
-                if pattern[i] is None:
-                    if off_count < 1:
-                        pattern[i] = {"class": "OFF", "role": "none"}
-                        off_count += 1
-                    else:
-                        pattern[i] = {"class": "Help", "role": "none"}
-
-            staff_weekly_pattern[staff_id] = pattern
+        seed = None
+        if self.warm_start is not None:
+            seed, kept, total = seed_staff_patterns(self.warm_start.staff, class_configs, fixed_off_periods,
+                                                    staff_data, self.timetable)
+            self._record_warm_start("skills", kept, total)
+        staff_weekly_pattern, _ = assign_staff_patterns(class_configs, fixed_off_periods, staff_data, self.timetable,
+                                                        seed=seed)
 
         # --- 2. Build the full weekly schedule for each staff member ---
-        staff_daily_schedule = defaultdict(lambda: defaultdict(dict))
-        class_assignments = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
-        unassigned_log = []
-
+        grid = self._get_grid()
         for staff_id, pattern in staff_weekly_pattern.items():
-            for day in weekdays:
-                for idx, period in enumerate(periods):
-                    entry = pattern[idx]
-                    staff_daily_schedule[staff_id][day][period] = entry
-                    if entry["class"] not in ["OFF", "Help"]:
-                        class_assignments[day][period][entry["class"]].append((staff_id, entry["role"]))
-
-        # --- 3. Prepare skills schedule output as id,name,P1,P2,P3 ---
-        skills_output = []
-        header = ["id", "name", "P1", "P2", "P3"]
-        skills_output.append(header)
-        for staff_id in staff_data:
-            row = [staff_id, staff_data[staff_id].get("name", "")]
-            for idx in range(3):
-                entry = staff_weekly_pattern[staff_id][idx]
-                if entry["class"] == "OFF":
-                    row.append("OFF")
-                elif entry["class"] == "Help":
-                    row.append("Help")
-                elif entry["role"] == "lead":
-                    row.append(f"Lead {entry['class']}")
-                elif entry["role"] == "assistant":
-                    row.append(f"Assistant {entry['class']}")
-                else:
-                    row.append("Unassigned")
-            skills_output.append(row)
+            if int(staff_id) in grid.staff_index:
+                grid.set_pattern(staff_id, pattern)
+
+        # --- 3. Prepare skills schedule output as id,name,P1..Pn ---
+        names = {int(staff_id): info.get("name", "") for staff_id, info in staff_data.items()}
+        skills_output = grid.to_skills_rows(names)
 
         skills_path = self._write_output("skills_schedule.csv", skills_output)
+        self._skills_rows = skills_output
 
         # --- 4. Write unassigned log (should be empty) ---
-        for staff_id in staff_data:
-            for day in weekdays:
-                for period in periods:
-                    if not staff_daily_schedule[staff_id][day][period]:
-                        unassigned_log.append({"id": staff_id, "day": day, "period": period})
         unassigned_path = self._write_output("skills_unassigned.csv", 
-            [["id", "day", "period"]] + [[x["id"], x["day"], x["period"]] for x in unassigned_log])
-
-        self.skills_schedule = class_assignments
-        self.skills_by_staff = staff_daily_schedule
+            [["id", "day", "period"]] + [list(slot) for slot in grid.unassigned_slots()])
 
         # --- 5. Generate coverage schedule ---
-        coverage_schedule = self.generate_coverage_schedule(staff_daily_schedule, fixed_off_periods, staff_data)
-
-        coverage_output = []
-        coverage_header = ["id"] + [f"{day} P{p}" for day in weekdays for p in periods]
-        coverage_output.append(coverage_header)
-        for staff_id in staff_data:
-            row = [staff_id]
-            for day in weekdays:
-                for p in periods:
-                    task = coverage_schedule[staff_id].get(f"{day} P{p}", "")
-                    row.append(task if task else "")
-            coverage_output.append(row)
-
-        coverage_path = self._write_output("coverage_schedule.csv", coverage_output)
+        self.generate_coverage_schedule(grid, fixed_off_periods)
+        coverage_path = self._write_output("coverage_schedule.csv", grid.to_coverage_rows())
 
         print(f"Weekly skills classes schedule saved to {skills_path}")
         print(f"Coverage skills classes schedule saved to {coverage_path}")
 
-    def assign_campers_to_skills(self):
-
-        # Load class configurations from package data directory
-        with open(self._get_data_path("classes.json")) as f:
-            class_configs = json.load(f)
-
-        # Load camper choices
-        campers = []
-        with open(self._get_data_path("camper_choices.csv")) as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                campers.append(row)
+    def assign_campers_to_skills(self, improve_iterations=10000, reason_limit=None, group_by=None,
+                                 improve_budget=None):
+        """
+        improve_iterations: camper visits for the local-search pass run after
+        the greedy assignment (swaps, ejection chains, moves between periods); 0 skips it
+        improve_budget: optional seconds after which the local search also stops
+        (the result then depends on machine speed)
+        reason_limit: most reasons kept per camper in camper_unassigned_log.csv (all when None)
+        group_by: "friends" (the optional friends column of camper_choices.csv)
+        or "cabin" to seat those campers together where they share choices
+        (the run's group_by when None)
+        """
+        group_by = group_by or self.group_by
 
-        # Sort campers by submission_time (earlier submissions first)
-        campers.sort(key=lambda x: x.get("submission_time", "9999-12-31T23:59:59"))
+        # Class configurations and camper choices (read-only, shared with other runs)
+        class_configs = self.inputs.get("classes.json")
+        campers = self.inputs.get("camper_choices.csv")
 
-        # Build demand list with weights
-        class_demand = defaultdict(list)  # class -> list of (weight, camper_id, camper_data)
-        for camper in campers:
-            for i in range(1, 6):
-                choice = camper[f'class{i}']
-                if choice and choice in class_configs:
-                    class_demand[choice].append((i, camper['id'], camper))
-                elif choice and choice not in class_configs:
-                    camper.setdefault('_unassign_reasons', {}).setdefault('global', []).append(
-                        f"Choice {choice} not in class_configs"
-                    )
-
-        # Sort demand FIFO style with preference weighting
-        for class_name in class_demand:
-            class_demand[class_name].sort(key=lambda x: (x[0], int(x[1])))
-
-        # Assignments and tracking
-        camper_assignments = defaultdict(dict)  # camper_id -> period -> class
-        class_rosters = defaultdict(lambda: defaultdict(list))  # class -> period -> list of camper ids
-        inactive_classes = set()
-        camper_periods = defaultdict(set)  # camper_id -> set of assigned periods
-        unassign_reasons = defaultdict(lambda: defaultdict(list))  # camper_id -> period -> list of reasons
-
-        # Helper: Check if camper already has this class (single or double)
-        def camper_has_class(camper_id, class_name):
-            return class_name in camper_assignments[camper_id].values()
-
-        # First pass: assign up to 3 periods
-        for priority in range(1, 6):
-            for class_name, demand_list in class_demand.items():
-                config = class_configs.get(class_name, {})
-                preferred_periods = config.get("preferred_periods", [])
-                is_double = config.get("double_period", False)
-
-                for weight, camper_id, camper in demand_list:
-                    if weight != priority:
-                        continue
-                    if len(camper_assignments[camper_id]) >= 3:
-                        continue
+        seed = None
+        if self.warm_start is not None:
+            seed, kept, total = seed_camper_assignments(self.warm_start.campers, class_configs, campers, self.timetable)
+            self._record_warm_start("campers", kept, total)
 
-                    assigned = False
-                    for p in sorted(preferred_periods):
-                        if camper_has_class(camper_id, class_name):
-                            unassign_reasons[camper_id][p].append(
-                                f"Already assigned to {class_name} in another period"
-                            )
-                            continue
-                        staff_count = config.get("staff_required", 1)
-                        camper_limit = 8 * staff_count
-
-                        if len(class_rosters[class_name][p]) >= camper_limit:
-                            unassign_reasons[camper_id][p].append(
-                                f"Class {class_name} full in period {p}"
-                            )
-                            continue
-
-                        if is_double:
-                            if p == 3:
-                                if 3 not in camper_periods[camper_id] and 3 not in camper_assignments[camper_id]:
-                                    # Assign only P3 (since only P3 is possible for a double in P3)
-                                    camper_assignments[camper_id][3] = class_name
-                                    camper_periods[camper_id].add(3)
-                                    class_rosters[class_name][3].append(camper_id)
-                                    assigned = True
-                                    break
-                                else:
-                                    unassign_reasons[camper_id][3].append(
-                                        f"Double-period {class_name} needs P3, but already assigned in P3"
-                                    )
-                            elif p in [1, 2]:
-                                # Assign both p and p+1, must not be assigned in either
-                                if (p not in camper_periods[camper_id] and
-                                    (p + 1) not in camper_periods[camper_id] and
-                                    p not in camper_assignments[camper_id] and
-                                    (p + 1) not in camper_assignments[camper_id]):
-                                    if len(class_rosters[class_name][p]) >= camper_limit:
-                                        unassign_reasons[camper_id][p].append(
-                                            f"Class {class_name} full in period {p} (double-period)"
-                                        )
-                                        continue
-                                    # Assign to both periods
-                                    camper_assignments[camper_id][p] = class_name
-                                    camper_assignments[camper_id][p + 1] = class_name
-                                    camper_periods[camper_id].add(p)
-                                    camper_periods[camper_id].add(p + 1)
-                                    class_rosters[class_name][p].append(camper_id)
-                                    class_rosters[class_name][p + 1].append(camper_id)
-                                    assigned = True
-                                    break
-                                else:
-                                    unassign_reasons[camper_id][p].append(
-                                        f"Double-period {class_name} needs P{p} and P{p+1}, but already assigned in one"
-                                    )
-                        else:
-                            if p not in camper_periods[camper_id] and p not in camper_assignments[camper_id]:
-                                camper_assignments[camper_id][p] = class_name
-                                camper_periods[camper_id].add(p)
-                                class_rosters[class_name][p].append(camper_id)
-                                assigned = True
-                                break
-                            else:
-                                unassign_reasons[camper_id][p].append(
-                                    f"Already assigned in period {p}"
-                                )
-                    if assigned and len(camper_assignments[camper_id]) >= 3:
-                        break
-
-        # Enforce camper limit: 8 campers per staff
-        for class_name, period_map in class_rosters.items():
-            for period, camper_list in period_map.items():
-                config = class_configs[class_name]
-                staff_count = config.get("staff_required", 1)
-                camper_limit = 8 * staff_count
-                if len(camper_list) > camper_limit:
-                    overfill = camper_list[camper_limit:]
-                    class_rosters[class_name][period] = camper_list[:camper_limit]
-                    for camper_id in overfill:
-                        del camper_assignments[camper_id][period]
-                        camper_periods[camper_id].discard(period)
-                        unassign_reasons[camper_id][period].append(
-                            f"Removed from {class_name} in period {period} due to overfill"
-                        )
-
-        # Identify underfilled classes
-        for class_name, period_map in class_rosters.items():
-            for period, roster in period_map.items():
-                staff_count = class_configs[class_name]["staff_required"]
-                if len(roster) < 3 * staff_count:
-                    inactive_classes.add((class_name, period))
-
-        # Remove inactive class assignments
-        for camper in campers:
-            camper_id = camper['id']
-            periods_to_remove = [p for p, cname in camper_assignments[camper_id].items() if (cname, p) in inactive_classes]
-            for p in periods_to_remove:
-                cname = camper_assignments[camper_id][p]
-                del camper_assignments[camper_id][p]
-                camper_periods[camper_id].discard(p)
-                unassign_reasons[camper_id][p].append(
-                    f"Class {cname} in period {p} went inactive (underfilled)"
-                )
+        groups = camper_groups(campers, group_by) if group_by else None
 
-        # Refill with preferred classes
-        for camper in campers:
-            camper_id = camper['id']
-            if len(camper_assignments[camper_id]) >= 3:
-                continue
+        if self.portfolio is not None:
+            result = self._search("campers", (class_configs, campers, self.timetable, reason_limit, seed, groups))
+        else:
+            result = assign_campers(class_configs, campers, timetable=self.timetable, reason_limit=reason_limit,
+                                    seed=seed, groups=groups)
+        if improve_iterations:
+            self.stats["local_search"] = improve_camper_assignment(result, improve_iterations, improve_budget)
+        campers = result.campers
+        camper_assignments = result.assignments
+        inactive_classes = result.inactive_classes
+        unassign_reasons = result.unassign_reasons
 
-            for i in range(1, 6):
-                cname = camper[f'class{i}']
-                config = class_configs.get(cname, {})
-                if not config:
-                    unassign_reasons[camper_id]['global'].append(
-                        f"Class {cname} not in config"
-                    )
-                    continue
-                preferred_periods = config.get("preferred_periods", [])
-                is_double = config.get("double_period", False)
-                staff_count = config.get("staff_required", 1)
-                camper_limit = 8 * staff_count
-
-                for p in sorted(preferred_periods):
-                    if camper_has_class(camper_id, cname):
-                        unassign_reasons[camper_id][p].append(
-                            f"Already assigned to {cname} elsewhere"
-                        )
-                        continue
-                    if is_double:
-                        if p == 3 and 3 not in camper_periods[camper_id] and 3 not in camper_assignments[camper_id] and len(class_rosters[cname][3]) < camper_limit:
-                            camper_assignments[camper_id][3] = cname
-                            camper_periods[camper_id].add(3)
-                            class_rosters[cname][3].append(camper_id)
-                        elif p in [1, 2] and p not in camper_periods[camper_id] and (p + 1) not in camper_periods[camper_id] and p not in camper_assignments[camper_id] and (p + 1) not in camper_assignments[camper_id] and len(class_rosters[cname][p]) < camper_limit:
-                            camper_assignments[camper_id][p] = cname
-                            camper_assignments[camper_id][p + 1] = cname
-                            camper_periods[camper_id].update([p, p + 1])
-                            class_rosters[cname][p].append(camper_id)
-                            class_rosters[cname][p + 1].append(camper_id)
-                        else:
-                            unassign_reasons[camper_id][p].append(
-                                f"Double-period {cname} not assignable in period {p} (conflict or full)"
-                            )
-                    else:
-                        if p not in camper_periods[camper_id] and p not in camper_assignments[camper_id] and len(class_rosters[cname][p]) < camper_limit:
-                            camper_assignments[camper_id][p] = cname
-                            camper_periods[camper_id].add(p)
-                            class_rosters[cname][p].append(camper_id)
-                        else:
-                            unassign_reasons[camper_id][p].append(
-                                f"Class {cname} not assignable in period {p} (conflict or full)"
-                            )
-                    if len(camper_assignments[camper_id]) >= 3:
-                        break
-                if len(camper_assignments[camper_id]) >= 3:
-                    break
-
-        # FINAL assignment pass: assign any camper with missing periods to ANY open class
-        for camper in campers:
-            camper_id = camper['id']
-            if len(camper_assignments[camper_id]) >= 3:
-                continue
-            for p in [1, 2, 3]:
-                if p in camper_assignments[camper_id]:
-                    continue
-                assigned = False
-                for cname, config in class_configs.items():
-                    if not config.get("camper_assignable", True):
-                        unassign_reasons[camper_id][p].append(
-                            f"Class {cname} not camper-assignable"
-                        )
-                        continue
-                    if camper_has_class(camper_id, cname):
-                        unassign_reasons[camper_id][p].append(
-                            f"Already assigned to {cname} elsewhere"
-                        )
-                        continue
-                    if p not in config.get("preferred_periods", []):
-                        unassign_reasons[camper_id][p].append(
-                            f"Class {cname} not offered in period {p}"
-                        )
-                        continue
-                    staff_count = config.get("staff_required", 1)
-                    camper_limit = 8 * staff_count
-                    if len(class_rosters[cname][p]) >= camper_limit:
-                        unassign_reasons[camper_id][p].append(
-                            f"Class {cname} full in period {p}"
-                        )
-                        continue
-                    is_double = config.get("double_period", False)
-                    if is_double:
-                        if p in [1, 2] and p not in camper_periods[camper_id] and (p + 1) not in camper_periods[camper_id] and p not in camper_assignments[camper_id] and (p + 1) not in camper_assignments[camper_id]:
-                            camper_assignments[camper_id][p] = cname
-                            camper_assignments[camper_id][p + 1] = cname
-                            camper_periods[camper_id].update([p, p + 1])
-                            class_rosters[cname][p].append(camper_id)
-                            class_rosters[cname][p + 1].append(camper_id)
-                            assigned = True
-                            break
-                        elif p == 3 and 3 not in camper_periods[camper_id] and 3 not in camper_assignments[camper_id]:
-                            camper_assignments[camper_id][p] = cname
-                            camper_periods[camper_id].add(p)
-                            class_rosters[cname][p].append(camper_id)
-                            assigned = True
-                            break
-                        else:
-                            unassign_reasons[camper_id][p].append(
-                                f"Double-period {cname} not assignable in period {p} (conflict or full)"
-                            )
-                    else:
-                        if p not in camper_periods[camper_id] and p not in camper_assignments[camper_id]:
-                            camper_assignments[camper_id][p] = cname
-                            camper_periods[camper_id].add(p)
-                            class_rosters[cname][p].append(camper_id)
-                            assigned = True
-                            break
-                if not assigned:
-                    unassign_reasons[camper_id][p].append(
-                        f"No available class for period {p}"
-                    )
         # === Update staff schedule for inactive classes ===
 
-        # Load existing staff schedule
-        staff_schedule_path = os.path.join(self.output_dir, "skills_schedule.csv")
+        # Load existing staff schedule (kept in memory when assign_skills_classes ran in this run)
         staff_assignments = []
-        with open(staff_schedule_path, newline='') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                staff_assignments.append(row)
+        if self._skills_rows is not None:
+            header = self._skills_rows[0]
+            staff_assignments = [dict(zip(header, row)) for row in self._skills_rows[1:]]
+        else:
+            staff_schedule_path = os.path.join(self.output_dir, "skills_schedule.csv")
+            if os.path.exists(staff_schedule_path):
+                with open(staff_schedule_path, newline='') as f:
+                    reader = csv.DictReader(f)
+                    for row in reader:
+                        staff_assignments.append(row)
+            else:
+                print("[Warning] skills_schedule.csv not found - staff schedule not updated for inactive classes")
 
-        period_map = {1: "P1", 2: "P2", 3: "P3"}
+        period_columns = self.timetable.period_columns
         for row in staff_assignments:
-            for p in [1, 2, 3]:
-                col = period_map[p]
+            for p, col in zip(self.timetable.periods, period_columns):
                 class_name = row[col]
                 if (class_name, p) in inactive_classes:
                     row[col] = "OFF"  # Or "" for blank
 
         # Write updated schedule
-        header = ["id", "name", "P1", "P2", "P3"]
+        header = ["id", "name"] + period_columns
         skills_schedule_output = [header]
         for row in staff_assignments:
-            skills_schedule_output.append([row["id"], row["name"], row["P1"], row["P2"], row["P3"]])
+            skills_schedule_output.append([row["id"], row["name"]] + [row[col] for col in period_columns])
 
-        skills_schedule_path = self._write_output("skills_schedule.csv", skills_schedule_output)
+        if staff_assignments:
+            self._skills_rows = skills_schedule_output
+            self._write_output("skills_schedule.csv", skills_schedule_output)
 
 
 
         # Output final camper assignments
-        camper_output = [["id", "P1", "P2", "P3"]]
+        camper_output = [["id"] + self.timetable.period_columns]
         for camper in campers:
             cid = camper['id']
             row = [cid]
-            for p in [1, 2, 3]:
+            for p in self.timetable.periods:
                 row.append(camper_assignments[cid].get(p, ""))
             camper_output.append(row)
 
@@ -955,55 +655,79 @@ class ProgramSchedules:
         unassignable_output = [["id", "Missing Periods", "Reasons"]]
         for camper in campers:
             camper_id = camper['id']
-            assigned = camper_assignments[camper_id]
-            missing = []
-            for p in [1, 2, 3]:
-                covered = False
-                if p in assigned:
-                    covered = True
-                else:
-                    for check_p in [p-1, p]:
-                        if check_p in assigned:
-                            cname = assigned[check_p]
-                            config = class_configs.get(cname, {})
-                            if config.get("double_period", False):
-                                if (check_p == p - 1 and p in [2, 3]) or (check_p == p):
-                                    covered = True
-                                    break
-                if not covered:
-                    missing.append(str(p))
+            missing = [str(p) for p in result.missing_periods(camper_id)]
             if missing:
+                camper_reasons = unassign_reasons.for_camper(camper_id)  # rendered only for this log
                 reasons = []
                 for p in missing:
-                    reason_list = unassign_reasons[camper_id][int(p)]
+                    reason_list = camper_reasons.get(int(p), [])
                     if not reason_list:
                         reason_list = ["No available class for this period"]
                     reasons.append(f"P{p}: {'; '.join(reason_list)}")
-                global_reasons = unassign_reasons[camper_id].get('global', [])
+                global_reasons = camper_reasons.get('global', [])
                 if global_reasons:
                     reasons.append("Global: " + "; ".join(global_reasons))
                 unassignable_output.append([camper_id, ", ".join(missing), " | ".join(reasons)])
 
+        # Stats for the summary: fill ratio per (class, period) and preference ranks received
+        enrolled = result.enrollment()
+        class_fill = []
+        for cname, config in class_configs.items():
+            if not config.get("camper_assignable", True):
+                continue
+            camper_limit = 8 * config.get("staff_required", 1)
+            preferred = set(config.get("preferred_periods", []))
+            # Double periods also fill the period after their start
+            offered = preferred | {p for (c, p) in enrolled if c == cname}
+            for p in sorted(offered):
+                class_fill.append({
+                    "class": cname,
+                    "period": p,
+                    "preferred": p in preferred,
+                    "enrolled": enrolled[(cname, p)],
+                    "limit": camper_limit,
+                    "fill_ratio": round(enrolled[(cname, p)] / camper_limit, 3),
+                    "inactive": (cname, p) in inactive_classes,
+                })
+        self.stats["campers"] = {
+            "campers": len(campers),
+            "fully_assigned": len(campers) - (len(unassignable_output) - 1),
+            "inactive_classes": len(inactive_classes),
+            "preference_ranks": result.preference_ranks(),
+            "unassign_reasons": unassign_reasons.counts(),
+            "class_fill": class_fill,
+        }
+        if result.groups:
+            self.stats["campers"]["groups"] = result.groups
+
+        # Waitlists for drop/add: kept on the run so seats freed later promote the next camper
+        self.waitlists = Waitlists(result)
+
         camper_path = self._write_output("camper_assignments.csv", camper_output)
         inactive_path = self._write_output("skills_not_run.csv", inactive_output)
         unassignable_path = self._write_output("camper_unassigned_log.csv", unassignable_output)
+        waitlist_path = self._write_output("waitlists.csv", self.waitlists.rows())
 
         print(f"Camper skill assignments saved to {camper_path}")
         print(f"Inactive Classes saved to {inactive_path}")
         print(f"Unassignable Campers saved to {unassignable_path}")
+        print(f"Waitlists saved to {waitlist_path}")
 
     def export_output_summary(self):
-        """Create a summary log of all outputs, including period capacity info."""
-        import os, csv, json
-        from collections import defaultdict
+        """
+        Create a summary log of all outputs, including period capacity info.
 
+        Built from the statistics each stage recorded in self.stats, so no output
+        file is re-read. Writes log.txt and a machine-readable summary.json.
+        """
         log_summary = ["== Summary Log =="]
         log_summary.append(f"Timestamp: {self.timestamp}\n")
 
-        # Check output files and gather stats
         output_files = {
             "time_off_results.csv": "Day off assignments exported",
             "time_off_unassigned.csv": "Day off unassigned entries",
+            "night_coverage.csv": "Night coverage exported",
+            "night_uncovered.csv": "Night posts uncovered",
             "freetime_schedule.csv": "Freetime schedule exported",
             "skills_schedule.csv": "Skills schedule exported",
             "skills_unassigned.csv": "Skills unassigned entries",
@@ -1013,183 +737,181 @@ class ProgramSchedules:
             "camper_unassigned_log.csv": "Campers not fully assigned"
         }
 
+        written = self.stats["files"]
         for filename, message in output_files.items():
-            path = os.path.join(self.output_dir, filename)
-
-            if not os.path.exists(path):
+            if filename not in written:
                 log_summary.append(f"Missing file: {filename}")
-                continue
-
-            try:
-                # Check if file is empty or malformed
-                with open(path, newline='') as f:
-                    reader = csv.reader(f)
-                    rows = list(reader)
-                    if not rows or all(len(row) == 0 for row in rows):
-                        raise ValueError("Empty or malformed")
-
-                # Count rows if it's a "countable" file
-                if "unassigned" in filename or "not_run" in filename:
-                    count = len(rows) - 1 if len(rows) > 1 else 0
-                    log_summary.append(f"{message}: {count}")
-                else:
-                    log_summary.append(message)
-
-            except Exception:
-                os.remove(path)
-                log_summary.append(f"Deleted {filename} (empty or malformed)")
-                print(f"[INFO] Deleted empty/malformed file: {filename}")
+            elif "unassigned" in filename or "not_run" in filename or "uncovered" in filename:
+                log_summary.append(f"{message}: {written[filename] or 0}")
+            else:
+                log_summary.append(message)
+
+        time_off = self.stats.get("time_off")
+        if time_off:
+            log_summary.append(
+                f"Time off: {time_off['preferred']} preferred, {time_off['automatic']} automatic, "
+                f"{time_off['unassigned']} unassigned"
+            )
+        matches = self.stats.get("email_matches")
+        if matches and matches["exact"] != sum(matches.values()):
+            log_summary.append(
+                f"Form emails: {matches['exact']} exact, {matches['near']} near matches, "
+                f"{matches['ambiguous']} ambiguous, {matches['none']} unmatched"
+            )
+
+        warm_start = self.stats.get("warm_start")
+        if warm_start:
+            kept = [f"{stage} {info['kept']}/{info['previous']}" for stage, info in warm_start.items() if stage != "source"]
+            log_summary.append(f"Warm start from {warm_start['source']}: kept {', '.join(kept)} slots")
+
+        nights = self.stats.get("nights")
+        if nights:
+            counts = nights["status_counts"]
+            log_summary.append(
+                f"Night coverage: {nights['posts']} posts over {nights['nights']} nights, "
+                + ", ".join(f"{n} {status}" for status, n in sorted(counts.items()))
+                + f"; most nights covered by one person: {nights['max_cover_nights']}"
+            )
+
+        local_search = self.stats.get("local_search")
+        if local_search:
+            moves = local_search["moves"]
+            log_summary.append(
+                f"Camper local search: {moves['reassign']} reassigned, {moves['swap']} swaps, "
+                f"{moves['chain']} chains; unassigned {local_search['unassigned_before']} -> "
+                f"{local_search['unassigned_after']}"
+            )
+
+        # == Freetime load per staff member ==
+        freetime = self.stats.get("freetime")
+        if freetime and freetime["load_per_staff"]:
+            loads = list(freetime["load_per_staff"].values())
+            log_summary.append(
+                f"Freetime load per staff: min {min(loads)}, max {max(loads)}, "
+                f"mean {sum(loads) / len(loads):.2f}"
+            )
 
         # == Period capacity summary ==
-        try:
-            with open(self._get_data_path("classes.json")) as f:
-                class_configs = json.load(f)
-            # Load inactive classes
-            inactive_classes = set()
-            skills_not_run_path = os.path.join(self.output_dir, "skills_not_run.csv")
-            if os.path.exists(skills_not_run_path):
-                with open(skills_not_run_path, newline='') as f:
-                    reader = csv.reader(f)
-                    next(reader, None)  # skip header
-                    for row in reader:
-                        if len(row) >= 2:
-                            inactive_classes.add((row[0], int(row[1])))
-            # Load class_rosters from camper_assignments.csv
-            class_rosters = defaultdict(lambda: defaultdict(list))
-            assignments_path = os.path.join(self.output_dir, "camper_assignments.csv")
-            if os.path.exists(assignments_path):
-                with open(assignments_path, newline='') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        for p in [1, 2, 3]:
-                            cname = row.get(f"P{p}", "")
-                            if cname:
-                                class_rosters[cname][p].append(row["id"])
-        except Exception as e:
-            log_summary.append(f"Could not load class config or rosters: {e}")
-            class_configs = {}
-            class_rosters = {}
-            inactive_classes = set()
-
-        for p in [1, 2, 3]:
-            assignable_classes = []
-            full_or_inactive_classes = []
-            for cname, config in class_configs.items():
-                if not config.get("camper_assignable", True):
-                    continue
-                if p not in config.get("preferred_periods", []):
-                    continue
-                if (cname, p) in inactive_classes:
-                    full_or_inactive_classes.append(cname)
-                    continue
-                staff_count = config.get("staff_required", 1)
-                camper_limit = 8 * staff_count
-                roster = class_rosters.get(cname, {}).get(p, [])
-                if len(roster) >= camper_limit:
-                    full_or_inactive_classes.append(cname)
-                    continue
-                assignable_classes.append(cname)
-            if not assignable_classes:
-                log_summary.append(f"Period {p}: NO CAPACITY for any more campers (all assignable classes full or inactive)")
-            else:
-                log_summary.append(f"Period {p}: Capacity available in {', '.join(assignable_classes)}")
+        campers = self.stats.get("campers")
+        if campers:
+            ranks = campers["preference_ranks"]
+            log_summary.append(
+                "Preference ranks received: " + ", ".join(f"{k}: {v}" for k, v in ranks.items())
+            )
+            groups = campers.get("groups")
+            if groups:
+                log_summary.append(
+                    f"Camper groups: {groups['groups']} groups of {groups['campers']} campers, "
+                    f"{groups['seated_together']} seated together, {groups['splits']} split, "
+                    f"{groups['classes_together']} classes shared at a rank cost of {groups['rank_cost']}"
+                )
+            periods = sorted({row["period"] for row in campers["class_fill"]})
+            for p in periods:
+                assignable_classes = [
+                    row["class"] for row in campers["class_fill"]
+                    if row["period"] == p and row["preferred"] and not row["inactive"]
+                    and row["enrolled"] < row["limit"]
+                ]
+                if not assignable_classes:
+                    log_summary.append(f"Period {p}: NO CAPACITY for any more campers (all assignable classes full or inactive)")
+                else:
+                    log_summary.append(f"Period {p}: Capacity available in {', '.join(assignable_classes)}")
+        else:
+            log_summary.append("No camper assignment stats recorded for this run")
 
         # Write the summary log
         log_path = os.path.join(self.output_dir, "log.txt")
         with open(log_path, "w") as log_file:
             log_file.write("\n".join(log_summary))
 
+        summary_path = os.path.join(self.output_dir, "summary.json")
+        with open(summary_path, "w") as f:
+            json.dump({"timestamp": self.timestamp, "week_start": self.week_start_date.strftime("%Y-%m-%d"),
+                       **self.stats}, f, indent=2)
+        self._catalog_run(complete=True)
+
         print(f"Summary log created at {log_path}")
 
     def clean_output_files(self):
-        index_lookup = pd.read_csv(self.index_path).set_index("id").to_dict("index")
-
-        def get_info(staff_id, fields):
-            try:
-                sid = int(staff_id)
-            except ValueError:
-                return [""] * len(fields)
-
-            data = index_lookup.get(sid, {})
-            if sid not in index_lookup:
-                print(f"[Warning] No data found for staff ID: {sid}")
-            return [data.get(f, "") for f in fields]
-
-        def add_columns(input_path, output_path, insert_fields, insert_data_fn, id_col="id"):
-            full_path = os.path.join(self.output_dir, input_path)
-            if not os.path.exists(full_path):
-                print(f"File not found: {input_path}")
-                return
+        """
+        Enrich output files that are already on disk with name/email/cabin columns.
 
+        Files written by this run are joined before their first write, so this
+        only touches files that are missing the lookup columns (for example,
+        files copied in from an older run). Each lookup table is read once.
+        """
+        for filename in OUTPUT_ENRICHMENT:
+            path = os.path.join(self.output_dir, filename)
+            if not os.path.exists(path):
+                continue
             try:
-                df = pd.read_csv(full_path)
-            except pd.errors.EmptyDataError:
-                print(f"Skipping {input_path} - file is empty or malformed")
-                return
-
-            if id_col not in df.columns:
-                print(f"Skipping {input_path} - missing '{id_col}' column")
-                return
-
-            inserts = list(map(insert_data_fn, df[id_col]))
-
-            for i, field in enumerate(insert_fields):
-                df.insert(i + 1, field, [row[i] for row in inserts])  # +1 so it comes after ID
-
-            df.to_csv(os.path.join(self.output_dir, output_path), index=False)
-            print(f"Cleaned: {output_path}")
-
-        # Camper Assignments
-        def fix_camper_assignments():
-            path = os.path.join(self.output_dir, "camper_assignments.csv")
-            if os.path.exists(path):
-                df = pd.read_csv(path)
-                campers_path = self._get_data_path("camper_choices.csv")
-                campers_df = pd.read_csv(campers_path).set_index("id")
-                df.insert(1, "name", df["id"].map(campers_df["name"]))
-                df.insert(2, "cabin", df["id"].map(campers_df["cabin"]))
-                df.to_csv(path, index=False)
-                print("Cleaned: camper_assignments.csv")
-
-        def fix_camper_unassigned():
-            path = os.path.join(self.output_dir, "camper_unassigned_log.csv")
-            if os.path.exists(path):
                 df = pd.read_csv(path)
-                campers_path = self._get_data_path("camper_choices.csv")
-                campers_df = pd.read_csv(campers_path).set_index("id")
-                df.insert(1, "name", df["id"].map(campers_df["name"]))
-                df.insert(2, "cabin", df["id"].map(campers_df["cabin"]))
-                df.to_csv(path, index=False)
-                print("Cleaned: camper_unassigned_log.csv")
-
-        fix_camper_assignments()
-        fix_camper_unassigned()
-
-        # Staff-based files
-        staff_files = [
-            ("coverage_schedule.csv", "coverage_schedule.csv", ["name", "email"]),
-            ("freetime_schedule.csv", "freetime_schedule.csv", ["name", "email"]),
-            ("skills_schedule.csv", "skills_schedule.csv", ["email"]),
-            ("skills_unassigned.csv", "skills_unassigned.csv", ["name", "email"]),
-            ("time_off_unassigned.csv", "time_off_unassigned.csv", ["name", "email"]),
-        ]
-
-        for in_file, out_file, fields in staff_files:
-            add_columns(in_file, out_file, fields, lambda sid: get_info(sid, fields))
+            except pd.errors.EmptyDataError:
+                continue
+            enriched = self._enrich(filename, df)
+            if len(enriched.columns) != len(df.columns):
+                enriched.to_csv(path, index=False)
+                print(f"Cleaned: {filename}")
+
+    def _reuse_outputs(self, previous_run, stages):
+        """Copy the outputs and stats of `stages` from a completed run folder into this run"""
+        with open(os.path.join(previous_run, "summary.json")) as f:
+            previous_stats = json.load(f)
+        for stage in stages:
+            for filename in STAGE_OUTPUTS[stage]:
+                path = os.path.join(previous_run, filename)
+                if not os.path.exists(path):
+                    continue
+                self._reused_files.add(filename)
+                try:
+                    # Read as text so every value is written back exactly as it was
+                    self._write_output(filename, pd.read_csv(path, dtype=str, keep_default_na=False))
+                except pd.errors.EmptyDataError:
+                    self._write_output(filename, [])
+            for key in STAGE_STATS[stage]:
+                if key in previous_stats:
+                    self.stats[key] = previous_stats[key]
+            if stage in previous_stats.get("portfolio", {}):
+                self.stats.setdefault("portfolio", {})[stage] = previous_stats["portfolio"][stage]
+
+    def run_stages(self, stages=STAGES, previous_run=None, group_by=None):
+        """
+        Run the given pipeline stages (see STAGES) and write the summary.
+
+        The other stages' outputs and stats are reused from previous_run, a
+        completed run folder; without one every stage runs. The camper stage
+        updates the skills schedule built in the same run, so asking for
+        either of skills/campers runs both, and a new day-off assignment
+        always reruns night coverage and freetime. group_by overrides the
+        run's camper grouping for the camper stage.
+        """
+        stages = set(STAGES) if previous_run is None else set(stages)
+        if "off_times" in stages:
+            stages |= {"nights", "freetime"}
+        if stages & {"skills", "campers"}:
+            stages |= {"skills", "campers"}
 
-    def run_full_schedule(self):
         print("Starting scheduling process...")
-        
+        if previous_run is not None:
+            print(f"Rerunning {', '.join(s for s in STAGES if s in stages) or 'no stages'}, reusing {previous_run}")
+
         try:
-            if not self.assign_off_times():
+            self.validate_inputs()
+            if previous_run is not None:
+                self._reuse_outputs(previous_run, [s for s in STAGES if s not in stages])
+
+            if "off_times" in stages and not self.assign_off_times():
                 print("Warning: Proceeding with limited day off data")
-                
-            self.assign_freetime_locations()
-            self.load_staff_info()
-            self.assign_skills_classes()
-            self.assign_campers_to_skills()
+            if "nights" in stages:
+                self.generate_night_coverage()
+            if "freetime" in stages:
+                self.assign_freetime_locations()
+            if "skills" in stages:
+                self.load_staff_info()
+                self.assign_skills_classes()
+            if "campers" in stages:
+                self.assign_campers_to_skills(group_by=group_by)
             self.export_output_summary()
-            self.clean_output_files()
             
         except Exception as e:
             print(f"Scheduling failed: {str(e)}")
@@ -1198,4 +920,7 @@ class ProgramSchedules:
                 f.write(f"Scheduling failed at {datetime.now()}\nError: {str(e)}")
             raise  # Re-raise if you want to see the full traceback
             
-        print("Scheduling process completed!")
\ No newline at end of file
+        print("Scheduling process completed!")
+
+    def run_full_schedule(self):
+        self.run_stages(STAGES)
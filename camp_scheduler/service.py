@@ -0,0 +1,243 @@
+import os
+import csv
+import json
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs, unquote
+
+from .catalog import RUN_COMPLETE_MARKER, latest_run_dir
+from .timetable import PERIOD_COLUMN, SLOT_COLUMN, WEEKDAYS
+
+def _read_rows(run_dir, filename):
+    path = os.path.join(run_dir, filename)
+    if not os.path.exists(path):
+        return []
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+class ScheduleIndex:
+    """
+    Read-only hash indexes over one run's schedules.
+
+    Built once per run; every lookup is a dict access. Encoded JSON responses
+    are cached per key so repeated requests skip serialization.
+    """
+
+    def __init__(self, run_dir):
+        self.run_dir = run_dir
+        self.run_id = os.path.basename(os.path.normpath(run_dir))
+        self.staff = {}
+        self.campers = {}
+        self.cabins = defaultdict(list)
+        self.locations = defaultdict(lambda: defaultdict(list))   # location -> day -> [staff ids]
+        self.classes = defaultdict(lambda: defaultdict(lambda: {"staff": [], "campers": []}))  # class -> period
+        self.slots = defaultdict(lambda: {"classes": defaultdict(list), "coverage": []})   # (day, period)
+        self._responses = {}
+        self._build()
+
+    def _staff_record(self, staff_id, row=None):
+        record = self.staff.get(staff_id)
+        if record is None:
+            record = {"id": staff_id, "name": "", "email": "", "skills": {}, "coverage": {}, "freetime": {}}
+            self.staff[staff_id] = record
+        if row:
+            record["name"] = record["name"] or row.get("name", "")
+            record["email"] = record["email"] or row.get("email", "")
+        return record
+
+    def _program_days(self):
+        """Days the weekly skills pattern repeats on, from the run's summary"""
+        try:
+            with open(os.path.join(self.run_dir, RUN_COMPLETE_MARKER)) as f:
+                return json.load(f).get("calendar", {}).get("days", WEEKDAYS)
+        except (OSError, ValueError):
+            return WEEKDAYS
+
+    def _build(self):
+        # --- Skills: weekly pattern, the same every weekday ---
+        days = self._program_days()
+        for row in _read_rows(self.run_dir, "skills_schedule.csv"):
+            record = self._staff_record(row["id"], row)
+            for col, value in row.items():
+                match = PERIOD_COLUMN.match(col or "")
+                if not match or not value:
+                    continue
+                period = int(match.group(1))
+                record["skills"][col] = value
+                role, _, class_name = value.partition(" ")
+                if role in ("Lead", "Assistant") and class_name:
+                    self.classes[class_name][period]["staff"].append(row["id"])
+                    for day in days:
+                        self.slots[(day, period)]["classes"][class_name].append(row["id"])
+
+        # --- Coverage duties ---
+        for row in _read_rows(self.run_dir, "coverage_schedule.csv"):
+            record = self._staff_record(row["id"], row)
+            for col, value in row.items():
+                match = SLOT_COLUMN.match(col or "")
+                if not match or not value:
+                    continue
+                record["coverage"][col] = value
+                self.slots[(match.group(1), int(match.group(2)))]["coverage"].append(
+                    {"id": row["id"], "task": value}
+                )
+
+        # --- Freetime locations ---
+        for row in _read_rows(self.run_dir, "freetime_schedule.csv"):
+            record = self._staff_record(row["id"], row)
+            record["freetime"][row["Day"]] = row["Location"]
+            self.locations[row["Location"]][row["Day"]].append(row["id"])
+
+        # --- Campers ---
+        for row in _read_rows(self.run_dir, "camper_assignments.csv"):
+            record = {"id": row["id"], "name": row.get("name", ""), "cabin": row.get("cabin", "")}
+            for col, value in row.items():
+                match = PERIOD_COLUMN.match(col or "")
+                if match:
+                    record[col] = value
+                    if value:
+                        self.classes[value][int(match.group(1))]["campers"].append(row["id"])
+            self.campers[row["id"]] = record
+            if record["cabin"]:
+                self.cabins[record["cabin"]].append(record)
+
+    # --- Lookups ---
+
+    def lookup(self, kind, key, **params):
+        """Return (status, body bytes) for one query; bodies are cached"""
+        cache_key = (kind, key, tuple(sorted(params.items())))
+        cached = self._responses.get(cache_key)
+        if cached is not None:
+            return cached
+        result = self._resolve(kind, key, **params)
+        if result is None:
+            return 404, json.dumps({"error": f"{kind} '{key}' not found"}).encode()
+        response = (200, json.dumps(result).encode())
+        self._responses[cache_key] = response
+        return response
+
+    def _resolve(self, kind, key, day=None, period=None):
+        if kind == "staff":
+            return self.staff.get(key)
+        if kind == "camper":
+            return self.campers.get(key)
+        if kind == "cabin":
+            return self.cabins.get(key)
+        if kind == "location":
+            days = self.locations.get(key)
+            if days is None:
+                return None
+            return {"location": key, "days": {day: days.get(day, [])} if day else dict(days)}
+        if kind == "class":
+            periods = self.classes.get(key)
+            if periods is None:
+                return None
+            if period:
+                return {"class": key, "periods": {period: periods.get(int(period), {"staff": [], "campers": []})}}
+            return {"class": key, "periods": {str(p): v for p, v in periods.items()}}
+        if kind == "slot":
+            slot = self.slots.get((key, int(period)))
+            if slot is None:
+                return None
+            return {"day": key, "period": int(period), "classes": dict(slot["classes"]), "coverage": slot["coverage"]}
+        return None
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class ScheduleService:
+    """
+    Local read-only HTTP/JSON service over the latest completed run.
+
+    Routes:
+        GET /status
+        GET /staff/<id>          GET /camper/<id>          GET /cabin/<cabin>
+        GET /location/<name>[?day=Friday]
+        GET /class/<name>[?period=3]
+        GET /slot/<day>/<period>
+
+    A background thread checks output_root every poll_interval seconds and
+    swaps in a fresh index when a newer run completes.
+    """
+
+    def __init__(self, output_root="Output", host="127.0.0.1", port=8765, poll_interval=2.0):
+        self.output_root = output_root
+        self.poll_interval = poll_interval
+        self.index = None
+        self._stop = threading.Event()
+        self.reload()
+
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, body = service.handle(self.path)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # keep the console quiet during lineup bursts
+
+        self.server = _ThreadingHTTPServer((host, port), Handler)
+
+    def reload(self):
+        """Load the newest completed run if it differs from the current one"""
+        run_dir = latest_run_dir(self.output_root)
+        if run_dir is None:
+            return False
+        if self.index is not None and os.path.samefile(self.index.run_dir, run_dir):
+            return False
+        self.index = ScheduleIndex(run_dir)  # single reference swap, readers never see a partial index
+        print(f"[INFO] Serving schedules from {run_dir}")
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"[WARN] Reload failed: {e}")
+
+    def handle(self, path):
+        url = urlparse(path)
+        parts = [unquote(p) for p in url.path.strip("/").split("/") if p]
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        index = self.index
+
+        if parts == ["status"]:
+            body = {"run": index.run_id if index else None,
+                    "staff": len(index.staff) if index else 0,
+                    "campers": len(index.campers) if index else 0}
+            return 200, json.dumps(body).encode()
+        if index is None:
+            return 503, json.dumps({"error": "No completed run found"}).encode()
+        if not params.get("period", "0").isdigit():
+            return 400, json.dumps({"error": "period must be a number"}).encode()
+        if len(parts) == 2 and parts[0] in ("staff", "camper", "cabin", "location", "class"):
+            allowed = {"location": ("day",), "class": ("period",)}.get(parts[0], ())
+            return index.lookup(parts[0], parts[1], **{k: v for k, v in params.items() if k in allowed})
+        if len(parts) == 3 and parts[0] == "slot" and parts[2].isdigit():
+            return index.lookup("slot", parts[1], period=parts[2])
+        return 404, json.dumps({"error": f"Unknown route: {url.path}"}).encode()
+
+    def serve_forever(self):
+        watcher = threading.Thread(target=self._watch, daemon=True)
+        watcher.start()
+        host, port = self.server.server_address[:2]
+        print(f"Schedule service listening on http://{host}:{port}")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        self._stop.set()
+        self.server.server_close()
@@ -0,0 +1,231 @@
+import csv
+import html
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .diff import as_frame, id_order
+from .timetable import PERIOD_COLUMN, SLOT_COLUMN
+
+SHEET_KINDS = ["staff", "campers", "cabins"]
+SHEET_FORMATS = ["html", "csv"]
+
+PAGE_START = (
+    '<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{title}</title>\n'
+    "<style>body{{font-family:sans-serif}}table{{border-collapse:collapse}}"
+    "td,th{{border:1px solid #999;padding:2px 6px}}</style></head>\n"
+    "<body><h1>{title}</h1>\n{meta}<table>\n{header}"
+)
+PAGE_END = "</table></body></html>\n"
+
+
+# --- Templates, compiled once per (format, columns) in each worker ---
+
+class SheetTemplate:
+    """Renders documents of one layout; the row formats are built once and reused"""
+
+    def __init__(self, fmt, columns, meta_labels):
+        self.fmt = fmt
+        self.columns = list(columns)
+        self.meta_labels = list(meta_labels)
+        if fmt == "html":
+            self.header = "<tr>" + "".join(f"<th>{html.escape(c)}</th>" for c in self.columns) + "</tr>\n"
+            self.row = ("<tr>" + "<td>{}</td>" * len(self.columns) + "</tr>\n").format
+            self.meta = ("<p>" + " &middot; ".join(f"{html.escape(l)}: {{}}" for l in self.meta_labels) + "</p>\n").format
+        elif fmt != "csv":
+            raise ValueError(f"Unknown sheet format: {fmt} (expected one of {SHEET_FORMATS})")
+
+    def write(self, path, title, meta, rows):
+        """Stream one document to path"""
+        if self.fmt == "html":
+            escape = html.escape
+            with open(path, "w", encoding="utf-8") as f:
+                meta_html = self.meta(*map(escape, meta)) if self.meta_labels else ""
+                f.write(PAGE_START.format(title=escape(title), meta=meta_html, header=self.header))
+                f.writelines(self.row(*map(escape, row)) for row in rows)
+                f.write(PAGE_END)
+        else:
+            # Flat table: the document's meta values lead every row
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(self.meta_labels + self.columns)
+                writer.writerows(list(meta) + list(row) for row in rows)
+
+
+_templates = {}
+
+
+def _render_chunk(task):
+    """Worker: write one chunk of documents, returns how many were written"""
+    fmt, out_dir, columns, meta_labels, docs = task
+    key = (fmt, tuple(columns), tuple(meta_labels))
+    template = _templates.get(key)
+    if template is None:
+        template = _templates[key] = SheetTemplate(fmt, columns, meta_labels)
+    for name, title, meta, rows in docs:
+        template.write(os.path.join(out_dir, f"{name}.{fmt}"), title, meta, rows)
+    return len(docs)
+
+
+def _file_name(key):
+    return re.sub(r"[^\w.-]+", "_", str(key)).strip("_") or "blank"
+
+
+def _unique_names(docs):
+    """
+    Docs with a numbered suffix on any file name an earlier document already
+    took (keys such as "Cabin 1" and "Cabin_1" clean up to the same name).
+    Names are compared ignoring case, for case-insensitive file systems.
+    """
+    used = set()
+    unique = []
+    for name, title, meta, rows in docs:
+        candidate, n = name, 1
+        while candidate.lower() in used:
+            n += 1
+            candidate = f"{name}_{n}"
+        used.add(candidate.lower())
+        unique.append((candidate, title, meta, rows))
+    return unique
+
+
+# --- Grouping: every kind is sorted by its key once, then sliced ---
+
+def _staff_documents(outputs):
+    """(columns, meta labels, docs) for per-staff weekly sheets"""
+    skills = as_frame(outputs.get("skills_schedule.csv", []))
+    coverage = as_frame(outputs.get("coverage_schedule.csv", []))
+    freetime = as_frame(outputs.get("freetime_schedule.csv", []))
+    time_off = as_frame(outputs.get("time_off_results.csv", []))
+
+    periods = [c for c in skills.columns if PERIOD_COLUMN.match(c)]
+    slots = [(c,) + SLOT_COLUMN.match(c).groups() for c in coverage.columns if SLOT_COLUMN.match(c)]
+    days = list(dict.fromkeys([day for _, day, _ in slots] + list(freetime.get("Day", []))))
+    dates = {}
+    if not freetime.empty:
+        dates = freetime.drop_duplicates("Day").set_index("Day")["Date"].to_dict()
+
+    # One row per staff member: every table aligned on id with a single join
+    parts = []
+    people = []
+    for df, cols in ((skills, periods), (coverage, [c for c, _, _ in slots]), (time_off, ["day_off", "night_off"])):
+        if "id" in df.columns and not df.empty:
+            df = df[df["id"] != ""].drop_duplicates("id")
+            parts.append(df.set_index("id")[[c for c in cols if c in df.columns]])
+            people.append(df.set_index("id")[[c for c in ("name", "email") if c in df.columns]])
+    if not freetime.empty:
+        places = freetime[freetime["id"] != ""].drop_duplicates(["id", "Day"])
+        parts.append(places.pivot(index="id", columns="Day", values="Location").add_prefix("freetime:"))
+        people.append(places.drop_duplicates("id").set_index("id")[[c for c in ("name", "email") if c in places.columns]])
+    if not parts:
+        return [], [], []
+
+    staff = pd.concat(parts, axis=1).fillna("")
+    names = pd.concat(people).fillna("")
+    names = names[~names.index.duplicated(keep="first")].reindex(staff.index).fillna("")
+    for col in ("name", "email"):
+        staff[col] = names[col] if col in names.columns else ""
+    staff = staff.loc[sorted(staff.index, key=id_order)]
+
+    columns = ["Day", "Date", "Freetime"] + periods + ["Coverage"]
+    meta_labels = ["ID", "Email", "Day off", "Night off"]
+    docs = []
+    for staff_id, row in zip(staff.index, staff.to_dict("records")):
+        pattern = [row.get(p, "") for p in periods]
+        rows = []
+        for day in days:
+            duties = [f"P{period}: {row[col]}" for col, d, period in slots if d == day and row.get(col)]
+            rows.append([day, dates.get(day, ""), row.get(f"freetime:{day}", "")] + pattern + ["; ".join(duties)])
+        title = f"{row['name'] or 'Staff ' + staff_id} - weekly schedule"
+        meta = [staff_id, row["email"], row.get("day_off", ""), row.get("night_off", "")]
+        docs.append((_file_name(staff_id), title, meta, rows))
+    return columns, meta_labels, docs
+
+
+def _sorted_campers(outputs):
+    campers = as_frame(outputs.get("camper_assignments.csv", []))
+    if campers.empty or "id" not in campers.columns:
+        return campers, []
+    periods = [c for c in campers.columns if PERIOD_COLUMN.match(c)]
+    for col in ("name", "cabin"):
+        if col not in campers.columns:
+            campers[col] = ""
+    numeric_id = pd.to_numeric(campers["id"], errors="coerce")
+    order = np.lexsort((campers["id"].values, numeric_id.fillna(np.inf).values, campers["cabin"].values))
+    return campers.iloc[order].reset_index(drop=True), periods
+
+
+def _camper_documents(campers, periods):
+    columns = ["Period", "Class"]
+    meta_labels = ["ID", "Cabin"]
+    docs = [
+        (_file_name(cid), f"{name or 'Camper ' + cid} - skills", [cid, cabin],
+         [[p, cls] for p, cls in zip(periods, classes)])
+        for cid, name, cabin, classes in zip(
+            campers["id"], campers["name"], campers["cabin"], campers[periods].values.tolist())
+    ]
+    return columns, meta_labels, docs
+
+
+def _cabin_documents(campers, periods):
+    columns = ["ID", "Name"] + periods
+    cabins = campers["cabin"].values
+    # Campers are already sorted by cabin: each cabin is one contiguous slice
+    starts = np.flatnonzero(np.r_[True, cabins[1:] != cabins[:-1]]) if len(cabins) else np.array([], int)
+    ends = np.r_[starts[1:], len(cabins)]
+    rows = campers[["id", "name"] + periods].values.tolist()
+    docs = [
+        (_file_name(cabins[s] or "No cabin"), f"{cabins[s] or 'No cabin'} - roster", [str(e - s)], rows[s:e])
+        for s, e in zip(starts, ends)
+    ]
+    return columns, ["Campers"], docs
+
+
+def render_sheets(outputs, out_dir, kinds=SHEET_KINDS, fmt="html", max_workers=None, chunk_size=500):
+    """
+    Write per-staff weekly sheets, per-camper cards and per-cabin rosters.
+
+    outputs: {filename: DataFrame or rows}, e.g. ProgramSchedules.outputs or
+             diff.load_run_outputs(run_dir)
+    out_dir: documents go to out_dir/<kind>/<key>.<fmt>
+    Each kind is grouped and sorted once. Documents are then rendered in
+    chunks of chunk_size across a process pool (inline when there is only
+    one chunk or one worker), each written straight to disk.
+    Returns {kind: documents written}.
+    """
+    if fmt not in SHEET_FORMATS:
+        raise ValueError(f"Unknown sheet format: {fmt} (expected one of {SHEET_FORMATS})")
+    unknown = set(kinds) - set(SHEET_KINDS)
+    if unknown:
+        raise ValueError(f"Unknown sheet kind(s): {sorted(unknown)}")
+
+    tasks = []
+    counts = {}
+    campers, periods = _sorted_campers(outputs) if set(kinds) & {"campers", "cabins"} else (None, None)
+    for kind in kinds:
+        if kind == "staff":
+            columns, meta_labels, docs = _staff_documents(outputs)
+        elif not periods:
+            columns, meta_labels, docs = [], [], []
+        elif kind == "campers":
+            columns, meta_labels, docs = _camper_documents(campers, periods)
+        else:
+            columns, meta_labels, docs = _cabin_documents(campers, periods)
+        docs = _unique_names(docs)
+        counts[kind] = len(docs)
+        kind_dir = os.path.join(out_dir, kind)
+        os.makedirs(kind_dir, exist_ok=True)
+        for i in range(0, len(docs), chunk_size):
+            tasks.append((fmt, kind_dir, columns, meta_labels, docs[i:i + chunk_size]))
+
+    workers = max_workers or os.cpu_count() or 1
+    if len(tasks) <= 1 or workers == 1:
+        for task in tasks:
+            _render_chunk(task)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_render_chunk, tasks))
+    return counts
@@ -0,0 +1,143 @@
+import csv
+import io
+import json
+
+import pandas as pd
+
+from .catalog import content_hashes
+from .inputs import get_data_dir, get_data_path
+from .locations import parse_location_rules, CompiledLocations
+from .matching import IdentityIndex
+from .timetable import Timetable
+from .validation import validate_parsed
+
+JSON_FILES = ["dates.json", "coordinators.json", "locations.json", "classes.json", "fixed_skills_off.json"]
+CSV_FILES = ["index.csv", "off_times_form.csv", "camper_choices.csv"]
+CALENDAR_FILE = "calendar.json"
+# Tables the stages parse from a CSV file with pandas (which is stricter than csv)
+CSV_TABLES = {"index.csv": "staff_table", "camper_choices.csv": "camper_table"}
+
+
+def _read_rows(data):
+    """(header, rows as dicts) from a CSV file's bytes"""
+    reader = csv.DictReader(io.StringIO(data.decode("utf-8"), newline=''))
+    rows = list(reader)
+    return reader.fieldnames or [], rows
+
+
+def _lookup(df):
+    """Rows indexed by integer id (non-numeric ids dropped, first duplicate kept)"""
+    ids = pd.to_numeric(df["id"], errors="coerce")
+    df = df[ids.notna()].set_index(ids[ids.notna()].astype(int))
+    return df[~df.index.duplicated(keep="first")]
+
+
+class InputSnapshot:
+    """
+    Every data file parsed once, shared read-only by any number of runs.
+
+    A long-lived process (the service, the GUI, a thread pool) builds one
+    snapshot and hands it to each ProgramSchedules, which keeps all of its
+    per-run state to itself. The parsed data is not written after
+    construction, so runs can share it without locks. Code that needs to
+    change an input (for example filling in ids on the time-off form rows)
+    copies it first.
+
+    A file that is missing or does not parse does not stop the snapshot: its
+    error is raised again by get(), inside the stage that needs the file,
+    just as if the stage had read the file itself.
+
+    Each file is read from disk exactly once. Its hash, every table parsed
+    from it and the validation report all come from those bytes, so they
+    agree with each other even if the file changes while a snapshot is built.
+    """
+
+    def __init__(self, data_dir=None):
+        self.data_dir = data_dir or get_data_dir()
+        self._files = {}
+        self._errors = {}
+        self._columns = {}  # CSV file -> header, for validation
+        self._validation = {}  # week start -> ValidationReport, the only thing filled in later
+
+        contents = {}
+        for filename in JSON_FILES + CSV_FILES + [CALENDAR_FILE]:
+            try:
+                with open(self.path(filename), "rb") as f:
+                    contents[filename] = f.read()
+            except OSError as e:
+                self._errors[filename] = e
+        # What each run was made from, for the run catalog
+        self.hashes = content_hashes(contents)
+        if isinstance(self._errors.get(CALENDAR_FILE), FileNotFoundError):
+            del self._errors[CALENDAR_FILE]  # optional
+        if CALENDAR_FILE in contents:
+            self._load(CALENDAR_FILE, lambda: Timetable.from_dict(json.loads(contents[CALENDAR_FILE])))
+        # A calendar that does not parse is reported by validation(); the runs fall back to the default week
+        self.timetable = self._files.get(CALENDAR_FILE, Timetable())
+
+        for filename in JSON_FILES:
+            if filename in contents:
+                self._load(filename, lambda: json.loads(contents[filename]))
+        for filename in CSV_FILES:
+            if filename in contents:
+                self._load(filename, lambda: _read_rows(contents[filename]))
+                if filename in self._files:
+                    self._columns[filename], self._files[filename] = self._files[filename]
+        self.index_data = {row['id']: row for row in self._files.get("index.csv", [])}
+
+        # Tables derived from the files above
+        self._load("staff_table", lambda: pd.read_csv(io.BytesIO(self._contents(contents, "index.csv"))))
+        self._load("camper_table", lambda: pd.read_csv(io.BytesIO(self._contents(contents, "camper_choices.csv"))))
+        self._load("staff_lookup", lambda: _lookup(self.get("staff_table")))
+        self._load("campers_lookup", lambda: _lookup(self.get("camper_table")))
+        self._load("staff_records", lambda: self.get("staff_table").set_index("id").to_dict("index"))
+        self._load("identities", lambda: IdentityIndex(self.index_data))
+        self._load("locations", lambda: CompiledLocations(
+            parse_location_rules(self.get("locations.json")), self.index_data, self.timetable.days
+        ))
+
+    def _load(self, key, loader):
+        try:
+            self._files[key] = loader()
+        except Exception as e:
+            self._errors[key] = e
+
+    def _contents(self, contents, filename):
+        """A data file's bytes, raising the error reading it failed with"""
+        if filename not in contents:
+            raise self._errors[filename]
+        return contents[filename]
+
+    def path(self, filename):
+        return get_data_path(self.data_dir, filename)
+
+    def get(self, key):
+        """Parsed content of a data file (or a table derived from one); raises the error it failed with"""
+        if key in self._errors:
+            raise self._errors[key]
+        return self._files[key]
+
+    def table(self, filename):
+        """A CSV data file as read, every cell a string (blank when empty); raises the error it failed with"""
+        rows = self.get(filename)
+        return pd.DataFrame.from_records(rows, columns=self._columns[filename]).fillna("")
+
+    def lookup(self, source):
+        """Staff or camper table indexed by integer id"""
+        return self.get(f"{source}_lookup")
+
+    def validation(self, week_start_date):
+        """Validation report for a week over the parsed files, computed once per week"""
+        key = week_start_date.strftime("%Y-%m-%d")
+        if key not in self._validation:
+            files = {filename: self._files[filename] for filename in JSON_FILES if filename in self._files}
+            for filename in CSV_FILES:
+                if filename in self._files:
+                    files[filename] = self.table(filename)
+            errors = {}
+            for filename in JSON_FILES + CSV_FILES + [CALENDAR_FILE]:
+                error = self._errors.get(filename, self._errors.get(CSV_TABLES.get(filename)))
+                if error is not None:
+                    errors[filename] = error
+            self._validation[key] = validate_parsed(files, self.timetable, week_start_date, errors)
+        return self._validation[key]
@@ -0,0 +1,314 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from .timetable import ALL_DAYS, WEEKDAYS, PERIOD_COLUMN, SLOT_COLUMN
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    week_start TEXT NOT NULL,
+    created TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS time_off (
+    run_id TEXT NOT NULL,
+    staff_id INTEGER NOT NULL,
+    day_off TEXT,
+    night_off TEXT,
+    assignment_type TEXT
+);
+CREATE TABLE IF NOT EXISTS freetime (
+    run_id TEXT NOT NULL,
+    staff_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    day TEXT NOT NULL,
+    location TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS skills (
+    run_id TEXT NOT NULL,
+    staff_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    day TEXT NOT NULL,
+    period INTEGER NOT NULL,
+    assignment TEXT
+);
+CREATE TABLE IF NOT EXISTS coverage (
+    run_id TEXT NOT NULL,
+    staff_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    day TEXT NOT NULL,
+    period INTEGER NOT NULL,
+    task TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS camper_assignments (
+    run_id TEXT NOT NULL,
+    camper_id INTEGER NOT NULL,
+    period INTEGER NOT NULL,
+    class TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_week ON runs (week_start, created);
+CREATE INDEX IF NOT EXISTS idx_time_off_staff ON time_off (staff_id, run_id);
+CREATE INDEX IF NOT EXISTS idx_time_off_run ON time_off (run_id);
+CREATE INDEX IF NOT EXISTS idx_freetime_run ON freetime (run_id);
+CREATE INDEX IF NOT EXISTS idx_skills_run ON skills (run_id);
+CREATE INDEX IF NOT EXISTS idx_coverage_run ON coverage (run_id);
+CREATE INDEX IF NOT EXISTS idx_freetime_staff ON freetime (staff_id, date);
+CREATE INDEX IF NOT EXISTS idx_freetime_date ON freetime (date, location);
+CREATE INDEX IF NOT EXISTS idx_skills_staff ON skills (staff_id, date, period);
+CREATE INDEX IF NOT EXISTS idx_skills_date ON skills (date, period);
+CREATE INDEX IF NOT EXISTS idx_coverage_staff ON coverage (staff_id, date, period);
+CREATE INDEX IF NOT EXISTS idx_coverage_date ON coverage (date, period);
+CREATE INDEX IF NOT EXISTS idx_campers_camper ON camper_assignments (camper_id, period);
+CREATE INDEX IF NOT EXISTS idx_campers_run ON camper_assignments (run_id, period);
+"""
+
+# Output file -> table it is stored in
+STAGE_TABLES = {
+    "time_off_results.csv": "time_off",
+    "freetime_schedule.csv": "freetime",
+    "skills_schedule.csv": "skills",
+    "coverage_schedule.csv": "coverage",
+    "camper_assignments.csv": "camper_assignments",
+}
+
+
+
+def _iso(date_str):
+    """DD/MM/YYYY -> YYYY-MM-DD (None for blanks and 'Unassigned')"""
+    try:
+        return datetime.strptime(str(date_str), "%d/%m/%Y").strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def _clean(value):
+    return None if pd.isna(value) or value == "" else value
+
+
+class ScheduleStore:
+    """
+    SQLite-backed history of schedule runs.
+
+    Each stage's results are stored per run with batched inserts, indexed by
+    staff ID, camper ID, date and period so lookups across weeks do not need
+    to re-parse the Output CSVs.
+    """
+
+    def __init__(self, path=os.path.join("Output", "schedules.db")):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._write_lock = threading.Lock()  # runs in other threads may share the store
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # --- Writing ---
+
+    def register_run(self, run_id, week_start):
+        """week_start is a datetime (the Monday of the scheduled week)"""
+        with self._write_lock, self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO runs (run_id, week_start, created) VALUES (?, ?, ?)",
+                (run_id, week_start.strftime("%Y-%m-%d"), datetime.now().isoformat(timespec="seconds")),
+            )
+
+    def write_stage(self, run_id, filename, df, week_start, days=None):
+        """
+        Replace this run's rows for one output with the rows of df (the CSV layout).
+        days: program days the weekly skills pattern repeats on (Monday-Friday by default)
+        """
+        table = STAGE_TABLES[filename]
+        rows = getattr(self, f"_{table}_rows")(run_id, df, week_start, days or WEEKDAYS)
+        columns = {
+            "time_off": "run_id, staff_id, day_off, night_off, assignment_type",
+            "freetime": "run_id, staff_id, date, day, location",
+            "skills": "run_id, staff_id, date, day, period, assignment",
+            "coverage": "run_id, staff_id, date, day, period, task",
+            "camper_assignments": "run_id, camper_id, period, class",
+        }[table]
+        placeholders = ", ".join("?" * len(columns.split(",")))
+        with self._write_lock, self.conn:
+            self.conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+            self.conn.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", rows)
+        return len(rows)
+
+    def _time_off_rows(self, run_id, df, week_start, days):
+        return [
+            (run_id, int(r.id), _iso(r.day_off), _iso(r.night_off), _clean(r.assignment_type))
+            for r in df[["id", "day_off", "night_off", "assignment_type"]].itertuples(index=False)
+            if pd.notna(pd.to_numeric(r.id, errors="coerce"))
+        ]
+
+    def _freetime_rows(self, run_id, df, week_start, days):
+        return [
+            (run_id, int(staff_id), _iso(date), day, location)
+            for day, date, location, staff_id in df[["Day", "Date", "Location", "id"]].itertuples(index=False)
+        ]
+
+    def _skills_rows(self, run_id, df, week_start, days):
+        period_cols = [(c, int(PERIOD_COLUMN.match(c).group(1))) for c in df.columns if PERIOD_COLUMN.match(c)]
+        rows = []
+        for day in days:
+            date = (week_start + timedelta(days=ALL_DAYS.index(day))).strftime("%Y-%m-%d")
+            for col, period in period_cols:
+                rows.extend(
+                    (run_id, int(staff_id), date, day, period, _clean(value))
+                    for staff_id, value in zip(df["id"], df[col])
+                )
+        return rows
+
+    def _coverage_rows(self, run_id, df, week_start, days):
+        rows = []
+        for col in df.columns:
+            match = SLOT_COLUMN.match(col)
+            if not match or match.group(1) not in ALL_DAYS:
+                continue
+            day, period = match.group(1), int(match.group(2))
+            date = (week_start + timedelta(days=ALL_DAYS.index(day))).strftime("%Y-%m-%d")
+            tasks = df[col].fillna("").astype(str)
+            rows.extend(
+                (run_id, int(staff_id), date, day, period, task)
+                for staff_id, task in zip(df["id"], tasks) if task
+            )
+        return rows
+
+    def _camper_assignments_rows(self, run_id, df, week_start, days):
+        period_cols = [(c, int(PERIOD_COLUMN.match(c).group(1))) for c in df.columns if PERIOD_COLUMN.match(c)]
+        return [
+            (run_id, int(camper_id), period, _clean(value))
+            for col, period in period_cols
+            for camper_id, value in zip(df["id"], df[col])
+        ]
+
+    # --- Queries ---
+
+    def _weekday_dates(self, weekday, weeks):
+        """Dates of the given weekday in the most recent stored weeks, newest first"""
+        offset = ALL_DAYS.index(weekday)
+        rows = self.conn.execute(
+            "SELECT DISTINCT week_start FROM runs ORDER BY week_start DESC LIMIT ?", (weeks,)
+        ).fetchall()
+        return [
+            (datetime.strptime(r["week_start"], "%Y-%m-%d") + timedelta(days=offset)).strftime("%Y-%m-%d")
+            for r in rows
+        ]
+
+    @staticmethod
+    def _runs_with(table):
+        # Runs that stored rows in the table, newest first; created has one-second
+        # resolution, so runs started in the same second fall back to insertion order
+        return (f"SELECT r.run_id FROM runs r WHERE EXISTS (SELECT 1 FROM {table} t WHERE t.run_id = r.run_id) "
+                "{where} ORDER BY r.created DESC, r.rowid DESC LIMIT 1")
+
+    def _latest_run_sql(self, table):
+        """
+        Condition picking, per week, the newest run with rows in `table`, so
+        reruns of a week do not double count and a later partial run (one
+        stage on its own) does not hide the tables it did not write
+        """
+        latest = self._runs_with(table).format(where="AND r.week_start = w.week_start")
+        return f"run_id IN (SELECT ({latest}) FROM (SELECT DISTINCT week_start FROM runs) w)"
+
+    def latest_run_with(self, table):
+        """Newest run id that stored rows in `table`, or None"""
+        row = self.conn.execute(self._runs_with(table).format(where="")).fetchone()
+        return row["run_id"] if row else None
+
+    def list_runs(self, limit=20, offset=0):
+        rows = self.conn.execute(
+            "SELECT run_id, week_start, created FROM runs ORDER BY created DESC, rowid DESC LIMIT ? OFFSET ?",
+            (limit, offset),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def run_placements(self, run_id):
+        """
+        A run's weekly skills pattern, {staff_id: {period: assignment}} from its
+        first day, and its camper placements, {camper_id (str): {period: class}}
+        """
+        first_day = self.conn.execute("SELECT MIN(date) FROM skills WHERE run_id = ?", (run_id,)).fetchone()[0]
+        staff = {}
+        for r in self.conn.execute(
+            "SELECT staff_id, period, assignment FROM skills WHERE run_id = ? AND date = ?", (run_id, first_day)
+        ):
+            if r["assignment"]:
+                staff.setdefault(r["staff_id"], {})[r["period"]] = r["assignment"]
+        campers = {}
+        for r in self.conn.execute("SELECT camper_id, period, class FROM camper_assignments WHERE run_id = ?", (run_id,)):
+            if r["class"]:
+                campers.setdefault(str(r["camper_id"]), {})[r["period"]] = r["class"]
+        return staff, campers
+
+    def staff_slot(self, staff_id, date, period):
+        """Where a staff member is on a date (YYYY-MM-DD) and period, from the latest run"""
+        skills = self.conn.execute(
+            f"SELECT assignment FROM skills WHERE staff_id = ? AND date = ? AND period = ? "
+            f"AND {self._latest_run_sql('skills')}",
+            (staff_id, date, period),
+        ).fetchone()
+        coverage = self.conn.execute(
+            f"SELECT task FROM coverage WHERE staff_id = ? AND date = ? AND period = ? "
+            f"AND {self._latest_run_sql('coverage')}",
+            (staff_id, date, period),
+        ).fetchone()
+        freetime = self.conn.execute(
+            f"SELECT location FROM freetime WHERE staff_id = ? AND date = ? AND {self._latest_run_sql('freetime')}",
+            (staff_id, date),
+        ).fetchone()
+        return {
+            "staff_id": staff_id,
+            "date": date,
+            "period": period,
+            "skills": skills["assignment"] if skills else None,
+            "coverage": coverage["task"] if coverage else None,
+            "freetime": freetime["location"] if freetime else None,
+        }
+
+    def staff_history(self, staff_id, weekday, period, weeks=4):
+        """e.g. staff_history(107, "Wednesday", 2) -> the last four Wednesdays in P2"""
+        return [self.staff_slot(staff_id, date, period) for date in self._weekday_dates(weekday, weeks)]
+
+    def camper_history(self, camper_id, weeks=4):
+        """Per-week P1..Pn classes for a camper, newest week first"""
+        rows = self.conn.execute(
+            "SELECT r.week_start, c.period, c.class FROM camper_assignments c "
+            "JOIN runs r ON r.run_id = c.run_id "
+            f"WHERE c.camper_id = ? AND c.{self._latest_run_sql('camper_assignments')} "
+            "ORDER BY r.week_start DESC, c.period",
+            (camper_id,),
+        ).fetchall()
+        history = {}
+        for r in rows:
+            if r["week_start"] not in history and len(history) >= weeks:
+                break
+            history.setdefault(r["week_start"], {})[r["period"]] = r["class"]
+        return history
+
+    def who_is_at(self, location, date):
+        """Staff IDs at a freetime location on a date (YYYY-MM-DD), from the latest run"""
+        rows = self.conn.execute(
+            f"SELECT staff_id FROM freetime WHERE date = ? AND location = ? AND {self._latest_run_sql('freetime')} "
+            "ORDER BY staff_id",
+            (date, location),
+        ).fetchall()
+        return [r["staff_id"] for r in rows]
+
+    def class_roster(self, class_name, period, run_id=None):
+        """Camper IDs in a class and period (latest run unless run_id is given)"""
+        if run_id is None:
+            run_id = self.latest_run_with("camper_assignments")
+            if run_id is None:
+                return []
+        rows = self.conn.execute(
+            "SELECT camper_id FROM camper_assignments WHERE run_id = ? AND period = ? AND class = ? "
+            "ORDER BY camper_id",
+            (run_id, period, class_name),
+        ).fetchall()
+        return [r["camper_id"] for r in rows]
@@ -0,0 +1,79 @@
+import json
+import os
+import re
+
+from .inputs import get_data_path
+
+ALL_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+WEEKDAYS = ALL_DAYS[:5]
+PERIODS = [1, 2, 3]
+
+# Schedule output columns: "P1" (a period) and "Monday P1" (a period on one day)
+PERIOD_COLUMN = re.compile(r"^P(\d+)$")
+SLOT_COLUMN = re.compile(r"^(\w+) P(\d+)$")
+
+
+class Timetable:
+    """
+    The days and periods a program runs.
+
+    Loaded from calendar.json in the data directory, e.g.
+        {"days": ["Monday", ..., "Saturday"], "periods": [1, 2, 3, 4, 5, 6]}
+    and defaults to Monday-Friday with periods 1-3 when the file is absent.
+
+    A class with "double_period": true spans two consecutive periods; "span": n
+    generalizes this to n periods. Spans are cut short at the end of the day.
+    """
+
+    def __init__(self, days=WEEKDAYS, periods=PERIODS):
+        self.days = list(days)
+        self.periods = list(periods)
+        bad_days = [d for d in self.days if d not in ALL_DAYS]
+        if bad_days:
+            raise ValueError(f"Unknown day(s) in calendar: {bad_days}")
+        if not self.periods or self.periods != sorted(set(self.periods)):
+            raise ValueError("Calendar periods must be a non-empty list of increasing numbers")
+        self.day_index = {d: i for i, d in enumerate(self.days)}
+        self.period_index = {p: i for i, p in enumerate(self.periods)}
+
+    @classmethod
+    def load(cls, data_dir):
+        path = get_data_path(data_dir, "calendar.json")
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    @classmethod
+    def from_dict(cls, config):
+        """Timetable from parsed calendar.json content"""
+        return cls(config.get("days", WEEKDAYS), config.get("periods", PERIODS))
+
+    def to_dict(self):
+        return {"days": self.days, "periods": self.periods}
+
+    @property
+    def period_columns(self):
+        return [f"P{p}" for p in self.periods]
+
+    def day_offset(self, day):
+        """Days from the Monday of the scheduled week"""
+        return ALL_DAYS.index(day)
+
+    # --- Spans ---
+
+    @staticmethod
+    def span_length(config):
+        return config.get("span", 2 if config.get("double_period", False) else 1)
+
+    def span(self, config, start):
+        """Periods a class starting at `start` occupies (cut short at the end of the day)"""
+        i = self.period_index.get(start)
+        if i is None:
+            return ()
+        return tuple(self.periods[i:i + self.span_length(config)])
+
+    def fits(self, config, start):
+        """Whether the whole span starting at `start` fits in the day"""
+        return len(self.span(config, start)) == self.span_length(config)
+
@@ -0,0 +1,400 @@
+import os
+import json
+import pandas as pd
+
+from .inputs import get_data_path
+from .locations import parse_location_rules
+from .matching import IdentityIndex
+from .timetable import Timetable
+
+CHOICE_COLUMNS = [f"class{i}" for i in range(1, 6)]
+CERTIFICATION_COLUMNS = [
+    "lifeguard certification",
+    "archery certification",
+    "high ropes certification",
+    "fishing proficiency",
+]
+
+REQUIRED_COLUMNS = {
+    "index.csv": ["id", "email", "name", "coverage", "department"] + CERTIFICATION_COLUMNS,
+    "off_times_form.csv": ["email", "name", "first option day", "second option day",
+                           "first option night", "second option night"],
+    "camper_choices.csv": ["id", "name", "cabin"] + CHOICE_COLUMNS + ["submission_time"],
+}
+CONFIG_FILES = ["classes.json", "coordinators.json", "fixed_skills_off.json", "dates.json", "locations.json"]
+OFF_DATE_COLUMNS = ["first option day", "second option day", "first option night", "second option night"]
+
+
+class InputValidationError(ValueError):
+    """Raised when the pre-flight check finds errors in the input data"""
+
+    def __init__(self, report):
+        self.report = report
+        super().__init__(report.summary())
+
+
+class ValidationReport:
+    """Collects the issues found by validate_inputs"""
+
+    columns = ["severity", "file", "check", "row", "value", "message"]
+
+    def __init__(self):
+        self.issues = []
+
+    def add(self, severity, filename, check, message, row="", value=""):
+        self.issues.append({
+            "severity": severity,
+            "file": filename,
+            "check": check,
+            "row": row,
+            "value": value,
+            "message": message,
+        })
+
+    def add_rows(self, severity, filename, check, frame, value_col, message):
+        """Add one issue per row of a (pre-filtered) DataFrame"""
+        for row, value in zip(frame.index, frame[value_col]):
+            self.add(severity, filename, check, message.format(value=value), row=int(row) + 2, value=value)
+
+    @property
+    def errors(self):
+        return [i for i in self.issues if i["severity"] == "error"]
+
+    @property
+    def warnings(self):
+        return [i for i in self.issues if i["severity"] == "warning"]
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def summary(self, per_check=5):
+        """Readable report, listing at most per_check issues for each (file, check)"""
+        lines = [f"Input validation: {len(self.errors)} error(s), {len(self.warnings)} warning(s)"]
+        shown = {}
+        for issue in self.errors + self.warnings:
+            key = (issue["severity"], issue["file"], issue["check"])
+            shown[key] = shown.get(key, 0) + 1
+            if shown[key] > per_check:
+                continue
+            where = f"{issue['file']}:{issue['row']}" if issue["row"] != "" else issue["file"]
+            lines.append(f"[{issue['severity'].upper()}] {where} ({issue['check']}) {issue['message']}")
+        for (severity, filename, check), count in shown.items():
+            if count > per_check:
+                lines.append(f"[{severity.upper()}] {filename} ({check}) ... and {count - per_check} more")
+        return "\n".join(lines)
+
+    def to_rows(self):
+        return [self.columns] + [[issue[c] for c in self.columns] for issue in self.issues]
+
+
+def _read_csv(data_dir, filename, report):
+    path = get_data_path(data_dir, filename)
+    if not os.path.exists(path):
+        report.add("error", filename, "missing_file", "File not found")
+        return None
+    try:
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    except (pd.errors.EmptyDataError, pd.errors.ParserError) as e:
+        report.add("error", filename, "unreadable", f"Could not parse file: {e}")
+        return None
+    return _with_columns(df, filename, report)
+
+
+def _with_columns(df, filename, report):
+    """The table with stripped column names, or None (reported) when a required column is missing"""
+    df.columns = [c.strip() for c in df.columns]
+    missing = [c for c in REQUIRED_COLUMNS[filename] if c not in df.columns]
+    if missing:
+        report.add("error", filename, "missing_columns", f"Missing column(s): {', '.join(missing)}")
+        return None
+    return df
+
+
+def _read_json(data_dir, filename, report):
+    path = get_data_path(data_dir, filename)
+    if not os.path.exists(path):
+        report.add("error", filename, "missing_file", "File not found")
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except ValueError as e:
+        report.add("error", filename, "unreadable", f"Invalid JSON: {e}")
+        return None
+
+
+def _check_locations(locations, index_df, report):
+    """Check the location rules; returns the set of location names (None if unparseable)"""
+    filename = "locations.json"
+    try:
+        rules = parse_location_rules(locations)
+    except (ValueError, TypeError) as e:
+        report.add("error", filename, "invalid_rule", str(e))
+        return None
+    names = [rule.name for rule in rules]
+    for name in {n for n in names if names.count(n) > 1}:
+        report.add("error", filename, "duplicate_location", f"Location '{name}' is listed more than once", value=name)
+    for rule in rules:
+        if index_df is not None and rule.certification and rule.certification not in index_df.columns:
+            report.add("error", filename, "unknown_certification",
+                       f"{rule.name}: '{rule.certification}' is not a column in index.csv", value=rule.certification)
+        if index_df is not None and rule.department:
+            departments = set(index_df["department"].str.strip())
+            if rule.department not in departments:
+                report.add("warning", filename, "unknown_department",
+                           f"{rule.name}: no staff in department '{rule.department}'", value=rule.department)
+    return set(names)
+
+
+def _check_ids(df, filename, report):
+    """Flag blank, non-integer and duplicate ids; returns the numeric id Series"""
+    ids = pd.to_numeric(df["id"].str.strip(), errors="coerce")
+    report.add_rows("error", filename, "invalid_id", df[ids.isna()], "id",
+                    "ID '{value}' is not an integer")
+    dupes = df[ids.notna() & ids.duplicated(keep="first")]
+    report.add_rows("error", filename, "duplicate_id", dupes, "id", "Duplicate ID {value}")
+    return ids
+
+
+def _check_index(index_df, report):
+    filename = "index.csv"
+    ids = _check_ids(index_df, filename, report)
+    staff_ids = set(ids.dropna().astype(int))
+
+    emails = index_df["email"].str.strip().str.lower()
+    report.add_rows("error", filename, "missing_email", index_df[emails == ""], "id",
+                    "Staff {value} has no email")
+    dupes = index_df[(emails != "") & emails.duplicated(keep="first")]
+    report.add_rows("error", filename, "duplicate_email", dupes, "email", "Duplicate email {value}")
+
+    for col in CERTIFICATION_COLUMNS:
+        values = index_df[col].str.strip().str.lower()
+        bad = index_df[~values.isin(["yes", "no", ""])]
+        report.add_rows("warning", filename, "certification_value", bad, col,
+                        f"Unexpected '{col}' value '{{value}}' (treated as not certified)")
+
+    coverage = pd.to_numeric(index_df["coverage"].str.strip(), errors="coerce")
+    has_coverage = index_df["coverage"].str.strip() != ""
+    bad_coverage = index_df[has_coverage & ~coverage.isin(staff_ids)]
+    report.add_rows("error", filename, "unknown_coverage", bad_coverage, "coverage",
+                    "Coverage partner {value} is not in the roster")
+    return staff_ids, set(emails[emails != ""])
+
+
+def _check_off_requests(off_df, index_df, roster_emails, week_start_date, report):
+    filename = "off_times_form.csv"
+    emails = off_df["email"].str.strip().str.lower()
+    unknown = off_df[~emails.isin(roster_emails)]
+    if len(unknown):
+        # Typos that the scheduler resolves (or reports for review) do not block the run
+        identities = IdentityIndex({row["id"]: row for row in index_df.to_dict("records")})
+        names = unknown["name"] if "name" in unknown.columns else [""] * len(unknown)
+        for row, email, name in zip(unknown.index, unknown["email"], names):
+            match = identities.match(email, name)
+            if match.method == "near":
+                report.add("warning", filename, "near_match_email",
+                           f"Email '{email}' matched to staff {match.staff_id} <{match.candidates[0][1]}> "
+                           f"(score {match.score:.2f})", row=int(row) + 2, value=email)
+            elif match.method == "ambiguous":
+                report.add("warning", filename, "ambiguous_email",
+                           f"Email '{email}': {match.describe()} (left unassigned)", row=int(row) + 2, value=email)
+            else:
+                report.add("error", filename, "unknown_email",
+                           f"Email '{email}' does not match any staff in index.csv", row=int(row) + 2, value=email)
+    dupes = off_df[(emails != "") & emails.duplicated(keep="last")]
+    report.add_rows("warning", filename, "duplicate_submission", dupes, "email",
+                    "Earlier submission for {value} is overridden by a later row")
+
+    if week_start_date is not None:
+        week_end = week_start_date + pd.Timedelta(days=6)
+    for col in OFF_DATE_COLUMNS:
+        raw = off_df[col].str.strip()
+        parsed = pd.to_datetime(raw, format="%d/%m/%Y", errors="coerce")
+        report.add_rows("error", filename, "invalid_date", off_df[(raw != "") & parsed.isna()], col,
+                        f"'{col}' value '{{value}}' is not a DD/MM/YYYY date")
+        if week_start_date is not None:
+            outside = parsed.notna() & ((parsed < week_start_date) | (parsed > week_end))
+            report.add_rows("warning", filename, "date_outside_week", off_df[outside], col,
+                            f"'{col}' date {{value}} is outside the scheduled week")
+
+
+def _check_classes(class_configs, staff_ids, periods, report):
+    filename = "classes.json"
+    for class_name, config in class_configs.items():
+        staff_required = config.get("staff_required", 1)
+        if not isinstance(staff_required, int) or staff_required < 1:
+            report.add("error", filename, "staff_required", f"{class_name}: staff_required must be a positive integer",
+                       value=staff_required)
+        bad_periods = [p for p in config.get("preferred_periods", []) if p not in periods]
+        if bad_periods:
+            report.add("error", filename, "preferred_periods", f"{class_name}: unknown period(s) {bad_periods}",
+                       value=bad_periods)
+        if not config.get("preferred_periods"):
+            report.add("warning", filename, "preferred_periods", f"{class_name}: no preferred periods, class never runs")
+        for coordinator in config.get("coordinators", []):
+            if _as_int(coordinator) not in staff_ids:
+                report.add("error", filename, "unknown_coordinator",
+                           f"{class_name}: coordinator {coordinator} is not in the roster", value=coordinator)
+
+
+def _check_campers(campers_df, class_configs, report):
+    filename = "camper_choices.csv"
+    _check_ids(campers_df, filename, report)
+
+    choices = campers_df[CHOICE_COLUMNS].stack()
+    choices = choices[choices.str.strip() != ""]
+    rows = choices.index.get_level_values(0)
+    choice_frame = pd.DataFrame({"choice": choices.values}, index=rows)
+    unknown = choice_frame[~choice_frame["choice"].isin(list(class_configs))]
+    report.add_rows("error", filename, "unknown_class", unknown, "choice",
+                    "Class '{value}' is not in classes.json")
+    not_assignable = [c for c, cfg in class_configs.items() if not cfg.get("camper_assignable", True)]
+    locked = choice_frame[choice_frame["choice"].isin(not_assignable)]
+    report.add_rows("warning", filename, "not_camper_assignable", locked, "choice",
+                    "Class '{value}' is not camper-assignable")
+
+    raw = campers_df["submission_time"].str.strip()
+    parsed = pd.to_datetime(raw, errors="coerce")
+    report.add_rows("warning", filename, "invalid_submission_time", campers_df[(raw != "") & parsed.isna()],
+                    "submission_time", "submission_time '{value}' could not be parsed")
+
+
+def _check_capacity(class_configs, num_campers, timetable, report):
+    """Every camper needs a seat in every period, so total seats per period must cover the roster"""
+    seats = {p: 0 for p in timetable.periods}
+    for class_name, config in class_configs.items():
+        staff_required = config.get("staff_required", 1)
+        # Bad values are reported by _check_classes; they add no seats here
+        if not config.get("camper_assignable", True) or not isinstance(staff_required, int) or staff_required < 1:
+            continue
+        limit = 8 * staff_required
+        for p in config.get("preferred_periods", []):
+            for q in timetable.span(config, p):
+                seats[q] += limit
+    for p in timetable.periods:
+        if seats[p] < num_campers:
+            report.add("error", "classes.json", "capacity",
+                       f"Period {p} has {seats[p]} camper seats for {num_campers} campers",
+                       row="", value=seats[p])
+    return seats
+
+
+def _as_int(value):
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        return None
+
+
+def validate_inputs(data_dir, week_start_date=None):
+    """
+    Checks every input file in one pass before any scheduling stage runs.
+
+    Covers file/column presence, ID and date formats, referential integrity
+    (form emails, camper choices, coordinators, coverage partners, fixed OFF
+    periods) and per-period seat capacity. Returns a ValidationReport.
+    """
+    report = ValidationReport()
+    files = {filename: _read_csv(data_dir, filename, report) for filename in REQUIRED_COLUMNS}
+    files.update((filename, _read_json(data_dir, filename, report)) for filename in CONFIG_FILES)
+    try:
+        timetable = Timetable.load(data_dir)
+    except ValueError as e:
+        report.add("error", "calendar.json", "invalid_calendar", str(e))
+        timetable = Timetable()
+    return _validate(files, timetable, week_start_date, report)
+
+
+def validate_parsed(files, timetable, week_start_date=None, errors=None):
+    """
+    The validate_inputs checks over data that has already been read, so the
+    report describes exactly what a run uses (see InputSnapshot.validation).
+
+    files: {filename: parsed JSON, or a DataFrame of strings for the CSV files}
+    errors: {filename: the exception reading or parsing it raised}, calendar.json included
+    """
+    report = ValidationReport()
+    errors = errors or {}
+    parsed = {}
+    for filename in list(REQUIRED_COLUMNS) + CONFIG_FILES:
+        error = errors.get(filename)
+        if isinstance(error, FileNotFoundError) or (error is None and filename not in files):
+            report.add("error", filename, "missing_file", "File not found")
+            parsed[filename] = None
+        elif error is not None:
+            kind = "Invalid JSON" if filename.endswith(".json") else "Could not parse file"
+            report.add("error", filename, "unreadable", f"{kind}: {error}")
+            parsed[filename] = None
+        elif filename in REQUIRED_COLUMNS:
+            parsed[filename] = _with_columns(files[filename].copy(), filename, report)
+        else:
+            parsed[filename] = files[filename]
+    if errors.get("calendar.json") is not None:
+        report.add("error", "calendar.json", "invalid_calendar", str(errors["calendar.json"]))
+    return _validate(parsed, timetable, week_start_date, report)
+
+
+def _validate(files, timetable, week_start_date, report):
+    """Cross-file checks shared by validate_inputs and validate_parsed; unreadable files are None"""
+    if week_start_date is not None:
+        week_start_date = pd.Timestamp(week_start_date)
+
+    index_df = files["index.csv"]
+    off_df = files["off_times_form.csv"]
+    campers_df = files["camper_choices.csv"]
+    class_configs = files["classes.json"]
+    coordinator_data = files["coordinators.json"]
+    fixed_off_periods = files["fixed_skills_off.json"]
+    dates_config = files["dates.json"]
+    locations = files["locations.json"]
+
+    staff_ids, roster_emails = set(), set()
+    if index_df is not None:
+        staff_ids, roster_emails = _check_index(index_df, report)
+
+    if off_df is not None and index_df is not None:
+        _check_off_requests(off_df, index_df, roster_emails, week_start_date, report)
+
+    if class_configs is not None:
+        _check_classes(class_configs, staff_ids, timetable.periods, report)
+        if campers_df is not None:
+            _check_campers(campers_df, class_configs, report)
+            _check_capacity(class_configs, len(campers_df), timetable, report)
+
+    location_names = None
+    if locations is not None:
+        location_names = _check_locations(locations, index_df, report)
+
+    if coordinator_data is not None:
+        for location, ids in coordinator_data.items():
+            if location_names is not None and location not in location_names:
+                report.add("warning", "coordinators.json", "unknown_location",
+                           f"Location '{location}' is not in locations.json", value=location)
+            for staff_id in ids:
+                if _as_int(staff_id) not in staff_ids:
+                    report.add("error", "coordinators.json", "unknown_coordinator",
+                               f"{location}: coordinator {staff_id} is not in the roster", value=staff_id)
+
+    if fixed_off_periods is not None:
+        for staff_id, off_periods in fixed_off_periods.items():
+            if _as_int(staff_id) not in staff_ids:
+                report.add("error", "fixed_skills_off.json", "unknown_staff",
+                           f"Staff {staff_id} is not in the roster", value=staff_id)
+            bad_periods = [p for p in off_periods if p not in timetable.periods]
+            if bad_periods:
+                report.add("error", "fixed_skills_off.json", "invalid_period",
+                           f"Staff {staff_id}: unknown period(s) {bad_periods}", value=bad_periods)
+
+    if dates_config is not None:
+        for name, period in dates_config.get("blackout_periods", {}).items():
+            start = pd.to_datetime(period.get("start"), format="%Y-%m-%d", errors="coerce")
+            end = pd.to_datetime(period.get("end"), format="%Y-%m-%d", errors="coerce")
+            if pd.isna(start) or pd.isna(end):
+                report.add("error", "dates.json", "invalid_date", f"Blackout period {name} has an invalid start/end",
+                           value=name)
+            elif start > end:
+                report.add("error", "dates.json", "invalid_range", f"Blackout period {name} ends before it starts",
+                           value=name)
+
+    return report
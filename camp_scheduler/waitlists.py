@@ -0,0 +1,329 @@
+import csv
+import heapq
+import json
+import os
+
+from .catalog import RUN_COMPLETE_MARKER
+from .engines import CamperAssignment, UNRANKED_RANK
+from .timetable import Timetable, PERIOD_COLUMN
+
+# Drops applied to a finished run (id, Class; a blank class means the camper left camp)
+DROPS_FILE = "drops.csv"
+
+
+class Waitlists:
+    """
+    Per-(class, period) waitlists over a CamperAssignment, kept in step with it.
+
+    Every running class start (class, period) has a heap of the campers who
+    ranked the class above whatever they hold in its periods, ordered by
+    (preference rank, submission order). When a seat frees up, promote()
+    pops the heap until it finds a camper who can still move, which is
+    O(log n) per pop. Entries that went stale (the camper has since got the
+    class or something better) are discarded as they surface, and entries
+    that are only blocked for now are pushed back.
+
+    A promoted camper leaves the classes they held in those periods, which
+    frees seats there in turn; drop() follows that cascade until no freed
+    seat has anyone left to promote. Like the local search, a camper never
+    leaves a class if that would take its roster below the minimum, so
+    promotions alone never cancel a class. Moves are written straight back
+    into result.assignments.
+
+    On drop/add day the waitlists of a finished run are rebuilt with
+    from_run(), and save() writes the moves back into its files.
+    """
+
+    def __init__(self, result):
+        self.result = result
+        self.configs = result.class_configs
+        self.timetable = result.timetable
+        self.assignments = result.assignments
+        self.order = {camper['id']: i for i, camper in enumerate(result.campers)}  # FIFO on submission_time
+        self.moves = []
+        self.drops = []  # (camper id, class or "") not yet saved to a run
+
+        self.ranks = {}
+        for camper in result.campers:
+            choices = [camper.get(f'class{i}') for i in range(1, 6)]
+            self.ranks[camper['id']] = {c: choices.index(c) + 1 for c in choices if c}
+
+        self.rosters = {}
+        for camper_id, held in self.assignments.items():
+            for p, cname in held.items():
+                self.rosters.setdefault((cname, p), set()).add(camper_id)
+
+        # Class starts that run this week, and the starts whose span covers each period
+        self.spans = {}
+        self.class_starts = {}
+        self.starts_covering = {}
+        for cname, config in self.configs.items():
+            if not config.get("camper_assignable", True):
+                continue
+            for start in sorted(config.get("preferred_periods", [])):
+                span = self.timetable.span(config, start)
+                if span and all(self._running(cname, p) for p in span):
+                    self.spans[(cname, start)] = span
+                    self.class_starts.setdefault(cname, []).append(start)
+                    for p in span:
+                        self.starts_covering.setdefault((cname, p), []).append(start)
+
+        self.heaps = {key: [] for key in self.spans}
+        self.queued = {key: set() for key in self.spans}
+        for camper in result.campers:
+            self._enqueue(camper['id'])
+        for heap in self.heaps.values():
+            heapq.heapify(heap)
+
+    @classmethod
+    def from_run(cls, run_dir, class_configs, campers, timetable=None):
+        """
+        Waitlists over a finished run, from its camper_assignments.csv and
+        skills_not_run.csv. Drops saved to the run earlier (drops.csv) stay
+        in force: nobody is offered back a class they dropped. timetable
+        defaults to the run's calendar.
+
+        Which seats a camper group shares is not kept in the run's files, so
+        promotions may move grouped campers apart.
+        """
+        if timetable is None:
+            timetable = Timetable()
+            summary_path = os.path.join(run_dir, RUN_COMPLETE_MARKER)
+            if os.path.exists(summary_path):
+                with open(summary_path) as f:
+                    calendar = json.load(f).get("calendar")
+                if calendar:
+                    timetable = Timetable.from_dict(calendar)
+
+        # The order assign_campers places campers in
+        campers = sorted(campers, key=lambda x: x.get("submission_time", "9999-12-31T23:59:59"))
+        assignments = {camper['id']: {} for camper in campers}
+        for row in _read_rows(run_dir, "camper_assignments.csv"):
+            if row.get("id") not in assignments:
+                continue
+            for col, cname in row.items():
+                match = PERIOD_COLUMN.match(col or "")
+                if match and cname:
+                    assignments[row["id"]][int(match.group(1))] = cname
+        inactive = {(row["Class"], int(row["Period"])) for row in _read_rows(run_dir, "skills_not_run.csv")}
+
+        waitlists = cls(CamperAssignment(campers, class_configs, assignments, inactive, None, timetable))
+        for row in _read_rows(run_dir, DROPS_FILE):
+            if row["id"] in waitlists.ranks:
+                if row["Class"]:
+                    waitlists.ranks[row["id"]].pop(row["Class"], None)
+                else:
+                    waitlists.ranks[row["id"]] = {}
+        return waitlists
+
+    def save(self, run_dir):
+        """
+        Write the current assignments into the run's camper_assignments.csv
+        (its other columns kept), rewrite waitlists.csv and add the drops
+        made since the last save to drops.csv.
+        """
+        path = os.path.join(run_dir, "camper_assignments.csv")
+        with open(path, newline='') as f:
+            reader = csv.DictReader(f)
+            fieldnames = reader.fieldnames
+            rows = list(reader)
+        for row in rows:
+            held = self.assignments.get(row["id"])
+            if held is None:
+                continue
+            for col in fieldnames:
+                match = PERIOD_COLUMN.match(col)
+                if match:
+                    row[col] = held.get(int(match.group(1)), "")
+        with open(path, "w", newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator="\n")  # as pandas wrote it
+            writer.writeheader()
+            writer.writerows(rows)
+
+        with open(os.path.join(run_dir, "waitlists.csv"), "w", newline='') as f:
+            csv.writer(f).writerows(self.rows())
+
+        drops_path = os.path.join(run_dir, DROPS_FILE)
+        new_file = not os.path.exists(drops_path)
+        with open(drops_path, "a", newline='') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(["id", "Class"])
+            writer.writerows(self.drops)
+        self.drops = []
+
+    # --- Rosters ---
+
+    def _limit(self, cname):
+        return 8 * self.configs[cname].get("staff_required", 1)
+
+    def _minimum(self, cname):
+        return 3 * self.configs[cname].get("staff_required", 1)
+
+    def _running(self, cname, p):
+        return bool(self.rosters.get((cname, p))) and (cname, p) not in self.result.inactive_classes
+
+    def _has_seat(self, cname, span):
+        return all(len(self.rosters.get((cname, p), ())) < self._limit(cname) for p in span)
+
+    def _held_in(self, camper_id, span):
+        """{class: periods} of the camper's classes that overlap span"""
+        held = self.assignments[camper_id]
+        overlapping = {held[p] for p in span if p in held}
+        return {cname: [p for p, c in held.items() if c == cname] for cname in overlapping}
+
+    # --- Waitlist entries ---
+
+    def _wants(self, camper_id, cname, span):
+        """Whether the camper would trade what they hold in span for cname"""
+        ranks = self.ranks[camper_id]
+        if cname not in ranks or cname in self.assignments[camper_id].values():
+            return False
+        rank = ranks[cname]
+        return all(ranks.get(c, UNRANKED_RANK) > rank for c in self._held_in(camper_id, span))
+
+    def _enqueue(self, camper_id, heapify=False):
+        """Add waitlist entries for every ranked class the camper would move into; returns their keys"""
+        added = []
+        for cname, rank in self.ranks[camper_id].items():
+            for start in self.class_starts.get(cname, ()):
+                key = (cname, start)
+                if camper_id in self.queued[key] or not self._wants(camper_id, cname, self.spans[key]):
+                    continue
+                entry = (rank, self.order[camper_id], camper_id)
+                if heapify:
+                    heapq.heappush(self.heaps[key], entry)
+                else:
+                    self.heaps[key].append(entry)
+                self.queued[key].add(camper_id)
+                added.append(key)
+        return added
+
+    def _can_move(self, camper_id, cname, span):
+        """Whether the camper can take cname in span now: wants it, and every class they leave stays at its minimum"""
+        if not self._wants(camper_id, cname, span):
+            return False
+        for held, periods in self._held_in(camper_id, span).items():
+            # Leaving a longer class would open a gap outside span; group seats stay together
+            if not set(periods) <= set(span) or (camper_id, held) in self.result.pinned:
+                return False
+            if any(len(self.rosters[(held, p)]) <= self._minimum(held) for p in periods):
+                return False
+        return True
+
+    def waiting(self, cname, start):
+        """[(camper id, preference rank)] who would move into the class start, in promotion order"""
+        span = self.spans.get((cname, start))
+        if span is None:
+            return []
+        return [(camper_id, rank) for rank, _, camper_id in sorted(self.heaps[(cname, start)])
+                if self._wants(camper_id, cname, span)]
+
+    # --- Promotion ---
+
+    def _move(self, camper_id, cname, span):
+        """Move the camper into cname; returns the (class, period) seats they freed"""
+        freed = []
+        left = []
+        for held, periods in self._held_in(camper_id, span).items():
+            left.append(held)
+            for p in periods:
+                del self.assignments[camper_id][p]
+                self.rosters[(held, p)].discard(camper_id)
+                freed.append((held, p))
+        for p in span:
+            self.assignments[camper_id][p] = cname
+            self.rosters.setdefault((cname, p), set()).add(camper_id)
+        self.moves.append({"id": camper_id, "class": cname, "periods": list(span), "left": left})
+        return freed
+
+    def promote(self, cname, start):
+        """
+        Fill one open seat of a class start with the first camper on its
+        waitlist who can move. Returns the seats that camper freed (empty when
+        they held nothing in those periods), or None when the class start has
+        no open seat or nobody on the waitlist can move.
+        """
+        key = (cname, start)
+        span = self.spans.get(key)
+        if span is None or not self._has_seat(cname, span):
+            return None
+        heap = self.heaps[key]
+        blocked = []
+        freed = None
+        while heap:
+            entry = heapq.heappop(heap)
+            camper_id = entry[2]
+            if self._can_move(camper_id, cname, span):
+                self.queued[key].discard(camper_id)
+                freed = self._move(camper_id, cname, span)
+                break
+            if self._wants(camper_id, cname, span):
+                blocked.append(entry)   # might become movable later
+            else:
+                self.queued[key].discard(camper_id)
+        for entry in blocked:
+            heapq.heappush(heap, entry)
+        return freed
+
+    def _fill(self, cname, start, pending):
+        """Promote into a class start until it is full or nobody can move; the seats freed go to pending"""
+        while True:
+            more = self.promote(cname, start)
+            if more is None:
+                return
+            pending.extend(more)
+
+    def _cascade(self, freed, starts=()):
+        """
+        Promote into the class starts given, then into freed (class, period)
+        seats, until no one else can move.
+        """
+        pending = list(freed)
+        for cname, start in starts:
+            self._fill(cname, start, pending)
+        while pending:
+            cname, p = pending.pop()
+            for start in self.starts_covering.get((cname, p), ()):
+                self._fill(cname, start, pending)
+
+    def drop(self, camper_id, cname=None):
+        """
+        Remove a camper from one class (or from every class when cname is
+        None, e.g. the camper left camp), promote waitlisted campers into the
+        freed seats and follow the cascade. The dropped camper is waitlisted
+        for their other choices in the periods they now have free.
+        Returns the moves made, in order.
+        """
+        first = len(self.moves)
+        held = self.assignments[camper_id]
+        freed = [(c, p) for p, c in held.items() if cname is None or c == cname]
+        for c, p in freed:
+            del held[p]
+            self.rosters[(c, p)].discard(camper_id)
+        self.drops.append((camper_id, cname or ""))
+        starts = []
+        if cname is None:
+            self.ranks[camper_id] = {}
+        else:
+            self.ranks[camper_id].pop(cname, None)  # not offered the class back
+            # Their other choices may have open seats in the periods now free
+            starts = self._enqueue(camper_id, heapify=True)
+        self._cascade(freed, starts)
+        return self.moves[first:]
+
+    def rows(self):
+        """Waitlist table: one row per (class, start period, position)"""
+        output = [["Class", "Period", "Position", "id", "Rank"]]
+        for (cname, start) in sorted(self.spans, key=lambda k: (k[1], k[0])):
+            for position, (camper_id, rank) in enumerate(self.waiting(cname, start), start=1):
+                output.append([cname, start, position, camper_id, rank])
+        return output
+
+
+def _read_rows(run_dir, filename):
+    path = os.path.join(run_dir, filename)
+    if not os.path.exists(path):
+        return []
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
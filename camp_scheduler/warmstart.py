@@ -0,0 +1,193 @@
+import os
+
+import pandas as pd
+
+from .engines import is_certified, staff_role
+from .timetable import PERIOD_COLUMN
+
+
+def _placements(df, key=str):
+    """{id: {period: value}} from an id,P1..Pn table, blanks left out"""
+    period_cols = [(c, int(PERIOD_COLUMN.match(c).group(1))) for c in df.columns if PERIOD_COLUMN.match(c)]
+    placements = {}
+    for row in df.to_dict("records"):
+        try:
+            row_id = key(row["id"])
+        except (TypeError, ValueError):
+            continue
+        placements[row_id] = {p: row[c] for c, p in period_cols if row[c]}
+    return placements
+
+
+def _class_name(label):
+    """Class in a skills schedule cell ("Lead Archery" -> "Archery"); OFF and Help as they are"""
+    for prefix in ("Lead ", "Assistant "):
+        if label.startswith(prefix):
+            return label[len(prefix):]
+    return None if label == "Unassigned" else label
+
+
+class WarmStart:
+    """
+    A previous run's skills pattern and camper placements, used to seed a new run.
+
+    staff:   {staff_id (int): {period: class, "OFF" or "Help"}}, from skills
+             schedule cells ("Lead Archery" and the like)
+    campers: {camper_id (str): {period: class}}
+    Either may be empty when the source did not have that stage.
+    """
+
+    def __init__(self, source, staff=None, campers=None):
+        self.source = source
+        self.staff = {
+            staff_id: {p: _class_name(label) for p, label in held.items() if _class_name(label)}
+            for staff_id, held in (staff or {}).items()
+        }
+        self.campers = campers or {}
+
+    @classmethod
+    def from_run(cls, run_dir):
+        """Read skills_schedule.csv and camper_assignments.csv from a run folder"""
+        tables = {}
+        for filename in ("skills_schedule.csv", "camper_assignments.csv"):
+            path = os.path.join(run_dir, filename)
+            try:
+                tables[filename] = pd.read_csv(path, dtype=str, keep_default_na=False)
+            except (FileNotFoundError, pd.errors.EmptyDataError):
+                tables[filename] = pd.DataFrame(columns=["id"])
+        return cls(run_dir, _placements(tables["skills_schedule.csv"], int),
+                   _placements(tables["camper_assignments.csv"]))
+
+    @classmethod
+    def from_store(cls, store, run_id=None):
+        """Read a stored run (the newest when run_id is None)"""
+        if run_id is None:
+            runs = store.list_runs(limit=1)
+            if not runs:
+                raise ValueError("The store has no runs to warm-start from")
+            run_id = runs[0]["run_id"]
+        staff, campers = store.run_placements(run_id)
+        return cls(f"store run {run_id}", staff, campers)
+
+    @classmethod
+    def load(cls, source, store=None):
+        """source: a run folder, or a run id ("latest" for the newest) in store"""
+        if os.path.isdir(source):
+            return cls.from_run(source)
+        if store is None:
+            raise ValueError(f"Warm start {source} is not a run folder and no store was given")
+        return cls.from_store(store, None if source == "latest" else source)
+
+
+def _spans(held, timetable):
+    """[(class, start, periods)] for one person's {period: class}, consecutive periods of a class grouped"""
+    spans = []
+    previous = None
+    for p in timetable.periods:
+        cname = held.get(p)
+        if cname and spans and spans[-1][0] == cname and spans[-1][2][-1] == previous:
+            spans[-1][2].append(p)
+        elif cname:
+            spans.append((cname, p, [p]))
+        previous = p
+    return spans
+
+
+def seed_staff_patterns(previous, class_configs, fixed_off_periods, staff_data, timetable):
+    """
+    Keep the slots of previous staff patterns that the current inputs still allow.
+
+    A previous class slot is kept when the staff member is still on the
+    roster, the class still runs from that start period with its whole span,
+    they are still certified, it does not sit in a coordinator's lead period
+    or where the fixed OFF goes, and the class still needs that many staff there.
+    Coordinator leads and fixed OFF periods are left to assign_staff_patterns,
+    as are "Help" slots. A previous OFF is kept for staff without fixed OFF
+    periods. Returns ({staff_id: pattern}, slots kept, class slots before).
+    """
+    periods = timetable.periods
+    remaining = {}
+    for class_name, config in class_configs.items():
+        for period in config["preferred_periods"]:
+            if period in timetable.period_index and timetable.fits(config, period):
+                remaining[(class_name, period)] = remaining.get((class_name, period), 0) + config["staff_required"]
+
+    seed = {}
+    kept = 0
+    total = 0
+    for staff_id, held in previous.items():
+        info = staff_data.get(staff_id)
+        class_slots = [p for p, c in held.items() if c not in ("OFF", "Help")]
+        total += len(class_slots)
+        if info is None:
+            continue
+
+        # Periods assign_staff_patterns fills on its own
+        reserved = set()
+        coordinates = set()
+        for class_name, config in class_configs.items():
+            if staff_id in config.get("coordinators", []):
+                coordinates.add(class_name)
+                lead = next((p for p in periods if p in config["preferred_periods"] and timetable.fits(config, p)), None)
+                reserved.add(lead)
+        fixed_off = fixed_off_periods.get(str(staff_id), fixed_off_periods.get(staff_id, []))
+        # The fixed OFF goes to the first of those periods not taken by a lead
+        reserved.add(next((p for p in periods if p in fixed_off and p not in reserved), None))
+
+        pattern = [None] * len(periods)
+        for class_name, start, span in _spans(held, timetable):
+            if any(p in reserved for p in span):
+                continue
+            if class_name == "OFF":
+                if not fixed_off and len(span) == 1 and not any(x and x["class"] == "OFF" for x in pattern):
+                    pattern[timetable.period_index[start]] = {"class": "OFF", "role": "none"}
+                continue
+            config = class_configs.get(class_name)
+            if (config is None or class_name in coordinates
+                    or remaining.get((class_name, start), 0) <= 0
+                    or tuple(span) != timetable.span(config, start) or not is_certified(class_name, info)):
+                continue
+            remaining[(class_name, start)] -= 1
+            for p in span:
+                pattern[timetable.period_index[p]] = {"class": class_name, "role": staff_role(class_name, info)}
+            kept += len(span)
+        if any(pattern):
+            seed[staff_id] = pattern
+    return seed, kept, total
+
+
+def seed_camper_assignments(previous, class_configs, campers, timetable):
+    """
+    Keep the previous placements of campers that the current inputs still allow.
+
+    A placement is kept when the camper is still enrolled, the class is
+    still camper-assignable from that start period with its whole span, and
+    it has a seat left. Classes the camper still lists take seats first (in
+    submission order), then the fill-in classes they did not list, so a kept
+    fill-in never crowds out a kept choice. Everything else is left for
+    assign_campers to fill. Returns ({camper_id: {period: class}}, kept, before).
+    """
+    choices = {c['id']: {c.get(f'class{i}') for i in range(1, 6)} - {None, ""} for c in campers}
+    order = sorted(campers, key=lambda x: x.get("submission_time", "9999-12-31T23:59:59"))
+    seats = {}
+    seed = {}
+    kept = 0
+    total = sum(len(held) for held in previous.values())
+    for ranked in (True, False):
+        for camper in order:
+            camper_id = camper['id']
+            for class_name, start, span in _spans(previous.get(camper_id, {}), timetable):
+                config = class_configs.get(class_name)
+                if (config is None or (class_name in choices[camper_id]) != ranked
+                        or not config.get("camper_assignable", True)
+                        or start not in config.get("preferred_periods", [])
+                        or tuple(span) != timetable.span(config, start)):
+                    continue
+                limit = 8 * config.get("staff_required", 1)
+                if any(seats.get((class_name, p), 0) >= limit for p in span):
+                    continue
+                for p in span:
+                    seats[(class_name, p)] = seats.get((class_name, p), 0) + 1
+                    seed.setdefault(camper_id, {})[p] = class_name
+                kept += len(span)
+    return seed, kept, total
@@ -0,0 +1,124 @@
+import asyncio
+import csv
+import os
+import time
+from datetime import datetime
+
+from .catalog import RunCatalog
+from .diff import diff_runs
+from .inputs import get_data_dir
+from .scheduler import ProgramSchedules, STAGES, STAGE_INPUTS
+
+
+def affected_stages(changed_files):
+    """
+    Stages that read any of the changed data files. A file no stage lists
+    (calendar.json, or anything new) reruns every stage.
+    """
+    stages = set()
+    for filename in changed_files:
+        readers = [stage for stage in STAGES if filename in STAGE_INPUTS[stage]]
+        if not readers:
+            return list(STAGES)
+        stages.update(readers)
+    return [stage for stage in STAGES if stage in stages]
+
+
+class DataWatcher:
+    """
+    Watches the data directory and reruns the scheduler when files change.
+
+    Every poll_interval seconds the watcher makes one scandir pass comparing
+    (mtime, size) per file, so it costs next to nothing while idle. A burst of
+    writes (an import copying several form exports) is collected until the
+    folder has been quiet for `debounce` seconds. Then only the affected
+    stages rerun into a new Output folder and every other stage's outputs are
+    reused from the latest finished run of the same week (everything reruns
+    when the week has none yet). The new folder is published when its
+    summary.json is written, which is what `serve` picks up. A changes.csv
+    next to it lists what changed for each person.
+    """
+
+    def __init__(self, week_start_date, output_root="Output", poll_interval=1.0, debounce=2.0,
+                 store=None, portfolio=None, warm_start=False, group_by=None):
+        self.week_start_date = week_start_date
+        self.data_dir = get_data_dir()  # the folder ProgramSchedules reads
+        self.output_root = output_root
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.store = store
+        self.portfolio = portfolio
+        self.warm_start = warm_start  # seed rerun stages from the previous run's solution
+        self.group_by = group_by  # camper grouping seated together ("friends", "cabin" or None)
+        self.catalog = RunCatalog(output_root)
+        self.runs = 0
+
+    def snapshot(self):
+        """{filename: (mtime_ns, size)} for the files in the data directory"""
+        files = {}
+        with os.scandir(self.data_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and not entry.name.startswith("."):
+                    stat = entry.stat()
+                    files[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def previous_run(self):
+        """Folder of the newest finished run of the watched week, or None"""
+        week = datetime.strptime(self.week_start_date, "%d/%m/%Y").strftime("%Y-%m-%d")
+        runs = self.catalog.list_runs(limit=1, week_start=week, complete=True)
+        if not runs or runs[0]["archived"]:
+            return None
+        return runs[0]["path"]
+
+    def rerun(self, changed_files):
+        """Rerun the stages affected by changed_files; returns the new run folder"""
+        stages = affected_stages(changed_files)
+        previous = self.previous_run()
+        print(f"[INFO] Data changed: {', '.join(sorted(changed_files))}")
+
+        scheduler = ProgramSchedules(self.week_start_date, store=self.store, portfolio=self.portfolio,
+                                     output_root=self.output_root, catalog=self.catalog, group_by=self.group_by,
+                                     warm_start=previous if self.warm_start else None)
+        scheduler.run_stages(stages, previous_run=previous)
+
+        if previous is not None:
+            changes = diff_runs(previous, scheduler.output_dir)
+            with open(os.path.join(scheduler.output_dir, "changes.csv"), "w", newline="") as f:
+                csv.writer(f).writerows(changes.notification_rows())
+            print(changes.summary())
+        return scheduler.output_dir
+
+    async def watch(self, max_runs=None):
+        """Poll the data directory and rerun after each debounced burst of changes"""
+        loop = asyncio.get_running_loop()
+        known = self.snapshot()
+        changed = set()
+        last_change = None
+
+        while max_runs is None or self.runs < max_runs:
+            await asyncio.sleep(self.poll_interval)
+            current = self.snapshot()
+            if current != known:
+                changed.update(name for name in set(current) | set(known) if current.get(name) != known.get(name))
+                known = current
+                last_change = time.monotonic()
+                continue
+            if not changed or time.monotonic() - last_change < self.debounce:
+                continue
+
+            batch, changed = changed, set()
+            try:
+                # The pipeline blocks, so it runs off the event loop thread; writes that land
+                # meanwhile are still in `known`'s diff on the next poll
+                await loop.run_in_executor(None, self.rerun, batch)
+            except Exception as e:
+                print(f"[WARN] Rerun failed: {e}")
+            self.runs += 1
+
+    def run_forever(self):
+        print(f"Watching {self.data_dir} for changes (Ctrl+C to stop)")
+        try:
+            asyncio.run(self.watch())
+        except KeyboardInterrupt:
+            pass
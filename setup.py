@@ -9,6 +9,7 @@ setup(
     },
     install_requires=[
         'pandas',
+        'numpy',
     ],
-    python_requires='>=3.6',
+    python_requires='>=3.7',
 )
\ No newline at end of file